@@ -1,4 +1,18 @@
-from arcgis_helpers._arcgis_helper import \
-    feature_to_tsv_clipboard, feature_to_tsv, save_text_to_file, \
-    map_document_cm, _set_logger_level, get_unique_values, \
-    select_by_regex
+from arcgis_helpers._lazy import lazy_module as _lazy_module
+
+# Submodules and their dependencies (arcpy, numpy, pandas) are imported
+# when one of these names is first used
+_lazy_module(__name__, dict(
+    [(name, "arcgis_helpers._arcgis_helper") for name in [
+        "feature_to_tsv_clipboard", "feature_to_tsv", "save_text_to_file",
+        "map_document_cm", "_set_logger_level", "get_unique_values",
+        "select_by_regex", "select_by_regexes", "iter_feature_tsv",
+        "write_feature_tsv", "_set_logger_json"]] +
+    [("TsvFormat", "arcgis_helpers._tsv_format")] +
+    [(name, "arcgis_helpers._backend") for name in [
+        "use_backend", "get_backend"]] +
+    [(name, "arcgis_helpers._metrics") for name in [
+        "get_metrics", "reset_metrics", "format_metrics", "profiled"]] +
+    [(name, "arcgis_helpers.{}".format(name)) for name in [
+        "arc_np", "model_tools"]]
+))
@@ -1,32 +1,118 @@
+import json
 import logging
-from logging.config import dictConfig
-
-# _logger = logging.getLogger()
-# handler = logging.StreamHandler()
-# formatter = logging.Formatter(
-#         '%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
-# handler.setFormatter(formatter)
-# _logger.addHandler(handler)
-# _logger.setLevel(logging.INFO)
-
-
-_logging_config = dict(
-    version = 1,
-    formatters = {
-        'f': {'format':
-              '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'}
-        },
-    handlers = {
-        'h': {'class': 'logging.StreamHandler',
-              'formatter': 'f',
-              'level': logging.DEBUG}
-        },
-    root = {
-        'handlers': ['h'],
-        'level': logging.DEBUG,
-        },
-)
-
-dictConfig(_logging_config)
-_logger = logging.getLogger()
-_logger.setLevel(logging.INFO)
\ No newline at end of file
+import time
+
+# Messages go to the "arcgis_helpers" logger and never configure the root
+# logger. Until the host application sets up logging they are printed by a
+# fallback handler, afterwards they propagate to the host's handlers.
+
+_FORMAT = '%(asctime)s %(name)-12s %(levelname)-8s %(message)s'
+
+
+class _FallbackHandler(logging.StreamHandler):
+    """
+    Stream handler that stays quiet once the root logger has handlers
+    """
+
+    def emit(self, record):
+        if logging.getLogger().handlers:
+            return
+        logging.StreamHandler.emit(self, record)
+
+
+class _JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, including progress statistics
+    """
+
+    def format(self, record):
+        out = {
+            "time": self.formatTime(record),
+            "name": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        out.update(getattr(record, "progress", {}))
+        if record.exc_info:
+            out["exception"] = self.formatException(record.exc_info)
+        return json.dumps(out, sort_keys=True, default=str)
+
+
+_logger = logging.getLogger("arcgis_helpers")
+_logger.setLevel(logging.INFO)
+if not any(isinstance(h, _FallbackHandler) for h in _logger.handlers):
+    _handler = _FallbackHandler()
+    _handler.setFormatter(logging.Formatter(_FORMAT))
+    _logger.addHandler(_handler)
+
+
+def _set_json_output(enabled=True):
+    """
+    Switch the fallback handler between text and JSON lines
+    :param enabled: write JSON lines when True, text when False
+    :type enabled: bool
+    :return: None
+    :rtype: None
+    """
+    for handler in _logger.handlers:
+        if isinstance(handler, _FallbackHandler):
+            handler.setFormatter(
+                _JsonFormatter() if enabled else logging.Formatter(_FORMAT))
+
+
+class ProgressLogger(object):
+    """
+    Rate limited progress messages for long loops
+    update() only counts rows and checks a clock, a message is logged at
+    most every every_seconds seconds, or every every_percent percent of
+    total when given. Messages carry rows, total, elapsed and rows_per_sec
+    as a "progress" record attribute for the JSON output.
+    """
+
+    def __init__(self, label, total=None, every_seconds=5.0,
+                 every_percent=None, level=logging.INFO, logger=None):
+        self.label = label
+        self.total = total
+        self.every_seconds = every_seconds
+        self.every_rows = None
+        if every_percent and total:
+            self.every_rows = max(1, int(total * every_percent / 100.0))
+        self.level = level
+        self.logger = logger or _logger
+        self.rows = 0
+        self.start = time.time()
+        self._last_time = self.start
+        self._last_rows = 0
+
+    def update(self, rows=1):
+        self.rows += rows
+        now = time.time()
+        if now - self._last_time >= self.every_seconds or (
+                self.every_rows and
+                self.rows - self._last_rows >= self.every_rows):
+            self._log(now)
+
+    def done(self):
+        self._log(time.time())
+
+    def _log(self, now):
+        self._last_time = now
+        self._last_rows = self.rows
+        if not self.logger.isEnabledFor(self.level):
+            return
+        elapsed = now - self.start
+        rows_per_sec = self.rows / elapsed if elapsed > 0 else 0.0
+        progress = {"label": self.label, "rows": self.rows,
+                    "total": self.total, "elapsed": round(elapsed, 3),
+                    "rows_per_sec": round(rows_per_sec, 1)}
+        if self.total:
+            self.logger.log(
+                self.level, "%s: %d of %d (%.0f%%), %.0f rows/s, %.1fs",
+                self.label, self.rows, self.total,
+                100.0 * self.rows / self.total, rows_per_sec, elapsed,
+                extra={"progress": progress})
+        else:
+            self.logger.log(
+                self.level, "%s: %d, %.0f rows/s, %.1fs", self.label,
+                self.rows, rows_per_sec, elapsed,
+                extra={"progress": progress})
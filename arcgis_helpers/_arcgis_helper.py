@@ -1,19 +1,32 @@
-import arcview
-import arcpy
-
 import os
+import io
 import logging
 import contextlib
+import collections
+import datetime
 import re
+import time
 
+import numpy
 import pyperclip
 
-from arcgis_helpers.__logger import _logger
+from arcgis_helpers._backend import arcpy
+from arcgis_helpers.__logger import _logger, _set_json_output, ProgressLogger
+from arcgis_helpers._metrics import add_rows, instrumented, stage
+from arcgis_helpers._oid_ranges import read_oids, split_oids, \
+    oid_field_name, oid_range_where_clause
+from arcgis_helpers._parallel import map_processes, map_threads, \
+    process_count
+from arcgis_helpers._patterns import PatternSet
+from arcgis_helpers._selection import apply_oid_selection
+from arcgis_helpers._tsv_format import TsvFormat
+from arcgis_helpers._sketch import ApproximateDistinct
 import sys
 
 if not hasattr(sys, 'argv'):
     sys.argv  = ['']
 
+@instrumented
 def feature_to_tsv_clipboard(feature, field_name=None, show_headers=True,
                              where_clause=None):
     """Get Feature from FC and copy to clipboard
@@ -36,8 +49,9 @@ def feature_to_tsv_clipboard(feature, field_name=None, show_headers=True,
     return output_text
 
 
+@instrumented
 def feature_to_tsv(feature, field_name=None, show_headers=True,
-                   where_clause=None):
+                   where_clause=None, backend="cursor", text_format=None):
     """Get Features from FC as TSV
     :param feature: Feature Class or Table to search
     :type feature: Feature Class or Table
@@ -47,11 +61,53 @@ def feature_to_tsv(feature, field_name=None, show_headers=True,
     :type show_headers: Boolean
     :param where_clause: Where clause to apply to selection
     :type where_clause: str
+    :param backend: "cursor" or "columnar", see iter_feature_tsv
+    :type backend: str
+    :param text_format: value formatting of the columnar backend
+    :type text_format: TsvFormat
     :return: TSV list of features
     :rtype: str
     """
+    return "".join(iter_feature_tsv(feature, field_name, show_headers,
+                                    where_clause, backend=backend,
+                                    text_format=text_format))
+
+
+def iter_feature_tsv(feature, field_name=None, show_headers=True,
+                     where_clause=None, delimiter="\t", buffer_size=10000,
+                     backend="cursor", text_format=None):
+    """Yield Features from FC as chunks of delimited text
+    Rows are converted as the cursor advances, so only buffer_size rows
+    are held at a time. Joining the chunks gives the same text as
+    feature_to_tsv.
+    The "columnar" backend reads buffer_size rows at a time into a
+    DataFrame and formats each column at once with text_format, writing
+    nulls as text_format.null and quoting values that need it. The shape
+    field is left out of "*".
+    :param feature: Feature Class or Table to search
+    :type feature: Feature Class or Table
+    :param field_name: Field Names to build list of
+    :type field_name: List of Field Names
+    :param show_headers: Show header row of feature
+    :type show_headers: Boolean
+    :param where_clause: Where clause to apply to selection
+    :type where_clause: str
+    :param delimiter: Value separator, tab by default
+    :type delimiter: str
+    :param buffer_size: Number of rows per yielded chunk
+    :type buffer_size: int
+    :param backend: "cursor" to convert row by row with str, "columnar" to
+        format whole columns
+    :type backend: str
+    :param text_format: value formatting of the columnar backend, TsvFormat()
+        by default
+    :type text_format: TsvFormat
+    :return: generator of text chunks
+    :rtype: generator
+    """
     _logger.debug("asserting is headers is boolean")
     assert type(show_headers) is bool
+    assert backend in ["cursor", "columnar"]
 
     _logger.debug("checking field names")
     if field_name is None:
@@ -59,29 +115,132 @@ def feature_to_tsv(feature, field_name=None, show_headers=True,
     if isinstance(field_name, str):
         field_name = [field_name]
 
+    if backend == "columnar":
+        return _iter_feature_tsv_columnar(
+            feature, field_name, show_headers, where_clause, delimiter,
+            buffer_size, text_format or TsvFormat())
+    return _iter_feature_tsv_cursor(feature, field_name, show_headers,
+                                    where_clause, delimiter, buffer_size)
+
+
+def _iter_feature_tsv_cursor(feature, field_name, show_headers, where_clause,
+                             delimiter, buffer_size):
+
+    if show_headers:
+        _logger.info("building header rows")
+        header_fields = field_name
+        if "*" in field_name:
+            header_fields = [field.name for field in arcpy.ListFields(feature)]
+        yield "{}\n".format(delimiter.join(x for x in header_fields))
+
     _logger.info("Getting features")
-    output_values_1 = []
+    separator = ""
+    lines = []
+    progress = ProgressLogger("rows written")
     with arcpy.da.SearchCursor(feature, field_name, where_clause) as sc:
         for row in sc:
-            output_values_1.append(row)
+            lines.append(delimiter.join(__convert_value(x) for x in row))
+            if len(lines) >= buffer_size:
+                progress.update(len(lines))
+                add_rows(len(lines))
+                yield separator + "\n".join(lines)
+                separator = "\n"
+                lines = []
+
+    if lines:
+        progress.update(len(lines))
+        add_rows(len(lines))
+        yield separator + "\n".join(lines)
+    progress.done()
+
+
+def _iter_feature_tsv_columnar(feature, field_name, show_headers,
+                               where_clause, delimiter, buffer_size,
+                               text_format):
+    from arcgis_helpers.arc_np import iter_arctable_to_dataframe
 
-    _logger.info("building data rows")
-    output_values_2 = []
-    for item in output_values_1:
-        output_values_2.append("\t".join(__convert_value(x) for x in item))
-
-    _logger.info("building header rows")
     if "*" in field_name:
-        field_name = [field.name for field in arcpy.ListFields(feature)]
+        field_name = [field.name for field in arcpy.ListFields(feature)
+                      if field.type not in ["Geometry", "Blob", "Raster"]]
+    null_values = _numpy_null_values(feature, field_name)
+    # OIDs to look up which stand-ins are nulls, see _null_masks
+    read_fields = field_name if "OID@" in field_name \
+        else field_name + ["OID@"]
 
-    output_text = ""
     if show_headers:
-        _logger.info("adding headers")
-        output_text += "{}\n".format("\t".join(x for x in field_name))
+        _logger.info("building header rows")
+        yield u"{}\n".format(delimiter.join(text_format.quote(
+            numpy.array(field_name, dtype="U"), delimiter).tolist()))
 
-    _logger.info("adding data to output value")
-    output_text += "\n".join(x for x in output_values_2)
-    return output_text
+    _logger.info("Getting features")
+    separator = u""
+    progress = ProgressLogger("rows written")
+    for frame in iter_arctable_to_dataframe(feature, read_fields,
+                                            where_clause or "",
+                                            null_value=null_values,
+                                            chunk_size=buffer_size):
+        nulls = _null_masks(feature, frame, null_values)
+        lines = text_format.format_lines(frame[field_name], nulls, delimiter)
+        progress.update(len(lines))
+        add_rows(len(lines))
+        yield separator + u"\n".join(lines)
+        separator = u"\n"
+    progress.done()
+
+
+@instrumented
+def write_feature_tsv(feature, output, field_name=None, show_headers=True,
+                      where_clause=None, delimiter="\t", buffer_size=10000,
+                      backend="cursor", text_format=None):
+    """Write Features from FC as TSV to a file path or file-like object
+    Rows are written as the cursor advances so memory does not grow with
+    the number of rows.
+    :param feature: Feature Class or Table to search
+    :type feature: Feature Class or Table
+    :param output: path of the file to write or object with a write method
+    :type output: str or file
+    :param field_name: Field Names to build list of
+    :type field_name: List of Field Names
+    :param show_headers: Show header row of feature
+    :type show_headers: Boolean
+    :param where_clause: Where clause to apply to selection
+    :type where_clause: str
+    :param delimiter: Value separator, tab by default
+    :type delimiter: str
+    :param buffer_size: Number of rows per write
+    :type buffer_size: int
+    :param backend: "cursor" or "columnar", see iter_feature_tsv
+    :type backend: str
+    :param text_format: value formatting of the columnar backend
+    :type text_format: TsvFormat
+    :return: output that was written to
+    :rtype: str or file
+    """
+    chunks = iter_feature_tsv(feature, field_name, show_headers,
+                              where_clause, delimiter, buffer_size, backend,
+                              text_format)
+    _write_chunks(chunks, output)
+    return output
+
+
+def _write_chunks(chunks, output, encoding="utf-8", linesep="\n"):
+    # files are written in binary mode so byte strings are written as they
+    # are, whatever their encoding, and only unicode chunks are encoded.
+    # Line ends are translated as a text mode file would, ie: CRLF on Windows
+    if not hasattr(output, "write"):
+        with io.open(output, "wb") as file_writer:
+            _write_chunks(chunks, file_writer, encoding, os.linesep)
+        return
+
+    text_stream = isinstance(output, io.TextIOBase)
+    for chunk in chunks:
+        if text_stream and isinstance(chunk, bytes):
+            chunk = chunk.decode(encoding)
+        elif not text_stream and not isinstance(chunk, bytes):
+            chunk = chunk.encode(encoding)
+        if linesep != "\n":
+            chunk = chunk.replace(b"\n", linesep.encode("ascii"))
+        output.write(chunk)
 
 
 def __convert_value(value):
@@ -100,8 +259,8 @@ def save_text_to_file(text, output_path, file_name="OutputFile",
                       overwrite_file=False):
     """
     Export string to a file\nTXT Format
-    :param text: string of text to save
-    :type text: string
+    :param text: string of text to save, or an iterable of text chunks
+    :type text: string or iterable
     :param output_path: path to save the file
     :type output_path: path
     :param file_name: Name of File -> Defaults to "OutputFile" if nothing supplied
@@ -112,7 +271,7 @@ def save_text_to_file(text, output_path, file_name="OutputFile",
     :rtype: None
     """
     output_file = os.path.join(output_path, "{}.txt".format(file_name))
-    _logger.info("output file {}".format(output_file))
+    _logger.info("output file %s", output_file)
 
     arcpy_overwrite = arcpy.env.overwriteOutput
 
@@ -123,8 +282,9 @@ def save_text_to_file(text, output_path, file_name="OutputFile",
         return
 
     _logger.info("writing to file")
-    with open(output_file, "w") as file_writer:
-        file_writer.write(text)
+    if hasattr(text, "encode"):
+        text = [text]
+    _write_chunks(text, output_file)
 
     return
 
@@ -153,37 +313,119 @@ def map_document_cm(mxd_path):
     :return: yields arcpy.mapping.MapDocument
     :rtype:
     """
-    _logger.info("Context managed map document {}".format(mxd_path))
+    _logger.info("Context managed map document %s", mxd_path)
     _mxd = arcpy.mapping.MapDocument(mxd_path)
     yield _mxd
     del _mxd
 
 
-def get_unique_values(feature, field):
-    def search_unique(feat):
-        with arcpy.da.SearchCursor(feat, field) as sc:
-            return [row[0] for row in sc]
+@instrumented
+def get_unique_values(feature, field, counts=False, approximate=False,
+                      top_k=100, workers=1, executor="thread",
+                      return_timings=False):
+    """
+    Get the distinct values of a field across one or more features
+    Values are accumulated as the cursor advances, so memory grows with
+    the number of distinct values rather than the number of rows.
+    :param feature: feature class or table, or a list of them
+    :type feature: str or list
+    :param field: field name, or a list of field names for tuple values
+    :type field: str or list
+    :param counts: return the number of rows for each value
+    :type counts: bool
+    :param approximate: estimate the distinct count in fixed memory and
+        return it with the top_k most frequent values
+    :type approximate: bool
+    :param top_k: number of frequent values kept in approximate mode
+    :type top_k: int
+    :param workers: number of features to scan at once, None for one per CPU
+    :type workers: int
+    :param executor: "thread" or "process" pool used when workers > 1
+    :type executor: str
+    :param return_timings: also return the seconds spent on each feature
+    :type return_timings: bool
+    :return: list of values, dict of value counts when counts is True, or
+        (estimated distinct count, [(value, count), ...]) when approximate.
+        With return_timings, a tuple of that result and a dict of seconds
+        per feature.
+    :rtype: list or dict or tuple
+    """
+    assert executor in ["thread", "process"]
+    if type(field) in [list, tuple]:
+        fields = list(field)
+    else:
+        fields = [field]
+
+    for item in fields:
+        if not type(item) in [str, unicode]:
+            error_msg = "Field should be a string or unicode, not {}".format(
+                type(item))
+            _logger.error(error_msg)
+            print(error_msg)
+            return
+
+    def new_accumulator():
+        if approximate:
+            return ApproximateDistinct(top_k)
+        elif counts:
+            return collections.Counter()
+        return set()
+
+    features = feature if type(feature) is list else [feature]
+    accumulator = new_accumulator()
+    if process_count(workers) == 1 or len(features) == 1:
+        # scanned one after another into the same accumulator, so only one
+        # set of distinct values is held
+        scans = (_scan_unique_values((item, fields, accumulator))
+                 for item in features)
+    else:
+        tasks = [(item, fields, new_accumulator()) for item in features]
+        if executor == "process":
+            scans = map_processes(_scan_unique_values, tasks, workers)
+        else:
+            scans = map_threads(_scan_unique_values, tasks, workers)
+
+    timings = {}
+    for item, (values, seconds) in zip(features, scans):
+        _logger.info("%s scanned in %.2fs", item, seconds)
+        timings[item] = timings.get(item, 0) + seconds
+        if values is accumulator:
+            continue
+        if approximate:
+            accumulator.merge(values)
+        else:
+            accumulator.update(values)
+
+    if approximate:
+        result = accumulator.result()
+    elif counts:
+        result = dict(accumulator)
+    else:
+        result = list(accumulator)
 
-    if not type(field) in [str, unicode]:
-        error_msg = "Field should be a string or unicode, not {}".format(
-            type(field))
-        _logger.error(error_msg)
-        print(error_msg)
-        return
+    if return_timings:
+        return result, timings
+    return result
 
-    results = []
-    if type(feature) is list:
-        for item in feature:
-            results += search_unique(item)
-    else:
-        results = search_unique(feature)
 
-    return list(set(results))
+def _scan_unique_values(task):
+    feature, fields, accumulator = task
+    start = time.time()
+    with arcpy.da.SearchCursor(feature, fields) as sc:
+        if len(fields) == 1:
+            accumulator.update(row[0] for row in sc)
+        else:
+            accumulator.update(tuple(row) for row in sc)
+    return accumulator, time.time() - start
 
 
+@instrumented
 def select_by_regex(feature, fields, expression,
                     selection_type="NEW_SELECTION",
-                    pre_clear_selection=True
+                    pre_clear_selection=True,
+                    processes=1,
+                    min_parallel_rows=100000,
+                    backend="cursor"
                     ):
     """
     Allow selection of featurse based on a regex command.
@@ -198,28 +440,34 @@ def select_by_regex(feature, fields, expression,
     :param selection_type: selection to be applied to feature
     :type selection_type:
     :param pre_clear_selection: Clear any current selection set before applying search
+    :param processes: number of processes to search with, None for one per CPU
+    :type processes: int
+    :param min_parallel_rows: search serially below this many rows
+    :type min_parallel_rows: int
+    :param backend: "cursor" to match row by row, "pandas" to read the fields
+        into a DataFrame and match whole columns
+    :type backend: str
     :return: bool
     :rtype: list
     """
+    assert backend in ["cursor", "pandas"]
 
     if pre_clear_selection:
         arcpy.SelectLayerByAttribute_management(feature, "CLEAR_SELECTION")
 
-    oid_list = _get_OID_match(feature, fields, expression)
-    sql = ""
+    processes = process_count(processes)
+    with stage("match"):
+        if backend == "pandas":
+            oid_list = _get_OID_match_pandas(feature, fields, expression)
+        elif processes > 1 and int(arcpy.GetCount_management(feature)[0]) \
+                >= min_parallel_rows:
+            oid_list = _get_OID_match_parallel(feature, fields, expression,
+                                               processes)
+        else:
+            oid_list = _get_OID_match(feature, fields, expression)
     if len(oid_list) > 0:
-        describe_feature = arcpy.Describe(feature)
-
-        sql = "\"{}\" IN ({})".format(
-            describe_feature.OIDFieldName,
-            ",".join(["{}".format(oid) for oid in oid_list])
-        )
-
-        arcpy.SelectLayerByAttribute_management(
-            feature,
-            selection_type,
-            sql
-        )
+        with stage("selection", rows=len(oid_list)):
+            apply_oid_selection(feature, oid_list, selection_type)
 
     else:
         print("No features match pattern {}".format(expression))
@@ -227,7 +475,57 @@ def select_by_regex(feature, fields, expression,
     return oid_list
 
 
-def _get_OID_match(feature, fields, expression):
+def _get_OID_match_parallel(feature, fields, expression, processes):
+    """
+    Search OID ranges of a feature in a process pool
+    Workers open their own cursor on the feature class behind the layer.
+    OIDs are read from the layer first so selections and definition
+    queries still limit the result.
+    """
+    oids, catalog_path, where_clauses = _oid_range_tasks(feature, processes)
+    if len(oids) == 0:
+        return []
+    tasks = [(catalog_path, fields, expression, where_clause)
+             for where_clause in where_clauses]
+
+    oid_list = []
+    for matches in map_processes(_match_oid_range, tasks, processes):
+        oid_list += matches
+    add_rows(len(oids))
+    return _oids_in_layer(oid_list, oids)
+
+
+def _oid_range_tasks(feature, processes):
+    """
+    OIDs of a layer and where clauses splitting the feature class behind
+    it into OID ranges, several per process
+    """
+    oids = read_oids(feature)
+    if len(oids) == 0:
+        return oids, None, []
+
+    # several ranges per process keeps the pool busy when matches are uneven
+    chunk_size = -(-len(oids) // (processes * 4))
+    catalog_path = arcpy.Describe(feature).catalogPath
+    oid_field = oid_field_name(catalog_path)
+    where_clauses = [oid_range_where_clause(oid_field, oid_range)
+                     for oid_range in split_oids(oids, chunk_size)]
+    _logger.info("searching %s rows in %s ranges", len(oids),
+                 len(where_clauses))
+    return oids, catalog_path, where_clauses
+
+
+def _oids_in_layer(oid_list, oids):
+    in_layer = numpy.in1d(oid_list, oids, assume_unique=True)
+    return [oid for oid, keep in zip(oid_list, in_layer) if keep]
+
+
+def _match_oid_range(task):
+    catalog_path, fields, expression, where_clause = task
+    return _get_OID_match(catalog_path, fields, expression, where_clause)
+
+
+def _get_OID_match(feature, fields, expression, where_clause=None):
     if type(fields) is list:
         fields = ["OID@"] + fields
     else:
@@ -236,14 +534,231 @@ def _get_OID_match(feature, fields, expression):
     matcher = re.compile(expression)
 
     oid_list = []
-    with arcpy.da.SearchCursor(feature, fields) as sc:
+    row_count = 0
+    with arcpy.da.SearchCursor(feature, fields, where_clause) as sc:
         for row in sc:
+            row_count += 1
             if _check_match(matcher, row):
                 oid_list.append(row[0])
+    add_rows(row_count)
 
     return oid_list
 
 
+# Stand-ins for nulls when reading through TableToNumPyArray, which cannot
+# return None. Real values can equal these, so rows holding one are only
+# treated as null once the field is found to be null in them, see
+# _null_masks.
+_NUMPY_NULL_VALUES = {
+    "String": u"\x01",
+    "GUID": u"\x01",
+    "GlobalID": u"\x01",
+    "SmallInteger": -32768,
+    "Integer": -2147483648,
+    "Single": float("nan"),
+    "Double": float("nan"),
+    "Date": datetime.datetime(1678, 1, 1),
+}
+
+
+def _numpy_null_values(feature, fields):
+    """
+    null_value argument of TableToNumPyArray for fields of feature
+    """
+    field_types = dict((field.name.upper(), field.type)
+                       for field in arcpy.ListFields(feature))
+    return dict((field, _NUMPY_NULL_VALUES[field_types[field.upper()]])
+                for field in fields
+                if field_types.get(field.upper()) in _NUMPY_NULL_VALUES)
+
+
+def _null_masks(feature, data_frame, null_values, oid_column="OID@"):
+    """
+    True where each column of a DataFrame read with null_values is null
+    Rows holding a stand-in are read again with a single cursor over their
+    OIDs to find which of the fields are null, so real values equal to a
+    stand-in are not nulls.
+    :param feature: feature the frame was read from
+    :type feature: str
+    :param data_frame: rows read through TableToNumPyArray
+    :type data_frame: pandas.DataFrame
+    :param null_values: null_value argument the frame was read with
+    :type null_values: dict
+    :param oid_column: column of the frame holding the OIDs
+    :type oid_column: str
+    :return: column name: boolean array
+    :rtype: dict
+    """
+    masks = {}
+    candidates = []
+    for field in data_frame.columns:
+        column = data_frame[field]
+        is_null = column.isnull().values
+        if field in null_values:
+            is_null = is_null | (column == null_values[field]).values
+            if is_null.any():
+                candidates.append(field)
+        masks[field] = is_null
+    if not candidates:
+        return masks
+
+    oids = data_frame[oid_column].values
+    candidate_oids = oids[numpy.logical_or.reduce(
+        [masks[field] for field in candidates])]
+    where_clause = "({}) AND {}".format(
+        " OR ".join("{} IS NULL".format(arcpy.AddFieldDelimiters(feature,
+                                                                 field))
+                    for field in candidates),
+        oid_range_where_clause(oid_field_name(feature),
+                               (candidate_oids.min(), candidate_oids.max())))
+    null_oids = dict((field, []) for field in candidates)
+    with arcpy.da.SearchCursor(feature, ["OID@"] + candidates,
+                               where_clause) as sc:
+        for row in sc:
+            for field, value in zip(candidates, row[1:]):
+                if value is None:
+                    null_oids[field].append(row[0])
+    for field in candidates:
+        masks[field] &= numpy.isin(oids, null_oids[field])
+    return masks
+
+
+def _get_OID_match_pandas(feature, fields, expression):
+    from arcgis_helpers.arc_np import arctable_to_dataframe
+
+    if type(fields) is not list:
+        fields = ["{}".format(fields)]
+
+    null_values = _numpy_null_values(feature, fields)
+    data_frame = arctable_to_dataframe(feature, ["OID@"] + fields,
+                                       null_value=null_values)
+    add_rows(len(data_frame))
+    matcher = re.compile(expression)
+    nulls = _null_masks(feature, data_frame, null_values)
+
+    matched = numpy.zeros(len(data_frame), dtype=bool)
+    for field in fields:
+        column = data_frame[field]
+        if column.dtype.kind == "O":
+            text = column
+        else:
+            # the same text _check_match matches for values of a cursor
+            if column.dtype.kind == "M":
+                values = column.values.astype("M8[us]").tolist()
+            else:
+                values = column.values.tolist()
+            text = type(column)(["{}".format(value) for value in values],
+                                index=column.index, dtype=object)
+        matched |= (text.str.match(matcher.pattern, flags=matcher.flags,
+                                   na=False).values & ~nulls[field])
+
+    return data_frame["OID@"].values[matched].tolist()
+
+
+@instrumented
+def select_by_regexes(feature, fields, expressions, selection_layers=False,
+                      processes=1, min_parallel_rows=100000):
+    """
+    Match many named expressions against a feature in a single cursor pass
+    Like select_by_regex a row matches an expression when any of the fields
+    matches it from the start, and selections on the layer limit the rows
+    searched. The expressions are combined into one alternation that skips
+    values matching none of them, see PatternSet.
+    :param feature: feature to search
+    :type feature: FeatureLayer
+    :param fields: single field or list of fields
+    :type fields: str or list
+    :param expressions: name: expression to be applied
+    :type expressions: dict
+    :param selection_layers: make a layer named "<feature>_<name>" for each
+        expression with its matches selected
+    :type selection_layers: bool
+    :param processes: number of processes to search with, None for one per CPU
+    :type processes: int
+    :param min_parallel_rows: search serially below this many rows
+    :type min_parallel_rows: int
+    :return: name: list of matching OIDs
+    :rtype: dict
+    """
+    processes = process_count(processes)
+    with stage("match"):
+        if processes > 1 and int(arcpy.GetCount_management(feature)[0]) \
+                >= min_parallel_rows:
+            oid_lists = _get_OID_matches_parallel(feature, fields,
+                                                  expressions, processes)
+        else:
+            oid_lists = _get_OID_matches(feature, fields, expressions)
+    _logger.info("%s expressions matched %s rows", len(expressions),
+                 sum(len(oid_list) for oid_list in oid_lists.values()))
+
+    if selection_layers:
+        with stage("selection"):
+            _select_matches(feature, oid_lists)
+    return oid_lists
+
+
+def _get_OID_matches(feature, fields, expressions, where_clause=None):
+    if type(fields) is list:
+        fields = ["OID@"] + fields
+    else:
+        fields = ["OID@", "{}".format(fields)]
+
+    patterns = PatternSet(expressions)
+    oid_lists = [[] for _ in patterns.names]
+    row_count = 0
+    with arcpy.da.SearchCursor(feature, fields, where_clause) as sc:
+        for row in sc:
+            row_count += 1
+            matched = set()
+            for field_value in row[1:]:
+                if field_value is not None:
+                    matched.update(patterns.match("{}".format(field_value)))
+            for i in matched:
+                oid_lists[i].append(row[0])
+    add_rows(row_count)
+
+    return dict(zip(patterns.names, oid_lists))
+
+
+def _get_OID_matches_parallel(feature, fields, expressions, processes):
+    oids, catalog_path, where_clauses = _oid_range_tasks(feature, processes)
+    oid_lists = dict((name, []) for name in expressions)
+    if len(oids) == 0:
+        return oid_lists
+    tasks = [(catalog_path, fields, expressions, where_clause)
+             for where_clause in where_clauses]
+
+    for matches in map_processes(_match_oid_range_patterns, tasks,
+                                 processes):
+        for name, oid_list in matches.items():
+            oid_lists[name] += oid_list
+    add_rows(len(oids))
+    return dict((name, _oids_in_layer(oid_list, oids))
+                for name, oid_list in oid_lists.items())
+
+
+def _match_oid_range_patterns(task):
+    catalog_path, fields, expressions, where_clause = task
+    return _get_OID_matches(catalog_path, fields, expressions, where_clause)
+
+
+def _select_matches(feature, oid_lists):
+    describe = arcpy.Describe(feature)
+    make_layer = arcpy.MakeFeatureLayer_management \
+        if getattr(describe, "shapeType", None) else \
+        arcpy.MakeTableView_management
+    for name, oid_list in sorted(oid_lists.items()):
+        layer = "{}_{}".format(describe.name, name)
+        if arcpy.Exists(layer):
+            arcpy.Delete_management(layer)
+        make_layer(feature, layer)
+        if oid_list:
+            apply_oid_selection(layer, oid_list)
+        else:
+            arcpy.SelectLayerByAttribute_management(layer, "CLEAR_SELECTION")
+        _logger.debug("%s: %s selected", layer, len(oid_list))
+
+
 def _check_match(matcher, row):
     for i in range(1, len(row)):
         field_value = row[i]
@@ -259,5 +774,18 @@ def _set_logger_level(level):
     _logger.setLevel(level)
 
 
+def _set_logger_json(enabled=True):
+    """
+    Print messages as JSON lines, with progress statistics as fields
+    Only affects the fallback output used while the host application has
+    not configured logging.
+    :param enabled: JSON lines when True, plain text when False
+    :type enabled: bool
+    :return: None
+    :rtype: None
+    """
+    _set_json_output(enabled)
+
+
 if __name__ == '__main__':
     pass
\ No newline at end of file
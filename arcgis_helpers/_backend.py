@@ -0,0 +1,66 @@
+import importlib
+import os
+
+# Modules use the arcpy proxy below instead of importing arcpy, so the
+# package runs against ArcGIS or against the local stand-in, see
+# arcgis_helpers.local_arcpy. The backend is chosen on first use from the
+# ARCGIS_HELPERS_BACKEND environment variable, "arcpy" by default.
+
+BACKEND_VARIABLE = "ARCGIS_HELPERS_BACKEND"
+
+_BACKENDS = {
+    "arcpy": "arcpy",
+    "local": "arcgis_helpers.local_arcpy",
+}
+
+_active = {}
+
+
+def use_backend(name):
+    """
+    Choose the module standing in for arcpy
+    The choice is also written to the environment so worker processes
+    started by the package use the same backend.
+    :param name: "arcpy" for ArcGIS, "local" for the SQLite stand-in
+    :type name: str
+    :return: the backend module
+    :rtype: module
+    """
+    if name not in _BACKENDS:
+        raise ValueError("backend should be one of {}, not {!r}".format(
+            sorted(_BACKENDS), name))
+    if name == "arcpy":
+        # checks out the ArcView license before arcpy is imported
+        import arcview
+    module = importlib.import_module(_BACKENDS[name])
+    os.environ[BACKEND_VARIABLE] = name
+    _active["name"] = name
+    _active["module"] = module
+    return module
+
+
+def get_backend():
+    """
+    Module currently standing in for arcpy, loaded on first use
+    :return: arcpy or arcgis_helpers.local_arcpy
+    :rtype: module
+    """
+    module = _active.get("module")
+    if module is None:
+        module = use_backend(os.environ.get(BACKEND_VARIABLE, "arcpy"))
+    return module
+
+
+class _ArcpyProxy(object):
+    """
+    Forwards attribute access to the active backend
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_backend(), name)
+
+    def __repr__(self):
+        return "<arcpy proxy for {}>".format(get_backend().__name__)
+
+
+arcpy = _ArcpyProxy()
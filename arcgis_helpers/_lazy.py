@@ -0,0 +1,52 @@
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Module whose listed attributes are imported from their submodule on
+    first access
+    """
+
+    def __getattr__(self, name):
+        module_name = self._lazy_attributes.get(name)
+        if module_name is None:
+            raise AttributeError("module {!r} has no attribute {!r}".format(
+                self.__name__, name))
+        module = importlib.import_module(module_name)
+        # a submodule is its own attribute, anything else lives inside it
+        value = module if module_name == "{}.{}".format(self.__name__, name) \
+            else getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+
+def lazy_module(module_name, lazy_attributes):
+    """
+    Replace a package in sys.modules with one that imports its public
+    attributes on first use
+    Call at the end of the package __init__ instead of importing the
+    submodules, so importing the package does not import arcpy, numpy or
+    pandas until a function that needs them is used.
+    :param module_name: __name__ of the package
+    :type module_name: str
+    :param lazy_attributes: attribute name to the module it is imported
+        from, a submodule is listed under its own name
+    :type lazy_attributes: dict
+    :return: the replacement module
+    :rtype: module
+    """
+    module = sys.modules[module_name]
+    lazy = _LazyModule(module_name, module.__doc__)
+    lazy.__dict__.update(module.__dict__)
+    lazy._lazy_attributes = lazy_attributes
+    lazy.__all__ = sorted(name for name in lazy_attributes
+                          if not name.startswith("_"))
+    # python 2 clears a module's globals when it is garbage collected
+    lazy._original_module = module
+    sys.modules[module_name] = lazy
+    return lazy
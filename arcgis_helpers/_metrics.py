@@ -0,0 +1,271 @@
+import collections
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from arcgis_helpers.__logger import _logger
+
+# Every instrumented call and stage is added to an in-process registry.
+# Totals are kept per name, and the most recent records are kept as well.
+# Work done in worker processes is recorded in those processes, not in
+# the registry of the caller.
+
+_RECENT_RECORDS = 1000
+
+StageRecord = collections.namedtuple(
+    "StageRecord", ["name", "seconds", "rows", "rows_per_sec", "peak_mb"])
+
+_lock = threading.Lock()
+_local = threading.local()
+_totals = collections.OrderedDict()
+_recent = collections.deque(maxlen=_RECENT_RECORDS)
+
+
+def _peak_memory_mb():
+    """
+    Peak resident memory of this process so far in MB, None if unknown
+    This is the high water mark of the process when the stage ends, not
+    the memory used by the stage alone.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on linux, bytes on mac
+        return peak / (1048576.0 if sys.platform == "darwin" else 1024.0)
+    # Windows has no resource module, its high water mark is peak_wset
+    if psutil is not None:
+        info = psutil.Process(os.getpid()).memory_info()
+        if hasattr(info, "peak_wset"):
+            return info.peak_wset / 1048576.0
+    return None
+
+
+class _Stage(object):
+    """
+    Counts rows for a running stage, see stage()
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+
+    def add_rows(self, rows):
+        self.rows += rows
+
+
+def _stage_stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextlib.contextmanager
+def stage(name, rows=0):
+    """
+    Time a block and add it to the metrics registry
+    Stages inside an instrumented call or another stage are recorded under
+    the outer name, ie: "select_by_regex/match". Rows are counted with
+    add_rows, or given up front when known.
+    :param name: name of the stage, ie: "cursor_read"
+    :type name: str
+    :param rows: rows processed, when known before the block runs
+    :type rows: int
+    :return: context manager yielding the running stage
+    :rtype: contextmanager
+    """
+    stack = _stage_stack()
+    if stack:
+        name = "{}/{}".format(stack[-1].name, name)
+    running = _Stage(name)
+    running.rows = rows
+    stack.append(running)
+    start = time.time()
+    try:
+        yield running
+    finally:
+        seconds = time.time() - start
+        stack.pop()
+        _record(name, seconds, running.rows)
+
+
+def instrumented(func):
+    """
+    Decorator recording the wall time and peak memory of every call
+    Rows are recorded when the function or its stages count them.
+    :param func: function to instrument
+    :type func: function
+    :return: wrapped function
+    :rtype: function
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(func.__name__):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def add_rows(rows):
+    """
+    Count rows against the innermost running stage, if any
+    :param rows: rows processed
+    :type rows: int
+    :return: None
+    :rtype: None
+    """
+    stack = _stage_stack()
+    if stack:
+        stack[-1].add_rows(rows)
+
+
+def _record(name, seconds, rows):
+    record = StageRecord(name, seconds, rows,
+                         rows / seconds if seconds > 0 and rows else 0.0,
+                         _peak_memory_mb())
+    with _lock:
+        _recent.append(record)
+        total = _totals.get(name)
+        if total is None:
+            total = _totals[name] = {"calls": 0, "seconds": 0.0, "rows": 0,
+                                     "peak_mb": None}
+        total["calls"] += 1
+        total["seconds"] += seconds
+        total["rows"] += rows
+        if record.peak_mb is not None:
+            total["peak_mb"] = max(total["peak_mb"] or 0, record.peak_mb)
+    _logger.debug("%s took %.3fs for %s rows", name, seconds, rows)
+
+
+def get_metrics(recent=False):
+    """
+    Timings recorded by instrumented helpers in this process
+    :param recent: return the most recent individual records instead of
+        the totals per stage
+    :type recent: bool
+    :return: {name: {calls, seconds, rows, rows_per_sec, peak_mb}} or a
+        list of StageRecord
+    :rtype: dict or list
+    """
+    with _lock:
+        if recent:
+            return list(_recent)
+        metrics = collections.OrderedDict()
+        for name, total in _totals.items():
+            metrics[name] = dict(total)
+            metrics[name]["rows_per_sec"] = \
+                total["rows"] / total["seconds"] \
+                if total["seconds"] > 0 and total["rows"] else 0.0
+        return metrics
+
+
+def reset_metrics():
+    """
+    Clear the metrics registry
+    :return: None
+    :rtype: None
+    """
+    with _lock:
+        _totals.clear()
+        _recent.clear()
+
+
+def format_metrics(metrics=None):
+    """
+    Metrics as an aligned text table, one line per stage
+    :param metrics: result of get_metrics, the current registry by default
+    :type metrics: dict
+    :return: text table
+    :rtype: str
+    """
+    if metrics is None:
+        metrics = get_metrics()
+    lines = ["{:<48}{:>7}{:>11}{:>11}{:>13}{:>10}".format(
+        "stage", "calls", "seconds", "rows", "rows/s", "peak MB")]
+    for name, total in metrics.items():
+        lines.append("{:<48}{:>7}{:>11.3f}{:>11}{:>13.0f}{:>10}".format(
+            name, total["calls"], total["seconds"], total["rows"],
+            total["rows_per_sec"],
+            "" if total["peak_mb"] is None else
+            "{:.0f}".format(total["peak_mb"])))
+    return "\n".join(lines)
+
+
+class ProfileReport(object):
+    """
+    Results of a profiled() block
+    stats is the cProfile text report, memory the largest allocations
+    when memory tracing was requested and available.
+    """
+
+    def __init__(self):
+        self.seconds = None
+        self.stats = None
+        self.memory = None
+        self.profile = None
+
+
+@contextlib.contextmanager
+def profiled(sort_by="cumulative", limit=30, trace_memory=False):
+    """
+    Capture a cProfile report, and optionally allocations, for a block
+    Meant for a single call at a time, profiling slows the code it runs.
+    Memory tracing needs tracemalloc, python 3, and is skipped otherwise.
+        with profiled(trace_memory=True) as report:
+            select_by_regex(layer, ["NAME"], "^A")
+        print(report.stats)
+    :param sort_by: pstats sort key
+    :type sort_by: str
+    :param limit: number of functions or allocation sites in the reports
+    :type limit: int
+    :param trace_memory: also record the largest allocations
+    :type trace_memory: bool
+    :return: context manager yielding a ProfileReport
+    :rtype: contextmanager
+    """
+    import cProfile
+    import pstats
+    try:
+        from StringIO import StringIO
+    except ImportError:
+        from io import StringIO
+
+    report = ProfileReport()
+    trace_memory = trace_memory and tracemalloc is not None
+    if trace_memory:
+        tracemalloc.start()
+    profile = cProfile.Profile()
+    start = time.time()
+    profile.enable()
+    try:
+        yield report
+    finally:
+        profile.disable()
+        report.seconds = time.time() - start
+        report.profile = profile
+        out = StringIO()
+        pstats.Stats(profile, stream=out).sort_stats(sort_by) \
+            .print_stats(limit)
+        report.stats = out.getvalue()
+        if trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            report.memory = "\n".join(
+                str(item) for item in
+                snapshot.statistics("lineno")[:limit])
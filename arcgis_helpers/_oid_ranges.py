@@ -0,0 +1,113 @@
+import collections
+
+import numpy
+
+from arcgis_helpers._backend import arcpy
+from arcgis_helpers.__logger import _logger
+
+
+OIDRange = collections.namedtuple("OIDRange", ["first", "last", "count"])
+
+
+def get_oid_ranges(feature, chunk_size, where_clause=None):
+    """
+    Split the OIDs of a feature into inclusive ranges of chunk_size rows
+    Only the OID column is read, so this is cheap compared to reading the
+    rows themselves. Selections on layers are honoured.
+    :param feature: feature class, table or layer
+    :type feature: str
+    :param chunk_size: number of rows in each range
+    :type chunk_size: int
+    :param where_clause: where clause limiting the rows
+    :type where_clause: str
+    :return: OIDRange(first, last, count) tuples in ascending order
+    :rtype: list
+    """
+    return split_oids(read_oids(feature, where_clause), chunk_size)
+
+
+def read_oids(feature, where_clause=None):
+    """
+    Sorted OIDs of a feature, honouring layer selections
+    :param feature: feature class, table or layer
+    :type feature: str
+    :param where_clause: where clause limiting the rows
+    :type where_clause: str
+    :return: sorted OIDs
+    :rtype: numpy.ndarray
+    """
+    oids = arcpy.da.TableToNumPyArray(feature, ["OID@"],
+                                      where_clause or "")["OID@"]
+    _logger.debug("%s OIDs in %s", len(oids), feature)
+    return numpy.sort(oids)
+
+
+def split_oids(oids, chunk_size):
+    """
+    Split sorted OIDs into inclusive ranges of chunk_size OIDs
+    :param oids: sorted OIDs
+    :type oids: numpy.ndarray
+    :param chunk_size: number of OIDs in each range
+    :type chunk_size: int
+    :return: OIDRange(first, last, count) tuples in ascending order
+    :rtype: list
+    """
+    assert chunk_size > 0
+    oid_ranges = []
+    for start in range(0, len(oids), chunk_size):
+        chunk = oids[start:start + chunk_size]
+        oid_ranges.append(OIDRange(int(chunk[0]), int(chunk[-1]), len(chunk)))
+    return oid_ranges
+
+
+def oid_field_name(feature):
+    """
+    OID field name of a feature, delimited for use in a where clause
+    :param feature: feature class, table or layer
+    :type feature: str
+    :return: delimited field name
+    :rtype: str
+    """
+    return arcpy.AddFieldDelimiters(feature,
+                                    arcpy.Describe(feature).OIDFieldName)
+
+
+def oid_range_where_clause(oid_field, oid_range, where_clause=None):
+    """
+    Build a where clause selecting one OID range, combined with an
+    existing where clause
+    :param oid_field: delimited OID field name, see oid_field_name
+    :type oid_field: str
+    :param oid_range: range of OIDs, first and last are inclusive
+    :type oid_range: OIDRange
+    :param where_clause: where clause to combine with
+    :type where_clause: str
+    :return: where clause
+    :rtype: str
+    """
+    sql = "{0} >= {1} AND {0} <= {2}".format(oid_field, oid_range[0],
+                                             oid_range[1])
+    if where_clause:
+        sql = "({}) AND {}".format(where_clause, sql)
+    return sql
+
+
+def get_oid_where_clauses(feature, chunk_size, where_clause=None):
+    """
+    Where clauses covering a feature in chunks of chunk_size rows
+    Each clause can be read independently, so chunks can be processed
+    one at a time or handed to separate workers.
+    :param feature: feature class, table or layer
+    :type feature: str
+    :param chunk_size: number of rows in each chunk
+    :type chunk_size: int
+    :param where_clause: where clause limiting the rows
+    :type where_clause: str
+    :return: list of where clauses
+    :rtype: list
+    """
+    oid_field = oid_field_name(feature)
+    return [
+        oid_range_where_clause(oid_field, oid_range, where_clause)
+        for oid_range in get_oid_ranges(feature, chunk_size, where_clause)
+    ]
@@ -0,0 +1,114 @@
+import os
+import sys
+import multiprocessing
+import multiprocessing.pool
+
+from arcgis_helpers.__logger import _logger
+
+
+def process_count(processes):
+    """
+    Resolve a requested number of processes
+    :param processes: number of processes, None for one per CPU
+    :type processes: int
+    :return: number of processes, at least 1
+    :rtype: int
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    return max(1, int(processes))
+
+
+def map_processes(func, items, processes=None):
+    """
+    Map func over items in a process pool, keeping the order of items
+    Runs serially when there is only one process or one item. func must
+    be a module level function and items must be picklable.
+    :param func: function taking a single item
+    :type func: function
+    :param items: items to process
+    :type items: list
+    :param processes: number of processes, None for one per CPU
+    :type processes: int
+    :return: results in the order of items
+    :rtype: list
+    """
+    items = list(items)
+    processes = min(process_count(processes), len(items))
+    if processes <= 1:
+        return [func(item) for item in items]
+
+    _set_executable()
+    _logger.info("starting %s processes for %s items", processes,
+                 len(items))
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(func, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def map_threads(func, items, threads=None):
+    """
+    Map func over items in a thread pool, keeping the order of items
+    Suits work that waits on arcpy cursors or disk rather than Python
+    code. Runs serially when there is only one thread or one item.
+    :param func: function taking a single item
+    :type func: function
+    :param items: items to process
+    :type items: list
+    :param threads: number of threads, None for one per CPU
+    :type threads: int
+    :return: results in the order of items
+    :rtype: list
+    """
+    items = list(items)
+    threads = min(process_count(threads), len(items))
+    if threads <= 1:
+        return [func(item) for item in items]
+
+    pool = multiprocessing.pool.ThreadPool(threads)
+    try:
+        return pool.map(func, items, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def imap_threads(func, items, threads=None):
+    """
+    Like map_threads, but yield each result as soon as it and the results
+    before it are ready, so the caller can use them while later items are
+    still processed
+    :param func: function taking a single item
+    :type func: function
+    :param items: items to process
+    :type items: list
+    :param threads: number of threads, None for one per CPU
+    :type threads: int
+    :return: results in the order of items
+    :rtype: generator
+    """
+    items = list(items)
+    threads = min(process_count(threads), len(items))
+    if threads <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    pool = multiprocessing.pool.ThreadPool(threads)
+    try:
+        for result in pool.imap(func, items, chunksize=1):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _set_executable():
+    # Inside ArcMap/ArcCatalog sys.executable is the application, which
+    # cannot host worker processes
+    if not os.path.basename(sys.executable).lower().startswith("python"):
+        multiprocessing.set_executable(
+            os.path.join(sys.exec_prefix, "pythonw.exe"))
@@ -0,0 +1,120 @@
+import re
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# backreferences are numbered across the whole combined pattern and flags
+# set inline apply to all of it, so patterns using either are never
+# joined into it
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_DEFAULT_FLAGS = re.compile(u"").flags
+# python 2 allows at most 100 groups in a pattern, including the whole match
+_MAX_GROUPS = 99
+
+
+class PatternSet(object):
+    """
+    Match a value against many regular expressions at once
+    Patterns are matched from the start of the value, like re.match. A
+    combined alternation of the patterns rejects values matching none of
+    them in a single match, and values it accepts are only tested against
+    the patterns whose literal prefix they start with. Patterns are
+    combined in batches of at most _MAX_GROUPS groups.
+    """
+
+    def __init__(self, expressions):
+        """
+        :param expressions: name: regular expression
+        :type expressions: dict
+        """
+        self.names = sorted(expressions)
+        self.patterns = [re.compile(expressions[name]) for name in self.names]
+
+        combinable = [i for i, pattern in enumerate(self.patterns)
+                      if pattern.flags == _DEFAULT_FLAGS and
+                      pattern.groups <= _MAX_GROUPS and
+                      not _BACKREFERENCE.search(pattern.pattern)]
+        self.gates = []
+        gated = set()
+        for batch in _batches(self.patterns, combinable):
+            gate = _combine([self.patterns[i] for i in batch])
+            if gate is not None:
+                self.gates.append(self._gate(gate, batch))
+                gated.update(batch)
+        self.ungated = [i for i in range(len(self.patterns))
+                        if i not in gated]
+
+    def _gate(self, gate, batch):
+        # patterns of the batch by the first character of their literal
+        # prefix, those without a prefix are tested for every accepted value
+        unprefixed = []
+        prefixes = {}
+        for i in batch:
+            prefix = _literal_prefix(self.patterns[i])
+            if prefix:
+                prefixes.setdefault(prefix[0], []).append((prefix, i))
+            else:
+                unprefixed.append(i)
+        return gate, unprefixed, prefixes
+
+    def match(self, text):
+        """
+        Indexes into names of the patterns matching text
+        :param text: value to match
+        :type text: str
+        :return: pattern indexes
+        :rtype: list
+        """
+        matched = [i for i in self.ungated if self.patterns[i].match(text)]
+        for gate, unprefixed, prefixes in self.gates:
+            if gate.match(text) is None:
+                continue
+            for i in unprefixed:
+                if self.patterns[i].match(text):
+                    matched.append(i)
+            for prefix, i in prefixes.get(text[:1], []):
+                if text.startswith(prefix) and self.patterns[i].match(text):
+                    matched.append(i)
+        return matched
+
+
+def _batches(patterns, indexes):
+    batch = []
+    groups = 0
+    for i in indexes:
+        if batch and groups + patterns[i].groups > _MAX_GROUPS:
+            yield batch
+            batch = []
+            groups = 0
+        batch.append(i)
+        groups += patterns[i].groups
+    if batch:
+        yield batch
+
+
+def _combine(patterns):
+    """
+    One pattern matching wherever any of patterns matches, None when they
+    cannot be combined, ie: the same group name used twice
+    """
+    try:
+        return re.compile(u"|".join(
+            u"(?:{})".format(pattern.pattern) for pattern in patterns))
+    except (re.error, AssertionError, OverflowError, UnicodeError):
+        return None
+
+
+def _literal_prefix(pattern):
+    """
+    Text every match of pattern starts with, empty when there is none
+    """
+    prefix = []
+    for op, value in sre_parse.parse(pattern.pattern, pattern.flags):
+        # non ascii literals end the prefix, they would need decoding to
+        # compare with byte string values
+        if op != sre_parse.LITERAL or value >= 128:
+            break
+        prefix.append(chr(value))
+    return u"".join(prefix)
@@ -0,0 +1,101 @@
+import numpy
+
+from arcgis_helpers._backend import arcpy
+from arcgis_helpers.__logger import _logger
+from arcgis_helpers._oid_ranges import oid_field_name, read_oids
+
+# runs of consecutive OIDs at least this long are selected with BETWEEN
+MIN_RANGE_LENGTH = 4
+# values allowed in a single where clause, counting 2 for a BETWEEN range
+MAX_CLAUSE_VALUES = 1000
+
+
+def oid_selection_clauses(oid_field, oids, max_values=MAX_CLAUSE_VALUES):
+    """
+    Where clauses that together select exactly the given OIDs
+    Runs of consecutive OIDs become BETWEEN ranges and the remaining OIDs
+    are grouped into IN lists, with no clause holding more than
+    max_values values.
+    :param oid_field: delimited OID field name
+    :type oid_field: str
+    :param oids: OIDs to select, in any order
+    :type oids: list
+    :param max_values: values allowed in a single clause
+    :type max_values: int
+    :return: where clauses
+    :rtype: list
+    """
+    oids = numpy.unique(numpy.asarray(oids, dtype="i8"))
+    if len(oids) == 0:
+        return []
+
+    run_starts = numpy.concatenate(
+        ([0], numpy.flatnonzero(numpy.diff(oids) != 1) + 1))
+    run_lengths = numpy.diff(numpy.append(run_starts, len(oids)))
+    long_runs = run_lengths >= MIN_RANGE_LENGTH
+
+    ranges = [
+        "{} BETWEEN {} AND {}".format(oid_field, oids[start],
+                                      oids[start + length - 1])
+        for start, length in zip(run_starts[long_runs],
+                                 run_lengths[long_runs])
+    ]
+    singles = oids[numpy.repeat(~long_runs, run_lengths)]
+    _logger.debug("%s OIDs as %s ranges and %s single values",
+                  len(oids), len(ranges), len(singles))
+
+    clauses = []
+    range_batch = max(1, max_values // 2)
+    for start in range(0, len(ranges), range_batch):
+        clauses.append(" OR ".join(ranges[start:start + range_batch]))
+    for start in range(0, len(singles), max_values):
+        clauses.append("{} IN ({})".format(
+            oid_field,
+            ",".join(str(oid) for oid in singles[start:start + max_values])))
+    return clauses
+
+
+def apply_oid_selection(feature, oids, selection_type="NEW_SELECTION",
+                        max_values=MAX_CLAUSE_VALUES):
+    """
+    Select OIDs on a layer using as many bounded where clauses as needed
+    The first clause is applied with selection_type and the rest are added
+    to it, so the result matches a single selection of all OIDs. A subset
+    selection that needs several clauses is resolved against the current
+    selection first. SWITCH_SELECTION ignores the where clause, so it is
+    applied once whatever the OIDs.
+    :param feature: layer or table view to select on
+    :type feature: FeatureLayer
+    :param oids: OIDs to select
+    :type oids: list
+    :param selection_type: selection to be applied to feature
+    :type selection_type: str
+    :param max_values: values allowed in a single clause
+    :type max_values: int
+    :return: number of where clauses applied
+    :rtype: int
+    """
+    oid_field = oid_field_name(feature)
+    clauses = oid_selection_clauses(oid_field, oids, max_values)
+
+    if selection_type == "SWITCH_SELECTION" and len(clauses) > 1:
+        # every clause would switch the selection again
+        clauses = clauses[:1]
+
+    if selection_type == "SUBSET_SELECTION" and len(clauses) > 1:
+        _logger.debug("resolving subset selection against current selection")
+        oids = numpy.intersect1d(oids, read_oids(feature))
+        clauses = oid_selection_clauses(oid_field, oids, max_values)
+        selection_type = "NEW_SELECTION"
+        if not clauses:
+            arcpy.SelectLayerByAttribute_management(feature,
+                                                    "CLEAR_SELECTION")
+
+    for clause in clauses:
+        arcpy.SelectLayerByAttribute_management(feature, selection_type,
+                                                clause)
+        if selection_type == "NEW_SELECTION":
+            selection_type = "ADD_TO_SELECTION"
+
+    _logger.debug("applied %s selection clauses", len(clauses))
+    return len(clauses)
@@ -0,0 +1,127 @@
+import hashlib
+import math
+import struct
+
+
+def _hash64(value):
+    # stable across processes, unlike hash(), so sketches can be merged
+    text = u"{!r}".format(value).encode("utf-8")
+    return struct.unpack("<Q", hashlib.md5(text).digest()[:8])[0]
+
+
+class HyperLogLog(object):
+    """
+    Fixed memory estimate of the number of distinct values
+    Uses 2 ** precision single byte registers, with a standard error of
+    about 1.04 / sqrt(2 ** precision), 0.8% at the default precision.
+    """
+
+    def __init__(self, precision=14):
+        assert 4 <= precision <= 16
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        hashed = _hash64(value)
+        index = hashed >> (64 - self.precision)
+        remaining = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        assert other.precision == self.precision
+        self.registers = bytearray(
+            max(pair) for pair in zip(self.registers, other.registers))
+
+    def estimate(self):
+        """
+        :return: estimated number of distinct values added
+        :rtype: int
+        """
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(b"\x00")
+        if raw <= 2.5 * m and zeros:
+            # linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+class TopK(object):
+    """
+    Most frequent values in fixed memory (Misra-Gries summary)
+    Any value occurring more than n / (k + 1) times out of n is kept. Counts
+    are lower bounds, short of the true count by at most n / (k + 1).
+    """
+
+    def __init__(self, k=100):
+        assert k > 0
+        self.k = k
+        self.counts = {}
+
+    def add(self, value, count=1):
+        if value in self.counts:
+            self.counts[value] += count
+        else:
+            self.counts[value] = count
+            # trimming in batches keeps the cost per value amortised
+            if len(self.counts) > 2 * self.k:
+                self._trim()
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self._trim()
+
+    def _trim(self):
+        if len(self.counts) <= self.k:
+            return
+        # subtract the (k + 1)th largest count and drop what reaches zero
+        cut = sorted(self.counts.values(), reverse=True)[self.k]
+        self.counts = dict(
+            (value, count - cut) for value, count in self.counts.items()
+            if count > cut)
+
+    def items(self):
+        """
+        :return: (value, count) tuples, most frequent first
+        :rtype: list
+        """
+        return sorted(self.counts.items(),
+                      key=lambda item: -item[1])[:self.k]
+
+
+class ApproximateDistinct(object):
+    """
+    Distinct count estimate and most frequent values in fixed memory
+    """
+
+    def __init__(self, top_k=100, precision=14):
+        self.hyper_log_log = HyperLogLog(precision)
+        self.top_k = TopK(top_k)
+
+    def update(self, values):
+        for value in values:
+            self.hyper_log_log.add(value)
+            self.top_k.add(value)
+
+    def merge(self, other):
+        self.hyper_log_log.merge(other.hyper_log_log)
+        self.top_k.merge(other.top_k)
+
+    def result(self):
+        """
+        :return: (estimated distinct count, [(value, count), ...])
+        :rtype: tuple
+        """
+        return self.hyper_log_log.estimate(), self.top_k.items()
@@ -0,0 +1,148 @@
+import numpy
+
+
+class TsvFormat(object):
+    """
+    How the columnar backend of iter_feature_tsv writes values
+    Each column is formatted at once by a formatter for its type, so no
+    value is converted on its own.
+    """
+
+    def __init__(self, float_precision=None, date_format=None, null=u"",
+                 quote_char=u'"'):
+        """
+        :param float_precision: decimals written for floats, None for the
+            shortest text that reads back as the same value
+        :type float_precision: int
+        :param date_format: strftime format for dates, None for ISO 8601
+        :type date_format: str
+        :param null: text written for nulls
+        :type null: str
+        :param quote_char: values holding the delimiter, quote_char or a
+            line break are wrapped in it, with quote_char doubled, None to
+            write values as they are
+        :type quote_char: str
+        """
+        self.float_precision = float_precision
+        self.date_format = date_format
+        self.null = null
+        self.quote_char = quote_char
+
+    def format_column(self, series, is_null, delimiter):
+        """
+        Text of every value of a column
+        :param series: column to format
+        :type series: pandas.Series
+        :param is_null: True where the value is null
+        :type is_null: numpy.ndarray
+        :param delimiter: value separator, for quoting
+        :type delimiter: str
+        :return: unicode text per value
+        :rtype: numpy.ndarray
+        """
+        kind = series.dtype.kind
+        if kind == "M":
+            text = self._format_dates(series, is_null, delimiter)
+        elif kind == "f":
+            text = self._format_floats(series.values)
+        elif kind in "iub":
+            text = _object_array(list(map(str, series.values.tolist())))
+        else:
+            text = numpy.asarray(series.where(~is_null, u"").values,
+                                 dtype=object).astype("U")
+            text = self.quote(text, delimiter)
+        text = text.astype(object)
+        if is_null.any():
+            text[is_null] = self.null
+        return text
+
+    def format_lines(self, frame, nulls, delimiter):
+        """
+        Rows of a DataFrame as delimited lines, without line breaks
+        Numbers in columns without nulls are formatted with the line by a
+        single % operation per row, other columns are formatted first.
+        :param frame: rows to format
+        :type frame: pandas.DataFrame
+        :param nulls: column name: True where the value is null
+        :type nulls: dict
+        :param delimiter: value separator
+        :type delimiter: str
+        :return: one line per row
+        :rtype: list
+        """
+        specs = []
+        columns = []
+        for column in frame.columns:
+            spec, values = self._column_spec(frame[column], nulls[column],
+                                             delimiter)
+            specs.append(spec)
+            columns.append(values)
+        if not columns:
+            return [u""] * len(frame)
+        line_format = delimiter.replace(u"%", u"%%").join(specs)
+        return [line_format % row for row in zip(*columns)]
+
+    def _column_spec(self, series, is_null, delimiter):
+        # % conversion and values of a column for format_lines
+        kind = series.dtype.kind
+        if not is_null.any():
+            if kind in "iu":
+                return u"%d", series.values.tolist()
+            if kind == "f" and series.dtype.itemsize == 8:
+                if self.float_precision is None:
+                    return u"%r", series.values.tolist()
+                return u"%.{}f".format(self.float_precision), \
+                    series.values.tolist()
+        return u"%s", self.format_column(series, is_null,
+                                         delimiter).tolist()
+
+    def quote(self, text, delimiter):
+        """
+        Quote the values of a unicode array that need it
+        :param text: values to quote
+        :type text: numpy.ndarray
+        :param delimiter: value separator
+        :type delimiter: str
+        :return: unicode array
+        :rtype: numpy.ndarray
+        """
+        if self.quote_char is None or len(text) == 0:
+            return text
+        needs_quotes = numpy.zeros(len(text), dtype=bool)
+        for special in [delimiter, self.quote_char, u"\n", u"\r"]:
+            needs_quotes |= numpy.char.find(text, special) >= 0
+        if not needs_quotes.any():
+            return text
+        text = text.astype(object)
+        quoted = numpy.char.replace(text[needs_quotes].astype("U"),
+                                    self.quote_char, self.quote_char * 2)
+        text[needs_quotes] = (self.quote_char +
+                              quoted.astype(object) + self.quote_char)
+        return text
+
+    def _format_floats(self, values):
+        if self.float_precision is None:
+            # the shortest text that reads back as the same value, repr for
+            # doubles as python floats are doubles
+            if values.dtype.itemsize == 8:
+                return _object_array(list(map(repr, values.tolist())))
+            return values.astype("U")
+        return numpy.char.mod(u"%.{}f".format(self.float_precision),
+                              values)
+
+    def _format_dates(self, series, is_null, delimiter):
+        if self.date_format is not None:
+            return self.quote(numpy.asarray(
+                series.dt.strftime(self.date_format).fillna(u"").values,
+                dtype=object).astype("U"), delimiter)
+        values = series.values
+        present = values[~is_null]
+        # whole seconds unless a value has a fraction of a second
+        unit = "s" if (present.astype("M8[s]") == present).all() else "us"
+        return numpy.datetime_as_string(values, unit=unit).astype("U")
+
+
+def _object_array(values):
+    text = numpy.empty(len(values), dtype=object)
+    text[:] = values
+    return text
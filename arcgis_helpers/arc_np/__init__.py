@@ -1,2 +1,10 @@
-from arcgis_helpers.arc_np._arc_numpy import \
-    arcfeature_to_dataframe, arctable_to_dataframe, dataframe_to_arctable
+from arcgis_helpers._lazy import lazy_module as _lazy_module
+
+_lazy_module(__name__, dict(
+    [(name, "arcgis_helpers.arc_np._arc_numpy") for name in [
+        "arcfeature_to_dataframe", "arctable_to_dataframe",
+        "dataframe_to_arctable", "iter_arcfeature_to_dataframe",
+        "iter_arctable_to_dataframe"]] +
+    [("ReadCache", "arcgis_helpers.arc_np._read_cache"),
+     ("get_oid_where_clauses", "arcgis_helpers._oid_ranges")]
+))
@@ -1,81 +1,364 @@
 import pandas as __pd
 import numpy as __np
 
-import arcpy as __arcpy
-from arcgis_helpers.__logger import _logger
+from collections import OrderedDict as __OrderedDict
 
+from arcgis_helpers._backend import arcpy as __arcpy
+from arcgis_helpers.__logger import _logger, ProgressLogger
+from arcgis_helpers._metrics import add_rows, instrumented, stage
+from arcgis_helpers.arc_np._read_cache import cached_read as __cached_read
+from arcgis_helpers._oid_ranges import get_oid_ranges as __get_oid_ranges, \
+    oid_field_name as __oid_field_name, \
+    oid_range_where_clause as __oid_range_where_clause
 
-def __convert_dataframe_to_np(data_frame_):
-    ar = []
+
+_MAX_STRING_LENGTH = 255
+
+
+def __convert_dataframe_to_np(data_frame_, dtype=None):
+    """
+    Convert a DataFrame to a structured numpy array
+    The output array is allocated once and filled column by column from
+    each column's values rather than being built from a list of rows.
+    :param data_frame_: DataFrame to convert
+    :type data_frame_: pandas.DataFrame
+    :param dtype: structured dtype to fill, built from the frame if None
+    :type dtype: numpy.dtype
+    :return: structured array
+    :rtype: numpy.ndarray
+    """
+    if dtype is None:
+        dtype = __dataframe_dtype(data_frame_)
+
+    out_array = __np.empty(len(data_frame_), dtype=dtype)
+    for col, name in zip(data_frame_.columns, dtype.names):
+        series = __plain_series(data_frame_[col])
+        out_array[name] = __column_values(series, dtype[name])
+
+    return out_array
+
+
+def __dataframe_dtype(data_frame_):
     fld_var = []
-    for col, type_v in zip(data_frame_.columns, data_frame_.dtypes):
-        var_vals = data_frame_[col].values
-        if type_v == 'datetime64[ns]':
-            ar.append(tuple(var_vals.astype("M8[us]")))
-            fld_var.append((str(col.replace(" ", "")), "M8[us]"))
-        elif type_v == 'object':
-            mx_len = max(__np.vectorize(len)(data_frame_[col]))
-            if mx_len > 255:
-                mx_len = 255
-            tp = "|S{}".format(mx_len)
-            ar.append(tuple(var_vals.astype(tp)))
-            fld_var.append((str(col.replace(" ", "")), tp))
-        else:
-            ar.append(tuple(var_vals))
-            fld_var.append((str(col.replace(" ", "")), type_v))
+    for col in data_frame_.columns:
+        series = __plain_series(data_frame_[col])
+        fld_var.append((str(col).replace(" ", ""), __column_dtype(series)))
+    return __np.dtype(fld_var)
+
+
+def __plain_series(series):
+    # categoricals are expanded to their category values, nulls as NaN/None
+    if series.dtype.name == "category":
+        return __pd.Series(__np.asarray(series), index=series.index)
+    return series
+
 
-    values = zip(*ar)
-    fields = fld_var
+def __column_dtype(series):
+    type_v = series.dtype
+    if type_v.kind == "M":
+        return "M8[us]"
+    if type_v.kind == "O" or type_v.name == "string":
+        mx_len = series.str.len().max()
+        if __pd.isnull(mx_len) or mx_len < 1:
+            mx_len = 1
+        return "|S{}".format(min(int(mx_len), _MAX_STRING_LENGTH))
+    if __is_nullable(type_v):
+        if series.isnull().any():
+            return "f8"
+        return type_v.numpy_dtype
+    return type_v
 
-    # print(values)
-    # print(fields)
 
-    return __np.array(values, dtype=fields)
+def __column_values(series, type_v):
+    if type_v.kind == "S":
+        return series.fillna("").values.astype(type_v)
+    if __is_nullable(series.dtype):
+        return series.astype(type_v).values
+    return series.values.astype(type_v, copy=False)
 
 
-def dataframe_to_arctable(data_frame_obj, output_location):
-    np_data = __convert_dataframe_to_np(data_frame_obj)
-    __arcpy.da.NumPyArrayToTable(np_data, output_location)
+def __is_nullable(type_v):
+    # pandas extension dtypes (Int64, boolean) expose their numpy type
+    return not isinstance(type_v, __np.dtype) and \
+        hasattr(type_v, "numpy_dtype")
 
 
+@instrumented
+def dataframe_to_arctable(data_frame_obj, output_location, chunk_size=None):
+    """
+    Write a DataFrame to an arc table
+    When chunk_size is supplied the frame is converted and written chunk by
+    chunk, the first through NumPyArrayToTable and the remainder through an
+    InsertCursor, so only one chunk is held as a numpy array at a time.
+    :param data_frame_obj: DataFrame to write
+    :type data_frame_obj: pandas.DataFrame
+    :param output_location: path of the table to create
+    :type output_location: str
+    :param chunk_size: rows to convert per chunk, None for a single pass
+    :type chunk_size: int
+    :return: None
+    :rtype: None
+    """
+    if chunk_size is None or len(data_frame_obj) <= chunk_size:
+        with stage("convert", rows=len(data_frame_obj)):
+            np_data = __convert_dataframe_to_np(data_frame_obj)
+        with stage("write", rows=len(np_data)):
+            __arcpy.da.NumPyArrayToTable(np_data, output_location)
+        add_rows(len(np_data))
+        return
+
+    dtype = __dataframe_dtype(data_frame_obj)
+    first_chunk = data_frame_obj.iloc[:chunk_size]
+    __arcpy.da.NumPyArrayToTable(
+        __convert_dataframe_to_np(first_chunk, dtype), output_location)
+
+    progress = ProgressLogger("rows written", total=len(data_frame_obj))
+    progress.update(len(first_chunk))
+    with __arcpy.da.InsertCursor(output_location, list(dtype.names)) as ic:
+        for start in range(chunk_size, len(data_frame_obj), chunk_size):
+            _logger.debug("writing rows %s to %s", start, start + chunk_size)
+            chunk = data_frame_obj.iloc[start:start + chunk_size]
+            for row in __convert_dataframe_to_np(chunk, dtype).tolist():
+                ic.insertRow(row)
+            progress.update(len(chunk))
+    progress.done()
+    add_rows(len(data_frame_obj))
+
+
+@instrumented
 def arctable_to_dataframe(feature_path, fields=None, where_clause="",
-                          skip_nulls=False, null_value=None):
+                          skip_nulls=False, null_value=None, chunk_size=None,
+                          cache=None):
+    """
+    Read an arc table into a DataFrame
+    When chunk_size is supplied the table is read in OID ranges of
+    chunk_size rows and copied into a frame preallocated for all rows.
+    When cache is supplied the frame is kept in a ReadCache and loaded from
+    it by later reads of the same fields while the table is unchanged.
+    """
     if fields is None:
         fields = ["*"]
-    x = __arcpy.da.TableToNumPyArray(feature_path, fields, where_clause,
-                                   skip_nulls, null_value)
-    x = __drop_shape_field(x)
-    df = __pd.DataFrame(x)
+    fields = __project_fields(feature_path, fields)
+
+    read = lambda: __read_table(feature_path, fields, where_clause,
+                                skip_nulls, null_value, chunk_size)
+    if cache is not None:
+        return __cached_read(cache, feature_path,
+                             ["table", fields, where_clause, skip_nulls,
+                              null_value], read)
+    return read()
+
+
+def __read_table(feature_path, fields, where_clause, skip_nulls, null_value,
+                 chunk_size):
+    if chunk_size is not None:
+        oid_ranges = __get_oid_ranges(feature_path, chunk_size, where_clause)
+        if oid_ranges:
+            chunks = __read_oid_ranges(
+                feature_path, oid_ranges, where_clause,
+                lambda chunk_where: __table_to_dataframe(
+                    feature_path, fields, chunk_where, skip_nulls,
+                    null_value))
+            return __concat_chunks(chunks, sum(r.count for r in oid_ranges))
+
+    return __table_to_dataframe(feature_path, fields, where_clause,
+                                skip_nulls, null_value)
+
+
+def __table_to_dataframe(feature_path, fields, where_clause, skip_nulls,
+                         null_value):
+    with stage("read") as running:
+        x = __arcpy.da.TableToNumPyArray(feature_path, fields, where_clause,
+                                       skip_nulls, null_value)
+        running.add_rows(len(x))
+    with stage("convert", rows=len(x)):
+        x = __drop_shape_field(x)
+        df = __pd.DataFrame(x)
+    add_rows(len(df))
     return df
 
 
+@instrumented
 def arcfeature_to_dataframe(feature_path, field_names=None, where_clause="",
                             spatial_reference=None, explode_to_points=False,
-                            skip_nulls=False, null_value=None):
+                            skip_nulls=False, null_value=None,
+                            chunk_size=None, cache=None):
+    """
+    Read an arc feature class into a DataFrame, without the shape field
+    When chunk_size is supplied the feature is read in OID ranges of
+    chunk_size rows and copied into a frame preallocated for all rows.
+    When cache is supplied the frame is kept in a ReadCache and loaded from
+    it by later reads of the same fields while the feature is unchanged.
+    """
     if field_names is None:
         field_names = ["*"]
-    x = __arcpy.da.FeatureClassToNumPyArray(in_table=feature_path,
-                                          field_names=field_names,
-                                          where_clause=where_clause,
-                                          spatial_reference=spatial_reference,
-                                          explode_to_points=explode_to_points,
-                                          skip_nulls=skip_nulls,
-                                          null_value=null_value)
-    x = __drop_shape_field(x)
-    df = __pd.DataFrame(x)
+    field_names = __project_fields(feature_path, field_names,
+                                   explode_to_points)
+
+    read = lambda: __read_feature(feature_path, field_names, where_clause,
+                                  spatial_reference, explode_to_points,
+                                  skip_nulls, null_value, chunk_size)
+    if cache is not None:
+        spatial_reference_key = spatial_reference
+        if hasattr(spatial_reference, "exportToString"):
+            spatial_reference_key = spatial_reference.exportToString()
+        return __cached_read(cache, feature_path,
+                             ["feature", field_names, where_clause,
+                              spatial_reference_key, explode_to_points,
+                              skip_nulls, null_value], read)
+    return read()
+
+
+def __read_feature(feature_path, field_names, where_clause,
+                   spatial_reference, explode_to_points, skip_nulls,
+                   null_value, chunk_size):
+    if chunk_size is not None:
+        oid_ranges = __get_oid_ranges(feature_path, chunk_size, where_clause)
+        if oid_ranges:
+            chunks = __read_oid_ranges(
+                feature_path, oid_ranges, where_clause,
+                lambda chunk_where: __feature_to_dataframe(
+                    feature_path, field_names, chunk_where,
+                    spatial_reference, explode_to_points, skip_nulls,
+                    null_value))
+            if explode_to_points:
+                # rows per range are only known once the points are read
+                return __pd.concat(list(chunks), ignore_index=True)
+            return __concat_chunks(chunks, sum(r.count for r in oid_ranges))
+
+    return __feature_to_dataframe(feature_path, field_names, where_clause,
+                                  spatial_reference, explode_to_points,
+                                  skip_nulls, null_value)
+
+
+def __feature_to_dataframe(feature_path, field_names, where_clause,
+                           spatial_reference, explode_to_points, skip_nulls,
+                           null_value):
+    with stage("read") as running:
+        x = __arcpy.da.FeatureClassToNumPyArray(
+            in_table=feature_path, field_names=field_names,
+            where_clause=where_clause, spatial_reference=spatial_reference,
+            explode_to_points=explode_to_points, skip_nulls=skip_nulls,
+            null_value=null_value)
+        running.add_rows(len(x))
+    with stage("convert", rows=len(x)):
+        x = __drop_shape_field(x)
+        df = __pd.DataFrame(x)
+    add_rows(len(df))
     return df
 
 
+def iter_arctable_to_dataframe(feature_path, fields=None, where_clause="",
+                               skip_nulls=False, null_value=None,
+                               chunk_size=100000):
+    """
+    Read an arc table as DataFrames of at most chunk_size rows
+    Each chunk covers a range of OIDs, read with a generated where clause
+    combined with where_clause.
+    :return: generator of DataFrames
+    :rtype: generator
+    """
+    oid_ranges = __get_oid_ranges(feature_path, chunk_size, where_clause)
+    return __read_oid_ranges(
+        feature_path, oid_ranges, where_clause,
+        lambda chunk_where: arctable_to_dataframe(
+            feature_path, fields, chunk_where, skip_nulls, null_value))
+
+
+def iter_arcfeature_to_dataframe(feature_path, field_names=None,
+                                 where_clause="", spatial_reference=None,
+                                 explode_to_points=False, skip_nulls=False,
+                                 null_value=None, chunk_size=100000):
+    """
+    Read an arc feature class as DataFrames of at most chunk_size features
+    Each chunk covers a range of OIDs, read with a generated where clause
+    combined with where_clause.
+    :return: generator of DataFrames
+    :rtype: generator
+    """
+    oid_ranges = __get_oid_ranges(feature_path, chunk_size, where_clause)
+    return __read_oid_ranges(
+        feature_path, oid_ranges, where_clause,
+        lambda chunk_where: arcfeature_to_dataframe(
+            feature_path, field_names, chunk_where, spatial_reference,
+            explode_to_points, skip_nulls, null_value))
+
+
+def __read_oid_ranges(feature_path, oid_ranges, where_clause, read):
+    oid_field = __oid_field_name(feature_path)
+    for oid_range in oid_ranges:
+        _logger.debug("reading OIDs %s to %s", oid_range.first,
+                      oid_range.last)
+        yield read(__oid_range_where_clause(oid_field, oid_range,
+                                            where_clause))
+
+
+def __concat_chunks(chunks, total):
+    columns = None
+    start = 0
+    for df in chunks:
+        if columns is None:
+            # pandas extension dtypes, ie: text, are preallocated as objects
+            columns = __OrderedDict(
+                (col, __np.empty(total, dtype=df[col].dtype
+                                 if isinstance(df[col].dtype, __np.dtype)
+                                 else object))
+                for col in df.columns)
+        for col in df.columns:
+            columns[col][start:start + len(df)] = df[col].values
+        start += len(df)
+
+    # total is the rows in the OID ranges, fewer are read when rows are
+    # skipped, ie: skip_nulls
+    return __pd.DataFrame(__OrderedDict((col, values[:start])
+                                        for col, values in columns.items()),
+                          columns=list(columns))
+
+
+# field types "*" leaves out, arcpy rejects blob and raster fields when
+# they are named
+_SKIPPED_FIELD_TYPES = ["Geometry", "Blob", "Raster"]
+
+
+def __project_fields(feature_path, fields, keep_shape=False):
+    # expand "*" to the non geometry fields so arcpy never reads the shape,
+    # unless the read needs it, ie: to explode features to points
+    if keep_shape or "*" not in fields:
+        return fields
+    out_fields = []
+    for field in fields:
+        if field == "*":
+            out_fields += [
+                fld.name for fld in __arcpy.ListFields(feature_path)
+                if fld.type not in _SKIPPED_FIELD_TYPES
+            ]
+        else:
+            out_fields.append(field)
+    return out_fields
+
+
 def __drop_shape_field(numpy_array):
-    shape_index = None
-    for x in enumerate(numpy_array.dtype.names):
-        if x[1].upper() == "SHAPE":
-            shape_index = x[0]
-
-    out_numpy_array = numpy_array
-    if shape_index is not None:
-        names = list(numpy_array.dtype.names)
-        out_names = names[:shape_index] + names[shape_index + 1:]
-        out_numpy_array = __pd.DataFrame(numpy_array[out_names])
-
-    return out_numpy_array
+    """
+    View of a structured array without its SHAPE field
+    The view shares memory with numpy_array, keeping the remaining fields
+    at their original offsets, so no columns are copied.
+    :param numpy_array: structured array
+    :type numpy_array: numpy.ndarray
+    :return: structured array
+    :rtype: numpy.ndarray
+    """
+    fields = numpy_array.dtype.fields
+    names = [
+        name for name in numpy_array.dtype.names if name.upper() != "SHAPE"
+    ]
+    if len(names) == len(fields):
+        return numpy_array
+
+    view_dtype = __np.dtype({
+        "names": names,
+        "formats": [fields[name][0] for name in names],
+        "offsets": [fields[name][1] for name in names],
+        "itemsize": numpy_array.dtype.itemsize
+    })
+    return __np.ndarray(numpy_array.shape, view_dtype, numpy_array, 0,
+                        numpy_array.strides)
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from collections import OrderedDict
+
+import numpy
+import pandas
+
+from arcgis_helpers._backend import arcpy
+from arcgis_helpers.__logger import _logger
+from arcgis_helpers._metrics import add_rows, stage
+
+# Each entry is a folder named by the hash of its key, holding one .npy
+# file per column and meta.json. The modification time of meta.json is
+# the entry's last use, refreshed on every hit, and entries are evicted
+# least recently used first.
+
+_META_FILE = "meta.json"
+_DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# data types that read through a layer or view, whose rows depend on a
+# selection or definition query rather than only on the source
+_VIEW_TYPES = ["FeatureLayer", "TableView", "Layer", "RasterLayer"]
+
+# what pandas.api.types.infer_dtype reports for columns of text
+_STRING_KINDS = ["string", "unicode", "empty"]
+
+
+class ReadCache(object):
+    """
+    On disk cache of DataFrames read by arctable_to_dataframe and
+    arcfeature_to_dataframe
+    Pass an instance, or a folder for one with the default limits, as the
+    cache argument of those functions. Entries are kept until the source
+    changes or they are evicted to stay within max_bytes and max_entries.
+    A lookup still lists the source's fields, to expand "*", and the files
+    of its workspace, to check the entry is current.
+    """
+
+    def __init__(self, folder, max_bytes=_DEFAULT_MAX_BYTES,
+                 max_entries=None):
+        """
+        :param folder: folder holding the cache, created when missing
+        :type folder: str
+        :param max_bytes: total size of the cached columns
+        :type max_bytes: int
+        :param max_entries: number of cached reads, None for no limit
+        :type max_entries: int
+        """
+        self.folder = os.path.abspath(folder)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+
+    def key(self, key_parts):
+        """
+        Hash of the catalog path, fields and read arguments of a read
+        """
+        text = json.dumps(key_parts, sort_keys=True, default=str)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def load(self, key, stamp):
+        """
+        DataFrame cached under key, None when there is no entry or it was
+        cached from another version of the source
+        Numeric and date columns are memory mapped copy on write from their
+        .npy files, so the frame can be changed without changing the entry.
+        pandas that honours copy=False for a dict of columns, 1.3 and
+        later, uses the mapped columns as they are. Older pandas
+        consolidates them into a copy. Text columns are always copied into
+        object arrays.
+        """
+        entry = os.path.join(self.folder, key)
+        meta_path = os.path.join(entry, _META_FILE)
+        try:
+            with open(meta_path, "r") as meta_file:
+                meta = json.load(meta_file)
+        except (IOError, OSError, ValueError):
+            return None
+        if meta["stamp"] != stamp:
+            _logger.debug("cache entry %s is out of date", key)
+            return None
+
+        mmap_mode = "c" if meta["rows"] else None
+        columns = OrderedDict()
+        for i, column in enumerate(meta["columns"]):
+            values = numpy.load(os.path.join(entry, "{}.npy".format(i)),
+                                mmap_mode=mmap_mode)
+            if column["strings"]:
+                values = values.astype(object)
+                if column["nulls"]:
+                    values[numpy.load(os.path.join(
+                        entry, "{}_null.npy".format(i)))] = None
+            columns[str(column["name"])] = values
+        os.utime(meta_path, None)
+        return pandas.DataFrame(columns, columns=list(columns), copy=False)
+
+    def store(self, key, stamp, frame):
+        """
+        Cache frame under key, then evict entries over the limits
+        Text columns are stored as fixed width unicode arrays with a mask
+        of their nulls. Frames with other object columns are not cached.
+        :return: True if the frame was cached
+        :rtype: bool
+        """
+        temp_entry = tempfile.mkdtemp(prefix=".tmp_", dir=self.folder)
+        try:
+            meta = {"stamp": stamp, "rows": len(frame), "columns": [],
+                    "bytes": 0}
+            for i, name in enumerate(frame.columns):
+                meta["columns"].append(
+                    _save_column(temp_entry, i, name, frame[name]))
+            meta["bytes"] = sum(
+                os.path.getsize(os.path.join(temp_entry, item))
+                for item in os.listdir(temp_entry))
+            with open(os.path.join(temp_entry, _META_FILE), "w") as meta_file:
+                json.dump(meta, meta_file)
+
+            entry = os.path.join(self.folder, key)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, True)
+            os.rename(temp_entry, entry)
+        except _Uncacheable as e:
+            _logger.debug("not cached: %s", e)
+            shutil.rmtree(temp_entry, True)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is within
+        max_bytes and max_entries
+        """
+        entries = []
+        for key in os.listdir(self.folder):
+            meta_path = os.path.join(self.folder, key, _META_FILE)
+            if key.startswith(".") or not os.path.isfile(meta_path):
+                continue
+            try:
+                with open(meta_path, "r") as meta_file:
+                    size = json.load(meta_file)["bytes"]
+                entries.append((os.path.getmtime(meta_path), size, key))
+            except (IOError, OSError, ValueError):
+                continue
+
+        total = 0
+        for count, (used, size, key) in enumerate(sorted(entries,
+                                                         reverse=True)):
+            total += size
+            if total > self.max_bytes or \
+                    (self.max_entries is not None and
+                     count >= self.max_entries):
+                _logger.debug("evicting cache entry %s", key)
+                shutil.rmtree(os.path.join(self.folder, key), True)
+
+    def clear(self):
+        """
+        Delete every entry
+        """
+        for key in os.listdir(self.folder):
+            shutil.rmtree(os.path.join(self.folder, key), True)
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _save_column(entry, i, name, series):
+    values = numpy.asarray(series.values)
+    column = {"name": name, "strings": False, "nulls": False}
+    if values.dtype.kind == "O":
+        if pandas.api.types.infer_dtype(series, skipna=True) \
+                not in _STRING_KINDS:
+            raise _Uncacheable("{} is not a text column".format(name))
+        nulls = numpy.asarray(series.isnull().values)
+        values = numpy.asarray(series.where(~nulls, u"").values,
+                               dtype=object).astype("U")
+        column["strings"] = True
+        if nulls.any():
+            column["nulls"] = True
+            numpy.save(os.path.join(entry, "{}_null.npy".format(i)), nulls)
+    elif values.dtype.kind not in "biufcmM":
+        raise _Uncacheable("{} has dtype {}".format(name, values.dtype))
+    numpy.save(os.path.join(entry, "{}.npy".format(i)), values)
+    return column
+
+
+def source_stamp(source):
+    """
+    Catalog path and version stamp of a table or feature class on disk
+    The stamp hashes the names, sizes and modification times of the files
+    of the workspace holding the source, or of a shapefile or dBASE
+    table's own files, so any edit of the workspace changes it. Layers,
+    table views, in_memory and database connection sources have no stamp.
+    :param source: path of the table or feature class
+    :type source: str
+    :return: (catalog path, stamp), None when there is no stamp
+    :rtype: tuple
+    """
+    if str(source).lower().startswith("in_memory"):
+        return None
+    describe = arcpy.Describe(source)
+    if describe.dataType in _VIEW_TYPES:
+        return None
+    catalog_path = os.path.abspath(describe.catalogPath)
+
+    # the nearest part of the path that exists on disk is the workspace
+    # folder, or the file itself for shapefiles and dBASE tables
+    folder = catalog_path
+    while not os.path.exists(folder):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+    if os.path.isfile(folder):
+        if folder != catalog_path:
+            return None
+        base_name = os.path.splitext(os.path.basename(folder))[0].lower()
+        folder = os.path.dirname(folder)
+        names = [name for name in os.listdir(folder)
+                 if os.path.splitext(name)[0].lower() == base_name]
+    else:
+        names = os.listdir(folder)
+
+    files = []
+    for name in sorted(names):
+        path = os.path.join(folder, name)
+        # readers create and remove lock files, they are not edits
+        if name.lower().endswith(".lock") or not os.path.isfile(path):
+            continue
+        status = os.stat(path)
+        files.append([name, status.st_size, status.st_mtime])
+    stamp = hashlib.sha1(json.dumps(files).encode("utf-8")).hexdigest()
+    return catalog_path, stamp
+
+
+def cached_read(cache, source, key_parts, read):
+    """
+    DataFrame of read() for source, from cache while source is unchanged
+    :param cache: ReadCache, or the folder of one
+    :type cache: ReadCache
+    :param source: table or feature class read
+    :type source: str
+    :param key_parts: fields and arguments of the read
+    :type key_parts: list
+    :param read: function reading the DataFrame from source
+    :type read: function
+    :return: DataFrame
+    :rtype: pandas.DataFrame
+    """
+    if not isinstance(cache, ReadCache):
+        cache = ReadCache(cache)
+    version = source_stamp(source)
+    if version is None:
+        _logger.debug("%s has no version stamp, read without the cache",
+                      source)
+        return read()
+    catalog_path, stamp = version
+    key = cache.key([catalog_path] + list(key_parts))
+
+    with stage("cache_load") as running:
+        frame = cache.load(key, stamp)
+        if frame is not None:
+            running.add_rows(len(frame))
+    if frame is not None:
+        _logger.debug("%s read from cache entry %s", source, key)
+        add_rows(len(frame))
+        return frame
+
+    frame = read()
+    with stage("cache_store", rows=len(frame)):
+        cache.store(key, stamp, frame)
+    return frame
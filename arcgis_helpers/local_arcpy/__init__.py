@@ -0,0 +1,22 @@
+"""
+Stand-in for the parts of arcpy used by arcgis_helpers, for running and
+benchmarking the package where ArcGIS is not installed
+
+Workspaces are folders holding a SQLite database, created with
+CreateFileGDB_management or the "in_memory" workspace. Tables keep their
+arcpy field types, an OBJECTID field and, for feature classes, a Shape
+field holding pickled geometry objects. Select it with
+arcgis_helpers.use_backend("local") or ARCGIS_HELPERS_BACKEND=local.
+"""
+from arcgis_helpers.local_arcpy._management import AddError, \
+    AddField_management, AddFieldDelimiters, AddFields_management, \
+    AddMessage, AddWarning, AsShape, Copy_management, \
+    CopyFeatures_management, CopyRows_management, \
+    CreateFeatureclass_management, CreateFileGDB_management, \
+    CreateTable_management, Delete_management, Describe, Exists, \
+    ExecuteError, GetCount_management, ListFields, \
+    MakeFeatureLayer_management, MakeQueryTable_management, \
+    MakeTableView_management, Result, \
+    SelectLayerByAttribute_management, env
+from arcgis_helpers.local_arcpy._storage import Field
+from arcgis_helpers.local_arcpy import da
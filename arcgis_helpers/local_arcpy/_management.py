@@ -0,0 +1,498 @@
+import os
+import sqlite3
+import sys
+
+from arcgis_helpers.local_arcpy import _storage
+from arcgis_helpers.local_arcpy._storage import Field, quote
+
+# arcpy AddField types to arcpy Field types
+_FIELD_TYPES = {
+    "TEXT": "String",
+    "FLOAT": "Single",
+    "DOUBLE": "Double",
+    "SHORT": "SmallInteger",
+    "LONG": "Integer",
+    "DATE": "Date",
+    "GUID": "Guid",
+    "BLOB": "Blob",
+}
+
+_views = {}
+
+
+class ExecuteError(Exception):
+    """
+    Raised when a geoprocessing tool fails, like arcpy.ExecuteError
+    """
+
+
+class _Env(object):
+    """
+    Geoprocessing environment settings used by the package
+    """
+
+    def __init__(self):
+        self.workspace = None
+        self.scratchWorkspace = None
+        self.overwriteOutput = False
+
+
+env = _Env()
+
+
+class Result(object):
+    """
+    Tool result, outputs are read by index like arcpy.Result
+    """
+
+    def __init__(self, *outputs):
+        self._outputs = [str(output) for output in outputs]
+
+    def __getitem__(self, index):
+        return self._outputs[index]
+
+    def __len__(self):
+        return len(self._outputs)
+
+    def getOutput(self, index):
+        return self._outputs[index]
+
+    def __str__(self):
+        return self._outputs[0]
+
+
+class _View(object):
+    """
+    Table view or feature layer, a named table with a definition query and
+    a selection set of OIDs
+    """
+
+    def __init__(self, name, item, where_clause):
+        self.name = name
+        self.item = item
+        self.where_clause = where_clause or None
+        self.selection = None
+
+
+class Dataset(object):
+    """
+    Resolved data source, a stored table optionally seen through a view
+    """
+
+    def __init__(self, item, view=None):
+        self.item = item
+        self.view = view
+
+    @property
+    def where_clause(self):
+        return self.view.where_clause if self.view else None
+
+    @property
+    def selection(self):
+        return self.view.selection if self.view else None
+
+    def where(self, where_clause=None):
+        """
+        SQL where clause combining the definition query and where_clause
+        """
+        clauses = ["({})".format(clause) for clause in
+                   [self.where_clause, where_clause] if clause]
+        return " WHERE {}".format(" AND ".join(clauses)) if clauses else ""
+
+    def oids(self, where_clause=None):
+        """
+        OIDs of the rows in the view matching where_clause, honouring the
+        selection
+        """
+        sql = "SELECT {} FROM {}{}".format(
+            quote(oid_field(self.item)), quote(self.item.name),
+            self.where(where_clause))
+        oids = set(row[0] for row in execute(self.item.workspace, sql))
+        if self.selection is not None:
+            oids &= self.selection
+        return oids
+
+
+def execute(workspace, sql, parameters=(), error=ExecuteError):
+    try:
+        return _storage.connect(workspace).execute(sql, parameters)
+    except sqlite3.Error as e:
+        raise error("{}: {}".format(e, sql))
+
+
+def oid_field(item):
+    return next(field.name for field in item.fields() if field.type == "OID")
+
+
+def _resolve_path(path):
+    workspace, name = _storage.split_path(str(path))
+    if workspace is None:
+        workspace = env.workspace
+    return workspace, name
+
+
+def resolve(dataset, error=ExecuteError):
+    """
+    Find the table behind a path, view name or bare name in env.workspace
+    """
+    view = _views.get(str(dataset).upper())
+    if view is not None:
+        return Dataset(view.item, view)
+    item = _storage.get_item(*_resolve_path(dataset))
+    if item is None:
+        raise error("ERROR 000732: Dataset {} does not exist or is not "
+                    "supported".format(dataset))
+    return Dataset(item)
+
+
+def _prepare_output(path):
+    workspace, name = _resolve_path(path)
+    if not _storage.is_workspace(workspace):
+        raise ExecuteError("ERROR 000733: workspace {} does not exist".format(
+            workspace))
+    if _storage.get_item(workspace, name) is not None:
+        if not env.overwriteOutput:
+            raise ExecuteError("ERROR 000725: Dataset {} already exists."
+                               .format(path))
+        Delete_management(os.path.join(workspace, name))
+    return workspace, name
+
+
+def Exists(dataset):
+    if str(dataset).upper() in _views:
+        return True
+    workspace, name = _resolve_path(dataset)
+    if _storage.get_item(workspace, name) is not None:
+        return True
+    return _storage.is_workspace(str(dataset)) or os.path.isfile(str(dataset))
+
+
+def Delete_management(in_data, data_type=None):
+    key = str(in_data).upper()
+    if key in _views:
+        del _views[key]
+    elif _storage.is_workspace(str(in_data)):
+        _storage.delete_workspace(str(in_data))
+    else:
+        _storage.drop_item(resolve(in_data).item)
+    return Result(in_data)
+
+
+def ListFields(dataset, wild_card=None, field_type=None):
+    import fnmatch
+
+    fields = resolve(dataset, IOError).item.fields()
+    if wild_card:
+        fields = [field for field in fields
+                  if fnmatch.fnmatch(field.name.upper(), wild_card.upper())]
+    if field_type and field_type.upper() != "ALL":
+        fields = [field for field in fields
+                  if field.type.upper() == field_type.upper()]
+    return fields
+
+
+def AddFieldDelimiters(datasource, field):
+    return quote(field)
+
+
+class _Describe(object):
+    pass
+
+
+def Describe(value):
+    """
+    Properties of a workspace, table, feature class or view
+    """
+    describe = _Describe()
+    value = str(value)
+    if str(value).upper() not in _views and _storage.is_workspace(value):
+        describe.dataType = "Workspace"
+        describe.workspaceType = "LocalDatabase"
+        describe.catalogPath = value
+        describe.path, describe.name = os.path.split(value.rstrip("\\/"))
+        describe.baseName = os.path.splitext(describe.name)[0]
+        describe.children = [Describe(item.path)
+                             for item in _storage.list_items(value)]
+        return describe
+
+    dataset = resolve(value, IOError)
+    item = dataset.item
+    is_feature = item.data_type == "FeatureClass"
+    describe.catalogPath = item.path
+    describe.path = item.workspace
+    describe.name = dataset.view.name if dataset.view else item.name
+    describe.baseName = describe.name
+    describe.dataType = item.data_type
+    if dataset.view is not None:
+        describe.dataType = "FeatureLayer" if is_feature else "TableView"
+        describe.nameString = dataset.view.name
+        describe.whereClause = dataset.where_clause or ""
+        describe.FIDSet = "; ".join(
+            str(oid) for oid in sorted(dataset.selection or []))
+    describe.fields = item.fields()
+    describe.hasOID = True
+    describe.OIDFieldName = oid_field(item)
+    describe.children = []
+    if is_feature:
+        describe.shapeType = item.shape_type
+        describe.shapeFieldName = next(
+            field.name for field in describe.fields
+            if field.type == "Geometry")
+        describe.spatialReference = item.spatial_reference
+    return describe
+
+
+def CreateFileGDB_management(out_folder_path, out_name, out_version=None):
+    if not os.path.splitext(out_name)[1]:
+        out_name = "{}.gdb".format(out_name)
+    path = os.path.join(out_folder_path, out_name)
+    if os.path.isdir(path):
+        raise ExecuteError("ERROR 000725: {} already exists.".format(path))
+    return Result(_storage.create_workspace(path))
+
+
+def CreateTable_management(out_path, out_name, template=None,
+                           config_keyword=None):
+    workspace, name = _prepare_output(os.path.join(out_path, out_name))
+    fields = [] if template is None else [
+        field for field in resolve(template).item.fields()
+        if field.type != "OID"]
+    return Result(_storage.create_item(workspace, name, "Table", fields).path)
+
+
+def CreateFeatureclass_management(out_path, out_name, geometry_type="POLYGON",
+                                  template=None, has_m="DISABLED",
+                                  has_z="DISABLED", spatial_reference=None,
+                                  *args, **kwargs):
+    workspace, name = _prepare_output(os.path.join(out_path, out_name))
+    fields = [] if template is None else [
+        field for field in resolve(template).item.fields()
+        if field.type != "OID"]
+    return Result(_storage.create_item(
+        workspace, name, "FeatureClass", fields,
+        str(geometry_type).capitalize(), spatial_reference).path)
+
+
+def _new_field(field_name, field_type, field_precision=None,
+               field_scale=None, field_length=None, field_alias=None,
+               field_is_nullable="NULLABLE"):
+    field_type = str(field_type).upper()
+    if field_type not in _FIELD_TYPES:
+        raise ExecuteError("ERROR 000800: field type {} is not supported"
+                           .format(field_type))
+    return Field(field_name, _FIELD_TYPES[field_type], field_length or 0,
+                 field_precision or 0, field_scale or 0, field_alias,
+                 field_is_nullable != "NON_NULLABLE")
+
+
+def AddField_management(in_table, field_name, field_type,
+                        field_precision=None, field_scale=None,
+                        field_length=None, field_alias=None,
+                        field_is_nullable="NULLABLE", *args, **kwargs):
+    item = resolve(in_table).item
+    if field_name.upper() in [field.name.upper() for field in item.fields()]:
+        raise ExecuteError("ERROR 000012: {} already exists".format(
+            field_name))
+    _storage.add_fields(item, [_new_field(
+        field_name, field_type, field_precision, field_scale, field_length,
+        field_alias, field_is_nullable)])
+    return Result(in_table)
+
+
+def AddFields_management(in_table, field_description):
+    item = resolve(in_table).item
+    fields = []
+    for description in field_description:
+        description = list(description) + [None] * (4 - len(description))
+        name, field_type, alias, length = description[:4]
+        fields.append(_new_field(name, field_type, field_length=length or None,
+                                 field_alias=alias or None))
+    _storage.add_fields(item, fields)
+    return Result(in_table)
+
+
+def _copy(in_data, out_data, data_type=None):
+    source = resolve(in_data)
+    fields = [field for field in source.item.fields() if field.type != "OID"]
+    workspace, name = _prepare_output(out_data)
+    target = _storage.create_item(
+        workspace, name, data_type or source.item.data_type, fields,
+        source.item.shape_type, source.item.spatial_reference)
+
+    columns = ", ".join(quote(field.name) for field in fields)
+    sql = "SELECT {} FROM {}{}".format(
+        ", ".join([quote(oid_field(source.item))] +
+                  [quote(field.name) for field in fields]),
+        quote(source.item.name), source.where())
+    rows = execute(source.item.workspace, sql).fetchall()
+    if source.selection is not None:
+        rows = [row for row in rows if row[0] in source.selection]
+    connection = _storage.connect(target.workspace)
+    with connection:
+        connection.executemany(
+            "INSERT INTO {} ({}) VALUES ({})".format(
+                quote(target.name), columns, ", ".join("?" * len(fields))),
+            [row[1:] for row in rows])
+    return Result(target.path)
+
+
+def Copy_management(in_data, out_data, data_type=None):
+    return _copy(in_data, out_data)
+
+
+def CopyRows_management(in_rows, out_table, config_keyword=None):
+    return _copy(in_rows, out_table, "Table")
+
+
+def CopyFeatures_management(in_features, out_feature_class,
+                            *args, **kwargs):
+    return _copy(in_features, out_feature_class, "FeatureClass")
+
+
+def MakeTableView_management(in_table, out_view, where_clause=None,
+                             workspace=None, field_info=None):
+    dataset = resolve(in_table)
+    # a view of a view keeps the definition query it was made from
+    clauses = [clause for clause in [dataset.where_clause, where_clause]
+               if clause]
+    view = _View(out_view, dataset.item,
+                 " AND ".join("({})".format(clause) for clause in clauses))
+    view.selection = dataset.selection
+    _views[str(out_view).upper()] = view
+    return Result(out_view)
+
+
+def MakeFeatureLayer_management(in_features, out_layer, where_clause=None,
+                                workspace=None, field_info=None):
+    return MakeTableView_management(in_features, out_layer, where_clause)
+
+
+def MakeQueryTable_management(in_table, out_table, in_key_field_option=None,
+                              in_key_field=None, in_field=None,
+                              where_clause=None):
+    """
+    Join tables of one workspace into a view named out_table. The join is
+    kept in the in_memory workspace, with fields named <table>_<field> as
+    copying a query table names them, and the geometry field as Shape.
+    """
+    import re
+
+    if not isinstance(in_table, (list, tuple)):
+        in_table = str(in_table).split(";")
+    items = [resolve(table).item for table in in_table]
+    if in_field is None:
+        in_field = ["{}.{}".format(item.name, field.name)
+                    for item in items for field in item.fields()
+                    if field.type != "OID"]
+    elif not isinstance(in_field, (list, tuple)):
+        in_field = str(in_field).split(";")
+
+    items_by_name = dict((item.name.upper(), item) for item in items)
+    columns = []
+    fields = []
+    shape_item = None
+    for qualified in in_field:
+        table_name, field_name = qualified.split(".")
+        item = items_by_name[table_name.upper()]
+        field = next(fld for fld in item.fields()
+                     if fld.name.upper() == field_name.upper())
+        columns.append("{}.{}".format(quote(item.name), quote(field.name)))
+        if field.type == "Geometry":
+            shape_item = item
+            fields.append(Field(_storage.SHAPE_FIELD, "Geometry"))
+        else:
+            fields.append(Field(
+                "{}_{}".format(item.name, field.name), field.type,
+                field.length, field.precision, field.scale, None,
+                field.isNullable))
+
+    sql = "SELECT {} FROM {}".format(
+        ", ".join(columns), ", ".join(quote(item.name) for item in items))
+    if where_clause:
+        sql += " WHERE {}".format(re.sub(
+            r"(\w+)\.(\w+)",
+            lambda match: "{}.{}".format(quote(match.group(1)),
+                                         quote(match.group(2))),
+            where_clause))
+    rows = execute(items[0].workspace, sql).fetchall()
+
+    if _storage.get_item(_storage.IN_MEMORY, out_table) is not None:
+        _storage.drop_item(_storage.get_item(_storage.IN_MEMORY, out_table))
+    target = _storage.create_item(
+        _storage.IN_MEMORY, out_table,
+        "Table" if shape_item is None else "FeatureClass", fields,
+        shape_item and shape_item.shape_type,
+        shape_item and shape_item.spatial_reference)
+    connection = _storage.connect(target.workspace)
+    with connection:
+        connection.executemany(
+            "INSERT INTO {} ({}) VALUES ({})".format(
+                quote(target.name),
+                ", ".join(quote(field.name) for field in fields),
+                ", ".join("?" * len(fields))),
+            rows)
+    _views[str(out_table).upper()] = _View(out_table, target, None)
+    return Result(out_table)
+
+
+def SelectLayerByAttribute_management(in_layer_or_view,
+                                      selection_type="NEW_SELECTION",
+                                      where_clause=None,
+                                      invert_where_clause=None):
+    """
+    Change the selection of a view. As with arcpy an empty selection
+    means every row of the view is used.
+    """
+    dataset = resolve(in_layer_or_view)
+    view = dataset.view
+    if view is None:
+        raise ExecuteError("ERROR 000358: {} is not a layer or table view"
+                           .format(in_layer_or_view))
+    current = view.selection
+    if selection_type == "CLEAR_SELECTION":
+        selection = None
+    elif selection_type == "SWITCH_SELECTION":
+        view.selection = None
+        selection = Dataset(view.item, view).oids() - (current or set())
+    else:
+        view.selection = None
+        matched = Dataset(view.item, view).oids(where_clause)
+        if selection_type == "NEW_SELECTION":
+            selection = matched
+        elif selection_type == "ADD_TO_SELECTION":
+            selection = matched | (current or set())
+        elif selection_type == "REMOVE_FROM_SELECTION":
+            selection = (current or set()) - matched
+        elif selection_type == "SUBSET_SELECTION":
+            selection = matched if current is None else matched & current
+        else:
+            raise ExecuteError("ERROR 000800: {} is not a selection type"
+                               .format(selection_type))
+    view.selection = selection or None
+    return Result(in_layer_or_view, len(selection or []))
+
+
+def GetCount_management(in_rows):
+    dataset = resolve(in_rows)
+    if dataset.selection is not None:
+        return Result(len(dataset.selection))
+    sql = "SELECT COUNT(*) FROM {}{}".format(quote(dataset.item.name),
+                                             dataset.where())
+    return Result(execute(dataset.item.workspace, sql).fetchone()[0])
+
+
+def AsShape(geojson_struct, esri_json=False):
+    # geometry is not interpreted, the structure itself is stored
+    return dict(geojson_struct)
+
+
+def AddMessage(message):
+    sys.stdout.write("{}\n".format(message))
+
+
+def AddWarning(message):
+    sys.stderr.write("WARNING: {}\n".format(message))
+
+
+def AddError(message):
+    sys.stderr.write("ERROR: {}\n".format(message))
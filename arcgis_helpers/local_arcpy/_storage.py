@@ -0,0 +1,298 @@
+import atexit
+import datetime
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+# A workspace is a folder, ie: a .gdb folder, holding one SQLite database.
+# Every table is a SQLite table with an OBJECTID primary key, and the arcpy
+# field definitions are kept beside it in gdb_items and gdb_fields.
+
+DATABASE_NAME = "_local_arcpy.sqlite"
+IN_MEMORY = "in_memory"
+OID_FIELD = "OBJECTID"
+SHAPE_FIELD = "Shape"
+
+_SQL_TYPES = {
+    "OID": "INTEGER PRIMARY KEY",
+    "SmallInteger": "INTEGER",
+    "Integer": "INTEGER",
+    "Single": "REAL",
+    "Double": "REAL",
+    "String": "TEXT",
+    "Date": "TEXT",
+    "Guid": "TEXT",
+    "GUID": "TEXT",
+    "GlobalID": "TEXT",
+    "Geometry": "BLOB",
+    "Blob": "BLOB",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gdb_items (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    data_type TEXT,
+    shape_type TEXT,
+    spatial_reference BLOB
+);
+CREATE TABLE IF NOT EXISTS gdb_fields (
+    table_name TEXT COLLATE NOCASE,
+    position INTEGER,
+    name TEXT,
+    type TEXT,
+    length INTEGER,
+    precision INTEGER,
+    scale INTEGER,
+    alias TEXT,
+    is_nullable INTEGER
+);
+"""
+
+_connections = {}
+_in_memory_folder = {}
+
+
+class Field(object):
+    """
+    Field description with the attributes of arcpy.Field
+    """
+
+    def __init__(self, name, type, length=0, precision=0, scale=0,
+                 aliasName=None, isNullable=True):
+        self.name = name
+        self.baseName = name
+        self.type = type
+        self.length = length or (255 if type == "String" else 0)
+        self.precision = precision or 0
+        self.scale = scale or 0
+        self.aliasName = aliasName or name
+        self.isNullable = isNullable and type != "OID"
+        self.required = type in ["OID", "Geometry"]
+        self.editable = type != "OID"
+        self.domain = ""
+
+    def __repr__(self):
+        return "Field({!r}, {!r})".format(self.name, self.type)
+
+
+class Item(object):
+    """
+    Table or feature class stored in a workspace
+    """
+
+    def __init__(self, workspace, name, data_type, shape_type=None,
+                 spatial_reference=None):
+        self.workspace = workspace
+        self.name = name
+        self.data_type = data_type
+        self.shape_type = shape_type
+        self.spatial_reference = spatial_reference
+
+    @property
+    def path(self):
+        return os.path.join(self.workspace, self.name)
+
+    def fields(self):
+        rows = connect(self.workspace).execute(
+            "SELECT name, type, length, precision, scale, alias, is_nullable "
+            "FROM gdb_fields WHERE table_name = ? ORDER BY position",
+            (self.name,)).fetchall()
+        return [Field(row[0], row[1], row[2], row[3], row[4], row[5],
+                      bool(row[6])) for row in rows]
+
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def split_path(path):
+    """
+    Split a dataset path into workspace and name, either separator is
+    accepted so Windows style paths work everywhere
+    """
+    path = path.rstrip("\\/")
+    cut = max(path.rfind("\\"), path.rfind("/"))
+    if cut < 0:
+        return None, path
+    return path[:cut], path[cut + 1:]
+
+
+def workspace_folder(workspace):
+    if workspace == IN_MEMORY:
+        pid = os.getpid()
+        if pid not in _in_memory_folder:
+            _in_memory_folder[pid] = tempfile.mkdtemp(prefix="in_memory_")
+            atexit.register(shutil.rmtree, _in_memory_folder[pid], True)
+        return _in_memory_folder[pid]
+    return workspace
+
+
+def is_workspace(workspace):
+    if workspace == IN_MEMORY:
+        return True
+    return workspace is not None and \
+        os.path.isfile(os.path.join(workspace, DATABASE_NAME))
+
+
+def connect(workspace):
+    """
+    Connection to the database of a workspace, one per process and thread
+    """
+    key = (os.getpid(), threading.current_thread().ident, workspace)
+    connection = _connections.get(key)
+    if connection is None:
+        folder = workspace_folder(workspace)
+        if not os.path.isdir(folder):
+            raise IOError("workspace {} does not exist".format(workspace))
+        # each thread uses its own connection, but any thread may close
+        # them when the workspace is deleted
+        connection = sqlite3.connect(os.path.join(folder, DATABASE_NAME),
+                                     timeout=60, check_same_thread=False)
+        connection.executescript(_SCHEMA)
+        _connections[key] = connection
+    return connection
+
+
+def close(workspace):
+    for key in [key for key in _connections if key[2] == workspace]:
+        if key[0] == os.getpid():
+            _connections.pop(key).close()
+
+
+def create_workspace(folder):
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    connect(folder)
+    return folder
+
+
+def delete_workspace(workspace):
+    close(workspace)
+    shutil.rmtree(workspace_folder(workspace))
+    if workspace == IN_MEMORY:
+        _in_memory_folder.pop(os.getpid(), None)
+
+
+def get_item(workspace, name):
+    if not is_workspace(workspace):
+        return None
+    row = connect(workspace).execute(
+        "SELECT name, data_type, shape_type, spatial_reference "
+        "FROM gdb_items WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return None
+    return Item(workspace, row[0], row[1], row[2], _unpickle(row[3]))
+
+
+def list_items(workspace):
+    rows = connect(workspace).execute(
+        "SELECT name, data_type, shape_type, spatial_reference "
+        "FROM gdb_items ORDER BY name").fetchall()
+    return [Item(workspace, row[0], row[1], row[2], _unpickle(row[3]))
+            for row in rows]
+
+
+def create_item(workspace, name, data_type, fields, shape_type=None,
+                spatial_reference=None):
+    """
+    Create a table from a list of Field, an OBJECTID field is added first
+    and a Shape field for feature classes when they are not in fields
+    """
+    fields = list(fields)
+    if not any(field.type == "OID" for field in fields):
+        fields.insert(0, Field(OID_FIELD, "OID"))
+    if data_type == "FeatureClass" and \
+            not any(field.type == "Geometry" for field in fields):
+        fields.append(Field(SHAPE_FIELD, "Geometry"))
+
+    columns = ", ".join(
+        "{} {}".format(quote(field.name), _SQL_TYPES[field.type])
+        for field in fields)
+    connection = connect(workspace)
+    with connection:
+        connection.execute("CREATE TABLE {} ({})".format(quote(name),
+                                                         columns))
+        connection.execute(
+            "INSERT INTO gdb_items VALUES (?, ?, ?, ?)",
+            (name, data_type, shape_type, _pickle(spatial_reference)))
+        _insert_fields(connection, name, fields, 0)
+    return get_item(workspace, name)
+
+
+def add_fields(item, fields):
+    connection = connect(item.workspace)
+    position = len(item.fields())
+    with connection:
+        for field in fields:
+            connection.execute("ALTER TABLE {} ADD COLUMN {} {}".format(
+                quote(item.name), quote(field.name), _SQL_TYPES[field.type]))
+        _insert_fields(connection, item.name, fields, position)
+
+
+def _insert_fields(connection, table_name, fields, position):
+    connection.executemany(
+        "INSERT INTO gdb_fields VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(table_name, position + i, field.name, field.type, field.length,
+          field.precision, field.scale, field.aliasName,
+          int(field.isNullable)) for i, field in enumerate(fields)])
+
+
+def drop_item(item):
+    connection = connect(item.workspace)
+    with connection:
+        connection.execute("DROP TABLE {}".format(quote(item.name)))
+        connection.execute("DELETE FROM gdb_items WHERE name = ?",
+                           (item.name,))
+        connection.execute("DELETE FROM gdb_fields WHERE table_name = ?",
+                           (item.name,))
+
+
+def to_sql(field_type, value):
+    """
+    Python value to the value stored for a field type
+    """
+    if value is None:
+        return None
+    if field_type in ["Geometry", "Blob"]:
+        return _pickle(value)
+    if field_type == "Date":
+        if not isinstance(value, datetime.datetime):
+            value = datetime.datetime(value.year, value.month, value.day)
+        # python 2 strftime rejects years before 1900
+        return "{:04d}-{:02d}-{:02d} {:02d}:{:02d}:{:02d}.{:06d}".format(
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond)
+    return value
+
+
+def from_sql_function(field_type):
+    """
+    Function converting a stored value back for a field type, None when
+    the stored value is returned as is
+    """
+    if field_type in ["Geometry", "Blob"]:
+        return _unpickle
+    if field_type == "Date":
+        return _parse_date
+    return None
+
+
+def _parse_date(value):
+    if value is None:
+        return None
+    return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+
+
+def _pickle(value):
+    if value is None:
+        return None
+    return sqlite3.Binary(pickle.dumps(value, 2))
+
+
+def _unpickle(value):
+    if value is None:
+        return None
+    return pickle.loads(bytes(value))
@@ -0,0 +1,324 @@
+import sqlite3
+import sys
+
+import numpy
+
+from arcgis_helpers.local_arcpy import _storage
+from arcgis_helpers.local_arcpy._management import _prepare_output, \
+    execute, oid_field, resolve
+from arcgis_helpers.local_arcpy._storage import Field, quote
+
+try:
+    _string_types = (str, unicode)
+except NameError:
+    _string_types = (str,)
+
+# rows are written in batches of this many rows
+_INSERT_BATCH_SIZE = 10000
+
+# numpy scalars are stored like the python values they hold
+for _type in [numpy.int8, numpy.int16, numpy.int32,
+              numpy.int64, numpy.uint8, numpy.uint16, numpy.uint32,
+              numpy.uint64]:
+    sqlite3.register_adapter(_type, int)
+for _type in [numpy.float16, numpy.float32, numpy.float64]:
+    sqlite3.register_adapter(_type, float)
+sqlite3.register_adapter(numpy.bool_, int)
+
+_NUMPY_TYPES = {
+    "OID": "<i4",
+    "SmallInteger": "<i2",
+    "Integer": "<i4",
+    "Single": "<f4",
+    "Double": "<f8",
+    "Date": "<M8[us]",
+    "Guid": "<U38",
+    "GUID": "<U38",
+    "GlobalID": "<U38",
+}
+
+
+def _cursor_fields(dataset, field_names, geometry=True):
+    """
+    Fields for the names and tokens given to a cursor, OID@, SHAPE@ and
+    SHAPE@XY are accepted as tokens, geometry is stored as it is given
+    """
+    fields = dataset.item.fields()
+    if isinstance(field_names, _string_types):
+        field_names = [field_names]
+    if list(field_names) == ["*"]:
+        fields = [field for field in fields
+                  if geometry or field.type not in ["Geometry", "Blob"]]
+        return [field.name for field in fields], fields
+
+    by_name = dict((field.name.upper(), field) for field in fields)
+    cursor_fields = []
+    for name in field_names:
+        token = name.upper()
+        if token == "OID@":
+            token = oid_field(dataset.item).upper()
+        elif token in ["SHAPE@", "SHAPE@XY"]:
+            token = next((field.name.upper() for field in fields
+                          if field.type == "Geometry"), token)
+        elif token.startswith("SHAPE@"):
+            raise RuntimeError("{} is not supported by the local backend, "
+                               "use SHAPE@ or SHAPE@XY".format(name))
+        if token not in by_name:
+            raise RuntimeError("Cannot find field '{}'".format(name))
+        cursor_fields.append(by_name[token])
+    return list(field_names), cursor_fields
+
+
+class SearchCursor(object):
+    """
+    Read rows from a table, feature class or view, honouring its definition
+    query and selection
+    """
+
+    def __init__(self, in_table, field_names, where_clause=None,
+                 spatial_reference=None, explode_to_points=False,
+                 sql_clause=(None, None)):
+        self._dataset = resolve(in_table, RuntimeError)
+        names, self._fields = _cursor_fields(self._dataset, field_names)
+        self.fields = tuple(names)
+
+        prefix, postfix = sql_clause or (None, None)
+        columns = [quote(field.name) for field in self._fields]
+        if self._dataset.selection is not None:
+            columns.append(quote(oid_field(self._dataset.item)))
+        self._sql = "SELECT {}{} FROM {}{}{}".format(
+            "{} ".format(prefix) if prefix else "", ", ".join(columns),
+            quote(self._dataset.item.name),
+            self._dataset.where(where_clause),
+            " {}".format(postfix) if postfix else "")
+        self._converters = [
+            (i, _storage.from_sql_function(field.type))
+            for i, field in enumerate(self._fields)
+            if _storage.from_sql_function(field.type) is not None]
+        self.reset()
+
+    def reset(self):
+        rows = execute(self._dataset.item.workspace, self._sql,
+                       error=RuntimeError)
+        if self._converters or self._dataset.selection is not None:
+            rows = self._convert(rows)
+        self._rows = iter(rows)
+
+    def _convert(self, rows):
+        selection = self._dataset.selection
+        width = len(self._fields)
+        for row in rows:
+            if selection is not None:
+                if row[-1] not in selection:
+                    continue
+                row = row[:width]
+            if self._converters:
+                row = list(row)
+                for i, converter in self._converters:
+                    row[i] = converter(row[i])
+                row = tuple(row)
+            yield row
+
+    def __iter__(self):
+        return self._rows
+
+    def next(self):
+        return next(self._rows)
+
+    __next__ = next
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._rows = iter([])
+
+
+class InsertCursor(object):
+    """
+    Add rows to a table, rows are written in batches and all of them are
+    written when the cursor is closed or deleted
+    """
+
+    def __init__(self, in_table, field_names):
+        dataset = resolve(in_table, RuntimeError)
+        self._item = dataset.item
+        names, fields = _cursor_fields(dataset, field_names)
+        if any(field.type == "OID" for field in fields):
+            raise RuntimeError("OID field cannot be inserted")
+        self.fields = tuple(names)
+        self._types = [field.type for field in fields]
+        self._convert = any(_storage.from_sql_function(field_type)
+                            for field_type in self._types)
+
+        oid_name = quote(oid_field(self._item))
+        self._next_oid = (execute(
+            self._item.workspace, "SELECT MAX({}) FROM {}".format(
+                oid_name, quote(self._item.name)),
+            error=RuntimeError).fetchone()[0] or 0) + 1
+        self._sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(self._item.name),
+            ", ".join([oid_name] + [quote(field.name) for field in fields]),
+            ", ".join("?" * (len(fields) + 1)))
+        self._pending = []
+
+    def insertRow(self, row):
+        if len(row) != len(self._types):
+            raise RuntimeError("sequence size must match size of the row")
+        oid = self._next_oid
+        self._next_oid += 1
+        if self._convert:
+            row = [_storage.to_sql(field_type, value)
+                   for field_type, value in zip(self._types, row)]
+        self._pending.append((oid,) + tuple(row))
+        if len(self._pending) >= _INSERT_BATCH_SIZE:
+            self._flush()
+        return oid
+
+    def _flush(self):
+        if not self._pending:
+            return
+        connection = _storage.connect(self._item.workspace)
+        try:
+            with connection:
+                connection.executemany(self._sql, self._pending)
+        except sqlite3.Error as e:
+            raise RuntimeError(str(e))
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._flush()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+def _null_values(names, fields, null_value):
+    """
+    Value used for nulls in each column, None where a null is an error
+    """
+    values = []
+    for name, field in zip(names, fields):
+        if isinstance(null_value, dict):
+            value = null_value.get(name, null_value.get(field.name))
+        else:
+            value = null_value
+        if value is None and field.type in ["Single", "Double"]:
+            value = float("nan")
+        values.append(value)
+    return values
+
+
+def TableToNumPyArray(in_table, field_names, where_clause=None,
+                      skip_nulls=False, null_value=None):
+    """
+    Read a table into a structured array, Geometry and Blob fields are left
+    out of "*"
+    """
+    dataset = resolve(in_table, RuntimeError)
+    names, fields = _cursor_fields(dataset, field_names, geometry=False)
+    dtype = []
+    for name, field in zip(names, fields):
+        if field.type == "String":
+            dtype.append((str(name), "<U{}".format(field.length)))
+        elif field.type in _NUMPY_TYPES:
+            dtype.append((str(name), _NUMPY_TYPES[field.type]))
+        else:
+            raise RuntimeError("{} field {} cannot be read into a numpy "
+                               "array".format(field.type, name))
+
+    with SearchCursor(in_table, names, where_clause) as sc:
+        rows = list(sc)
+
+    if skip_nulls:
+        rows = [row for row in rows if None not in row]
+    elif any(None in row for row in rows):
+        defaults = _null_values(names, fields, null_value)
+        for i, row in enumerate(rows):
+            if None not in row:
+                continue
+            row = tuple(default if value is None else value
+                        for value, default in zip(row, defaults))
+            if None in row:
+                raise RuntimeError(
+                    "Null value in field {}, use skip_nulls or null_value"
+                    .format(names[row.index(None)]))
+            rows[i] = row
+    return numpy.array(rows, dtype=dtype)
+
+
+def FeatureClassToNumPyArray(in_table, field_names, where_clause=None,
+                             spatial_reference=None, explode_to_points=False,
+                             skip_nulls=False, null_value=None):
+    if explode_to_points:
+        raise RuntimeError("explode_to_points is not supported by the local "
+                           "backend")
+    return TableToNumPyArray(in_table, field_names, where_clause,
+                             skip_nulls, null_value)
+
+
+def _field_type(dtype):
+    if dtype.kind == "b" or dtype.kind in "iu" and dtype.itemsize == 1 or \
+            dtype.kind == "i" and dtype.itemsize == 2:
+        return "SmallInteger"
+    # ArcMap has no 64-bit integer field, those become Double
+    if dtype.kind == "i" and dtype.itemsize == 4 or \
+            dtype.kind == "u" and dtype.itemsize == 2:
+        return "Integer"
+    if dtype.kind in "iu":
+        return "Double"
+    if dtype.kind == "f":
+        return "Single" if dtype.itemsize == 4 else "Double"
+    if dtype.kind in "SU":
+        return "String"
+    if dtype.kind == "M":
+        return "Date"
+    raise RuntimeError("numpy type {} is not supported".format(dtype))
+
+
+def NumPyArrayToTable(in_array, out_table):
+    """
+    Write a structured array to a new table
+    """
+    fields = []
+    for name in in_array.dtype.names:
+        dtype = in_array.dtype[name]
+        length = 0
+        if dtype.kind == "U":
+            length = dtype.itemsize // 4
+        elif dtype.kind == "S":
+            length = dtype.itemsize
+        field_name = name
+        if name.upper() == _storage.OID_FIELD:
+            field_name = "{}_1".format(name)
+        fields.append(Field(field_name, _field_type(dtype), length))
+
+    workspace, name = _prepare_output(out_table)
+    item = _storage.create_item(workspace, name, "Table", fields)
+
+    columns = []
+    for field, name in zip(fields, in_array.dtype.names):
+        values = in_array[name]
+        if values.dtype.kind == "S" and sys.version_info[0] >= 3:
+            values = numpy.char.decode(values, "latin-1")
+        elif values.dtype.kind == "M":
+            values = values.astype("<M8[us]")
+        values = values.tolist()
+        if field.type == "Date":
+            values = [_storage.to_sql("Date", value) for value in values]
+        columns.append(values)
+
+    connection = _storage.connect(workspace)
+    with connection:
+        connection.executemany(
+            "INSERT INTO {} ({}) VALUES ({})".format(
+                quote(item.name),
+                ", ".join(quote(field.name) for field in fields),
+                ", ".join("?" * len(fields))),
+            zip(*columns))
@@ -1,3 +1,10 @@
-from arcgis_helpers.model_tools._model_tools import \
-    import_model_shapefile, create_query_table, import_model_results, \
-    list_model_scenarios
+from arcgis_helpers._lazy import lazy_module as _lazy_module
+
+_lazy_module(__name__, dict(
+    [(name, "arcgis_helpers.model_tools._model_tools") for name in [
+        "import_model_shapefile", "create_query_table",
+        "import_model_results", "list_model_scenarios",
+        "import_all_model_results", "import_model_shapefiles"]] +
+    [("read_dbf", "arcgis_helpers.model_tools._dbf"),
+     ("read_shapefile", "arcgis_helpers.model_tools._shapefile")]
+))
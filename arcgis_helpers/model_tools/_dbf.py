@@ -0,0 +1,150 @@
+import collections
+import struct
+
+import numpy
+
+from arcgis_helpers.__logger import _logger
+from arcgis_helpers._metrics import add_rows, instrumented
+
+
+# Attributes match the arcpy Field properties used by _table_fields
+DbfField = collections.namedtuple(
+    "DbfField", ["name", "type", "length", "precision", "scale", "dbf_type"])
+
+_HEADER = struct.Struct("<BBBBIHH")
+_DESCRIPTOR_LENGTH = 32
+
+
+@instrumented
+def read_dbf(dbf_path, encoding="latin-1"):
+    """
+    Read a dBASE III/IV file into a numpy structured array without arcpy
+    The records are memory mapped and each field is converted for the
+    whole column at once. Deleted records are skipped.
+    Character fields are unicode, numeric fields are integers when they have
+    no decimals and fit in 9 digits, otherwise floats, dates are
+    datetime64 and logical fields are 1 or 0. The array is masked where
+    numbers, dates and logicals are blank, or filled with "*" or "?", so
+    tolist() gives None for them like an arcpy cursor. Under the mask
+    blank floats are NaN, blank integers and logicals 0 and blank dates
+    NaT.
+    :param dbf_path: path to the .dbf file
+    :type dbf_path: str
+    :param encoding: encoding of the character fields
+    :type encoding: str
+    :return: (list of DbfField, masked structured array)
+    :rtype: tuple
+    """
+    with open(dbf_path, "rb") as dbf_file:
+        header = dbf_file.read(_HEADER.size)
+        (version, year, month, day, record_count, header_length,
+         record_length) = _HEADER.unpack(header)
+        dbf_file.seek(_DESCRIPTOR_LENGTH)
+        descriptors = dbf_file.read(header_length - _DESCRIPTOR_LENGTH)
+        dbf_file.seek(0, 2)
+        # guard against a record count larger than the file holds
+        record_count = min(record_count,
+                           (dbf_file.tell() - header_length) // record_length)
+
+    fields = _parse_descriptors(descriptors)
+    _logger.debug("%s: %s records, %s fields", dbf_path, record_count,
+                  len(fields))
+
+    raw_dtype = numpy.dtype({
+        "names": ["_deleted"] + [field.name for field in fields],
+        "formats": ["S1"] + ["S{}".format(field.length) for field in fields],
+        "offsets": [0] + _field_offsets(fields),
+        "itemsize": record_length
+    })
+    if record_count == 0:
+        records = numpy.zeros(0, dtype=raw_dtype)
+    else:
+        records = numpy.memmap(dbf_path, dtype=raw_dtype, mode="r",
+                               offset=header_length, shape=(record_count,))
+        records = records[records["_deleted"] != b"*"]
+
+    data = numpy.ma.empty(len(records), dtype=[
+        (field.name, _field_dtype(field)) for field in fields])
+    for field in fields:
+        values, blank = _convert_field(records[field.name], field, encoding)
+        data[field.name] = numpy.ma.array(values, mask=blank)
+    add_rows(len(data))
+
+    return fields, data
+
+
+def _parse_descriptors(descriptors):
+    fields = []
+    for start in range(0, len(descriptors), _DESCRIPTOR_LENGTH):
+        descriptor = descriptors[start:start + _DESCRIPTOR_LENGTH]
+        if descriptor[:1] == b"\r" or len(descriptor) < _DESCRIPTOR_LENGTH:
+            break
+        name = str(descriptor[:11].split(b"\x00")[0].decode("ascii"))
+        dbf_type = descriptor[11:12].decode("ascii").upper()
+        length = struct.unpack("<B", descriptor[16:17])[0]
+        decimals = struct.unpack("<B", descriptor[17:18])[0]
+        fields.append(DbfField(name, _arc_type(dbf_type, length, decimals),
+                               length, length, decimals, dbf_type))
+    return fields
+
+
+def _field_offsets(fields):
+    offsets = []
+    offset = 1
+    for field in fields:
+        offsets.append(offset)
+        offset += field.length
+    return offsets
+
+
+def _arc_type(dbf_type, length, decimals):
+    if dbf_type in ["N", "F"]:
+        if decimals > 0 or length > 9:
+            return "Double"
+        if length <= 4:
+            return "SmallInteger"
+        return "Integer"
+    if dbf_type == "D":
+        return "Date"
+    if dbf_type == "L":
+        return "SmallInteger"
+    return "String"
+
+
+def _field_dtype(field):
+    return {
+        "Double": "f8",
+        "Integer": "i4",
+        "SmallInteger": "i2",
+        "Date": "M8[us]",
+    }.get(field.type, "U{}".format(field.length))
+
+
+def _convert_field(values, field, encoding):
+    """
+    Values of a field converted from its text, and True where they are
+    blank
+    """
+    if field.type == "String":
+        return numpy.char.decode(numpy.char.rstrip(values), encoding), False
+
+    stripped = numpy.char.strip(values)
+    if field.dbf_type == "L":
+        upper = numpy.char.upper(stripped)
+        return ((upper == b"T") | (upper == b"Y")).astype("i2"), \
+            (upper == b"") | (upper == b"?")
+
+    blank = (stripped == b"") | (numpy.char.count(stripped, b"*") > 0)
+
+    if field.type == "Date":
+        parts = numpy.ascontiguousarray(values, dtype="S8").view(
+            [("y", "S4"), ("m", "S2"), ("d", "S2")])
+        iso = numpy.char.add(numpy.char.add(parts["y"], b"-"), parts["m"])
+        iso = numpy.char.add(numpy.char.add(iso, b"-"), parts["d"])
+        iso[blank] = b"NaT"
+        return iso.astype("M8[D]").astype("M8[us]"), blank
+
+    if field.type == "Double":
+        return numpy.where(blank, b"nan", stripped).astype("f8"), blank
+
+    return numpy.where(blank, b"0", stripped).astype("i8"), blank
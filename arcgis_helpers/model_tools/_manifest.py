@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+
+from arcgis_helpers.__logger import _logger
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def manifest_path(output_geodatabase):
+    """
+    Default manifest location, beside the output geodatabase
+    :param output_geodatabase: geodatabase the results are imported into
+    :type output_geodatabase: str
+    :return: path of the manifest file
+    :rtype: str
+    """
+    return "{}.manifest.json".format(output_geodatabase.rstrip("\\/"))
+
+
+def load_manifest(path):
+    """
+    Load an import manifest, empty if the file does not exist
+    :param path: path of the manifest file
+    :type path: str
+    :return: entries keyed by source path
+    :rtype: dict
+    """
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r") as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(path, manifest):
+    """
+    Write an import manifest, replacing the previous file only once the new
+    one is complete
+    :param path: path of the manifest file
+    :type path: str
+    :param manifest: entries keyed by source path
+    :type manifest: dict
+    :return: None
+    :rtype: None
+    """
+    temp_path = "{}.tmp".format(path)
+    with open(temp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    if os.path.isfile(path):
+        os.remove(path)
+    os.rename(temp_path, path)
+
+
+def source_key(source_path):
+    return os.path.normcase(os.path.abspath(source_path))
+
+
+def source_signature(source_paths, previous=None):
+    """
+    Size, modification time and content hash of one or more source files
+    The hash is reused from previous when the sizes and modification times
+    are unchanged, so unchanged files are not read again.
+    :param source_paths: files making up the source, ie: .shp, .shx, .dbf
+    :type source_paths: list
+    :param previous: manifest entry from the last import
+    :type previous: dict
+    :return: dict with size, mtime and sha1, sha1 is None when none of the
+        files exist
+    :rtype: dict
+    """
+    source_paths = [path for path in source_paths if os.path.isfile(path)]
+    if not source_paths:
+        return {"size": 0, "mtime": None, "sha1": None}
+    signature = {
+        "size": sum(os.path.getsize(path) for path in source_paths),
+        "mtime": max(os.path.getmtime(path) for path in source_paths),
+    }
+    if previous is not None and previous.get("size") == signature["size"] \
+            and previous.get("mtime") == signature["mtime"]:
+        signature["sha1"] = previous.get("sha1")
+        return signature
+
+    sha1 = hashlib.sha1()
+    for path in sorted(source_paths):
+        with open(path, "rb") as source_file:
+            block = source_file.read(_HASH_BLOCK_SIZE)
+            while block:
+                sha1.update(block)
+                block = source_file.read(_HASH_BLOCK_SIZE)
+    signature["sha1"] = sha1.hexdigest()
+    return signature
+
+
+def unchanged_table(manifest, source_paths, table_exists, table=None):
+    """
+    Check a source against the manifest
+    :param manifest: entries keyed by source path
+    :type manifest: dict
+    :param source_paths: files making up the source, the first is the key
+    :type source_paths: list
+    :param table_exists: function checking the recorded output still exists
+    :type table_exists: function
+    :param table: output table the source is imported into, a different
+        recorded table is not kept
+    :type table: str
+    :return: (key, signature, output table if the source is unchanged)
+    :rtype: tuple
+    """
+    key = source_key(source_paths[0])
+    previous = manifest.get(key)
+    signature = source_signature(source_paths, previous)
+    if previous is not None and signature["sha1"] is not None \
+            and previous.get("sha1") == signature["sha1"] \
+            and (table is None or previous["table"] == table) \
+            and previous["table"] not in other_tables(manifest, key) \
+            and table_exists(previous["table"]):
+        _logger.info("%s unchanged, keeping %s", source_paths[0],
+                     previous["table"])
+        return key, signature, previous["table"]
+    return key, signature, None
+
+
+def other_tables(manifest, key):
+    """
+    Output tables recorded for the sources other than key
+    :param manifest: entries keyed by source path
+    :type manifest: dict
+    :param key: source key from source_key
+    :type key: str
+    :return: recorded output tables
+    :rtype: set
+    """
+    return set(entry["table"] for entry_key, entry in manifest.items()
+               if entry_key != key)
+
+
+def record_import(manifest, key, signature, table):
+    """
+    Record the output table produced from a source
+    :param manifest: entries keyed by source path
+    :type manifest: dict
+    :param key: source key from unchanged_table
+    :type key: str
+    :param signature: source signature from unchanged_table
+    :type signature: dict
+    :param table: output table
+    :type table: str
+    :return: None
+    :rtype: None
+    """
+    entry = dict(signature)
+    entry["table"] = table
+    manifest[key] = entry
@@ -1,18 +1,53 @@
-import arcpy
+import collections
+import numpy
 import os
 import datetime
+import shutil
 import sys
+import tempfile
+import time
 
-from arcgis_helpers.__logger import _logger
+from arcgis_helpers._backend import arcpy
+from arcgis_helpers.__logger import _logger, ProgressLogger
+from arcgis_helpers._metrics import instrumented, stage
+from arcgis_helpers.model_tools import _manifest
+from arcgis_helpers.model_tools._dbf import read_dbf
+from arcgis_helpers.model_tools._shapefile import read_shapefile, \
+    read_shape_type, ZM_SHAPE_TYPES
+from arcgis_helpers._parallel import map_processes, imap_threads
 
+# rows inserted between progress checks when importing model results
+_INSERT_BATCH_SIZE = 10000
+# seconds between progress messages when importing model results
+_PROGRESS_SECONDS = 5
 
-def import_model_shapefile(shapefile, output_geodatabase):
+# feature fields carried into the query table outputs
+_FEATURE_FIELDS = {
+    'Junction': ["ID","ELEVATION","ZONE","FILTER_TYP","Shape"],
+    'Pipe': ["ID","ZONE","FROM_","TO","Shape"]
+}
+_DEFAULT_FEATURE_FIELDS = ["ID", "ZONE", "Shape"]
+
+
+@instrumented
+def import_model_shapefile(shapefile, output_geodatabase, incremental=False,
+                           manifest_path=None, backend="conversion"):
     """
     Import a model result shapefile into a geodatabase
     :param shapefile:
     :type shapefile:
     :param output_geodatabase:
     :type output_geodatabase:
+    :param incremental: skip the shapefile if it is unchanged since the
+        feature class recorded in the manifest was imported
+    :type incremental: bool
+    :param manifest_path: manifest file, defaults to beside the geodatabase
+    :type manifest_path: str
+    :param backend: "conversion" for FeatureClassToGeodatabase_conversion,
+        "native" to read the shapefile with read_shapefile and insert the
+        features in batches. Shapefiles with Z or M values are imported
+        with the conversion backend.
+    :type backend: str
     :return:
     :rtype:
     """
@@ -20,26 +55,190 @@ def import_model_shapefile(shapefile, output_geodatabase):
         _logger.info("asserting values")
         assert shapefile is not None
         assert output_geodatabase is not None
+        assert backend in ["conversion", "native"]
 
         arcpy.env.overwriteOutput = True
         shape = shapefile
-        output_geodatabase = output_geodatabase
-
-        _logger.info("Adding {} to {}".format(shape,output_geodatabase))
-        shapefile_name = str(shape).split("\\")
-        out_feature = "{}\\{}".format(output_geodatabase,shapefile_name[len(shapefile_name)-1].replace(".shp",""))
-        _logger.debug(out_feature)
-        if (arcpy.Exists(out_feature)):
-            _logger.info("feature exists - deleting old feature")
-            arcpy.Delete_management(out_feature)
-        x = arcpy.FeatureClassToGeodatabase_conversion(shape,output_geodatabase)[0]
+
+        _logger.info("Adding %s to %s", shape,output_geodatabase)
+        if incremental:
+            manifest_path = manifest_path or _manifest.manifest_path(output_geodatabase)
+            manifest = _manifest.load_manifest(manifest_path)
+            key, signature, existing = _manifest.unchanged_table(
+                manifest, _shapefile_paths(shape), arcpy.Exists,
+                os.path.join(output_geodatabase,
+                             os.path.splitext(os.path.basename(shape))[0]))
+            if existing:
+                return existing
+
+        out_feature = _import_shapefile(shape, output_geodatabase, backend)
+        if incremental:
+            _manifest.record_import(manifest, key, signature, out_feature)
+            _manifest.save_manifest(manifest_path, manifest)
         return out_feature
 
     except Exception, e:
         _logger.error(e.message)
 
 
-def create_query_table(input_feature, input_tables, geodatabase):
+@instrumented
+def import_model_shapefiles(shapefiles, output_geodatabase, processes=None,
+                            backend="native", scratch_folder=None):
+    """
+    Import a batch of shapefiles in parallel
+    Each shapefile is imported by a worker process into its own scratch
+    geodatabase, the feature classes are then copied into
+    output_geodatabase, replacing feature classes of the same name.
+    :param shapefiles: paths to the .shp files
+    :type shapefiles: list
+    :param output_geodatabase: geodatabase to hold the feature classes
+    :type output_geodatabase: str
+    :param processes: number of worker processes, None for one per CPU
+    :type processes: int
+    :param backend: "native" or "conversion", see import_model_shapefile
+    :type backend: str
+    :param scratch_folder: folder for the worker geodatabases, defaults to
+        a temporary folder beside output_geodatabase
+    :type scratch_folder: str
+    :return: one dict per shapefile with source, feature, seconds and error
+    :rtype: list
+    """
+    if isinstance(shapefiles, str):
+        shapefiles = [shapefiles]
+    delete_scratch = scratch_folder is None
+    if scratch_folder is None:
+        scratch_folder = tempfile.mkdtemp(
+            prefix="model_shapefiles_",
+            dir=os.path.dirname(os.path.abspath(output_geodatabase)))
+
+    try:
+        _logger.info("Importing %s shapefiles", len(shapefiles))
+        reports = map_processes(
+            _import_shapefile_task,
+            [(shape, scratch_folder, backend) for shape in shapefiles],
+            processes)
+
+        _logger.info("Merging feature classes into %s", output_geodatabase)
+        for report in reports:
+            if report["feature"] is None:
+                _logger.error("%s failed: %s", report["source"],
+                              report["error"])
+                continue
+            feature_name = _replaceable_table_name(
+                output_geodatabase,
+                os.path.splitext(os.path.basename(report["source"]))[0])
+            report["feature"] = arcpy.Copy_management(
+                report["feature"],
+                os.path.join(output_geodatabase, feature_name))[0]
+    finally:
+        if delete_scratch:
+            _delete_scratch_folder(scratch_folder)
+    failed = len([report for report in reports if report["feature"] is None])
+    _logger.info("Imported %s of %s shapefiles, %s failed",
+                 len(reports) - failed, len(reports), failed)
+    return reports
+
+
+def _shapefile_paths(shape):
+    return [os.path.splitext(shape)[0] + extension
+            for extension in [".shp", ".shx", ".dbf", ".prj"]]
+
+
+def _import_shapefile(shape, output_geodatabase, backend):
+    out_feature = os.path.join(
+        output_geodatabase, os.path.splitext(os.path.basename(shape))[0])
+    _logger.debug(out_feature)
+    if (arcpy.Exists(out_feature)):
+        _logger.info("feature exists - deleting old feature")
+        arcpy.Delete_management(out_feature)
+    if backend == "native" and read_shape_type(shape) in ZM_SHAPE_TYPES:
+        # read_shapefile does not read Z and M values
+        _logger.info("%s has Z or M values, using the conversion backend",
+                     shape)
+        backend = "conversion"
+    if backend == "native":
+        _load_shapefile(shape, out_feature)
+    else:
+        arcpy.FeatureClassToGeodatabase_conversion(shape, output_geodatabase)
+    return out_feature
+
+
+def _import_shapefile_task(task):
+    shape, scratch_folder, backend = task
+    start = time.time()
+    report = {"source": shape, "feature": None, "seconds": 0, "error": None}
+    try:
+        report["feature"] = _import_shapefile(
+            shape, _worker_scratch_gdb(scratch_folder), backend)
+    except Exception, e:
+        report["error"] = str(e)
+    report["seconds"] = time.time() - start
+    _logger.info("%s imported in %.2fs", shape, report["seconds"])
+    return report
+
+
+def _load_shapefile(shape, out_feature):
+    with stage("read"):
+        shapefile = read_shapefile(shape)
+    feature_count = len(shapefile.feature_offsets) - 1
+    if len(shapefile.attributes) != feature_count:
+        raise ValueError("{} has {} shapes but {} attribute records".format(
+            shape, feature_count, len(shapefile.attributes)))
+
+    # a .prj path is accepted wherever a spatial reference is
+    prj_path = os.path.splitext(shape)[0] + ".prj"
+    with stage("create_feature_class"):
+        _create_feature_class(
+            out_feature, shapefile.shape_type,
+            prj_path if os.path.isfile(prj_path) else None,
+            [(field.name, field) for field in shapefile.fields])
+
+    cursor_fields = [field.name for field in shapefile.fields]
+    cursor_fields.append(
+        "SHAPE@XY" if shapefile.shape_type == "Point" else "SHAPE@")
+    progress = ProgressLogger("features imported", total=feature_count,
+                              every_seconds=_PROGRESS_SECONDS)
+    with stage("insert", rows=feature_count), \
+            arcpy.da.InsertCursor(out_feature, cursor_fields) as ic:
+        for start in range(0, feature_count, _INSERT_BATCH_SIZE):
+            stop = min(feature_count, start + _INSERT_BATCH_SIZE)
+            rows = shapefile.attributes[start:stop].tolist()
+            for row, geometry in zip(rows, _shape_batch(shapefile, start,
+                                                        stop)):
+                ic.insertRow(tuple(row) + (geometry,))
+            progress.update(len(rows))
+    progress.done()
+    return out_feature
+
+
+def _shape_batch(shapefile, start, stop):
+    """
+    Geometries of features start to stop for an insert cursor, (x, y) for
+    points and esri JSON shapes otherwise, None for null shapes
+    The flat arrays are converted to lists once per batch, so the only
+    objects made per feature are the ones the cursor needs.
+    """
+    feature_offsets = shapefile.feature_offsets[start:stop + 1]
+    part_offsets = shapefile.part_offsets[
+        feature_offsets[0]:feature_offsets[-1] + 1]
+    coordinates = shapefile.coordinates[
+        part_offsets[0]:part_offsets[-1]].tolist()
+    part_offsets = (part_offsets - part_offsets[0]).tolist()
+    parts = [coordinates[first:last]
+             for first, last in zip(part_offsets[:-1], part_offsets[1:])]
+    features = zip((feature_offsets[:-1] - feature_offsets[0]).tolist(),
+                   (feature_offsets[1:] - feature_offsets[0]).tolist())
+    if shapefile.shape_type == "Point":
+        return [tuple(parts[first][0]) if last > first else None
+                for first, last in features]
+    key = "paths" if shapefile.shape_type == "Polyline" else "rings"
+    return [arcpy.AsShape({key: parts[first:last]}, True)
+            if last > first else None for first, last in features]
+
+
+@instrumented
+def create_query_table(input_feature, input_tables, geodatabase,
+                       backend="query_table", workers=1):
     """
     Generate query table from an input feature and tables
     Input should be the feature without the path.
@@ -50,6 +249,16 @@ def create_query_table(input_feature, input_tables, geodatabase):
     :type input_tables: list or str
     :param geodatabase:
     :type geodatabase: str
+    :param backend: "query_table" to join with MakeQueryTable and
+        CopyFeatures, "native" to read the feature once and join every
+        table on ID in memory
+    :type backend: str
+    :param workers: number of tables to build at once, None for one per CPU.
+        The native backend reads the feature once and joins tables in
+        threads, writing the outputs one at a time. The query_table backend
+        builds each table in its own process, every process reading the
+        feature itself.
+    :type workers: int
     :return:
     :rtype:
     """
@@ -60,8 +269,10 @@ def create_query_table(input_feature, input_tables, geodatabase):
 
         arcpy.env.overwriteOutput = True
 
+        assert backend in ["query_table", "native"]
+
         input_feature_type = _feature_type(input_feature)
-        results = []
+        tables = []
         for table in list(input_tables):
             # table_full = os.path.join(geodatabase, table)
             # feature_full = os.path.join(geodatabase, input_feature)
@@ -69,14 +280,17 @@ def create_query_table(input_feature, input_tables, geodatabase):
             # IE: Processing only for Junctions
             if input_feature_type.upper() not in str(table).upper():
                 # warn
-                _logger.warning("Skipping {}\n"
-                                 "Table is not for {} Feature Type".format(table, input_feature))
+                _logger.warning("Skipping %s\n"
+                                "Table is not for %s Feature Type",
+                                table, input_feature)
             else:
-                _logger.info("Working on {}".format(table))
-                result = _create_query_table(input_feature, table, input_feature_type, geodatabase)
-                results.append(result)
+                tables.append(table)
+
+        if backend == "native":
+            return _create_joined_features(input_feature, tables, input_feature_type, geodatabase, workers)
 
-        return results
+        tasks = [(input_feature, table, input_feature_type, geodatabase) for table in tables]
+        return map_processes(_create_query_table_task, tasks, workers)
     except Exception, e:
         _logger.error(e.message)
 
@@ -87,10 +301,18 @@ def _feature_type(feature):
     base_list = ["Junction","Pipe","Pump","Reservoir","Valve","Tank"]
     for i in base_list:
         if i.upper() in str(feature).upper():
-            _logger.info("Feature type {} found".format(i))
+            _logger.info("Feature type %s found", i)
             return i
 
 
+def _create_query_table_task(task):
+    feature, table, input_type, geodatabase = task
+    # worker processes do not inherit the parent's arcpy environment
+    arcpy.env.overwriteOutput = True
+    _logger.info("Working on %s", table)
+    return _create_query_table(feature, table, input_type, geodatabase)
+
+
 def _create_query_table(feature, table, input_type, geodatabase):
     workspace_path = _get_workspace(geodatabase)
 
@@ -98,20 +320,22 @@ def _create_query_table(feature, table, input_type, geodatabase):
     qf_parameters = _build_qf(feature, table, workspace_path, input_type)
 
     _logger.info("Generating Query Table")
-    QT = arcpy.MakeQueryTable_management(qf_parameters[0],
-                                         qf_parameters[1],
-                                         "USE_KEY_FIELDS",
-                                         qf_parameters[2],
-                                         qf_parameters[3],
-                                         qf_parameters[4])[0]
+    with stage("make_query_table"):
+        QT = arcpy.MakeQueryTable_management(qf_parameters[0],
+                                             qf_parameters[1],
+                                             "USE_KEY_FIELDS",
+                                             qf_parameters[2],
+                                             qf_parameters[3],
+                                             qf_parameters[4])[0]
 
     _logger.info("Copying final Query Table to\n"
-                     "{}".format(qf_parameters[5]))
-    _logger.info("feature count: {}".format(arcpy.GetCount_management(QT)[0]))
+                 "%s", qf_parameters[5])
+    _logger.info("feature count: %s", arcpy.GetCount_management(QT)[0])
 
     out__q_t = os.path.join(workspace_path,qf_parameters[5])
-    out_feature = arcpy.CopyFeatures_management(QT, out__q_t)[0]
-    _logger.info("OUT: {}".format(out__q_t))
+    with stage("copy_features"):
+        out_feature = arcpy.CopyFeatures_management(QT, out__q_t)[0]
+    _logger.info("OUT: %s", out__q_t)
     return out_feature
 
 
@@ -127,38 +351,182 @@ def _build_qf(feature, table, geodatabase, input_type):
 
     _logger.debug("setting key field")
     key_field = "{}.ID".format(feature)
-    _logger.debug("key field {}".format(key_field))
+    _logger.debug("key field %s", key_field)
 
     _logger.debug("Building SQL query")
     sql = "{}.ID = {}.ID".format(feature, table)
-    _logger.debug("SQL Query - {}".format(sql))
+    _logger.debug("SQL Query - %s", sql)
 
     _logger.info("building feature fields")
-    feature_dct = {
-        'Junction': ["ID","ELEVATION","ZONE","FILTER_TYP","Shape"],
-        'Pipe': ["ID","ZONE","FROM_","TO","Shape"]
-    }
-    ls = feature_dct.get(input_type, ["ID", "ZONE", "Shape"])
+    ls = _FEATURE_FIELDS.get(input_type, _DEFAULT_FEATURE_FIELDS)
 
-    _logger.debug("{} fields {}".format(input_type, ls))
+    _logger.debug("%s fields %s", input_type, ls)
     feature_field = ["{}.{}".format(feature, fl) for fl in ls]
 
     _logger.debug("building table fields")
     table_field = [
         "{}.{}".format(table, item.name)
-        for item in arcpy.ListFields(os.path.join(geodatabase, table))
-        if item.name not in ["TIME_STEP","OBJECTID"]
+        for item in _table_join_fields(os.path.join(geodatabase, table))
     ]
 
     _logger.debug("combining feature and table fields")
     combined_fields = feature_field + table_field
 
-    return [table_list,"QueryTable",key_field,combined_fields,sql,output_feature]
+    # layer names are per table so several query tables can exist at once
+    layer_name = "{}_QueryTable".format(table)
+    return [table_list,layer_name,key_field,combined_fields,sql,output_feature]
+
+
+def _table_join_fields(table_path):
+    return [
+        item for item in arcpy.ListFields(table_path)
+        if item.name not in ["TIME_STEP","OBJECTID"]
+    ]
+
+
+def _create_joined_features(feature, tables, input_type, geodatabase, workers=1):
+    """
+    Join result tables to a feature on ID without Query Tables
+    The feature's key fields and geometry are read once into a cache shared
+    by every table. Tables are read and hash joined to the cache in memory,
+    several at once when workers is more than 1. arcpy writes are not
+    thread safe, so each output is then created and written with a single
+    insert cursor in this thread, as soon as its join is ready. Output
+    names and fields follow _create_query_table.
+    """
+    feature_cache = _read_feature_cache(feature, input_type, geodatabase)
+    joins = imap_threads(
+        lambda table: _join_table(feature_cache, table, geodatabase),
+        tables, workers)
+    return [_write_joined_features(feature_cache, table, joined, out_fields,
+                                   geodatabase)
+            for table, joined, out_fields in joins]
+
+
+_FeatureCache = collections.namedtuple(
+    "_FeatureCache", ["name", "frame", "columns", "fields", "describe"])
+
+
+def _read_feature_cache(feature, input_type, geodatabase):
+    import pandas
+
+    feature_path = os.path.join(geodatabase, feature)
+    feature_fields = [
+        item for item in arcpy.ListFields(feature_path)
+        if item.name in _FEATURE_FIELDS.get(input_type, _DEFAULT_FEATURE_FIELDS)
+        and item.type != "Geometry"
+    ]
+    feature_columns = ["{}_{}".format(feature, item.name) for item in feature_fields]
+
+    _logger.info("Reading %s key fields and geometry", feature)
+    with stage("read_feature") as running, \
+            arcpy.da.SearchCursor(feature_path, [item.name for item in feature_fields] + ["SHAPE@"]) as sc:
+        # object columns keep nulls as None and integers as integers
+        feature_frame = pandas.DataFrame([row for row in sc],
+                                         columns=feature_columns + ["SHAPE@"],
+                                         dtype=object)
+        running.add_rows(len(feature_frame))
+    return _FeatureCache(feature, feature_frame, feature_columns,
+                         feature_fields, arcpy.Describe(feature_path))
+
+
+@instrumented
+def _join_table(feature_cache, table, geodatabase):
+    import pandas
+
+    _logger.info("Working on %s", table)
+    table_path = os.path.join(geodatabase, table)
+    table_fields = _table_join_fields(table_path)
+    # read with a cursor, TableToNumPyArray rejects nulls in integer fields
+    # and turns them into NaN in float fields
+    with stage("read") as running, \
+            arcpy.da.SearchCursor(table_path, [item.name for item in table_fields]) as sc:
+        table_frame = pandas.DataFrame(
+            [row for row in sc],
+            columns=["{}_{}".format(table, item.name) for item in table_fields],
+            dtype=object)
+        running.add_rows(len(table_frame))
+
+    with stage("join", rows=len(table_frame)):
+        joined = feature_cache.frame.merge(table_frame, how="inner",
+                                           left_on="{}_ID".format(feature_cache.name),
+                                           right_on="{}_ID".format(table))
+    _logger.info("feature count: %s", len(joined))
+
+    out_fields = list(zip(feature_cache.columns, feature_cache.fields)) + \
+        list(zip(table_frame.columns, table_fields))
+    insert_fields = [name for name, item in out_fields] + ["SHAPE@"]
+    return table, joined[insert_fields], out_fields
+
+
+@instrumented
+def _write_joined_features(feature_cache, table, joined, out_fields,
+                           geodatabase):
+    out_feature = _create_output_table(table, geodatabase)
+    _create_feature_class(out_feature, feature_cache.describe.shapeType,
+                          feature_cache.describe.spatialReference, out_fields,
+                          getattr(feature_cache.describe, "hasZ", False),
+                          getattr(feature_cache.describe, "hasM", False))
+
+    insert_fields = list(joined.columns)
+    progress = ProgressLogger("{} rows joined".format(table),
+                              total=len(joined),
+                              every_seconds=_PROGRESS_SECONDS)
+    with stage("insert", rows=len(joined)), \
+            arcpy.da.InsertCursor(out_feature, insert_fields) as ic:
+        for start in range(0, len(joined), _INSERT_BATCH_SIZE):
+            chunk = joined.iloc[start:start + _INSERT_BATCH_SIZE]
+            for row in chunk.values.tolist():
+                ic.insertRow(row)
+            progress.update(len(chunk))
+    progress.done()
+    _logger.info("OUT: %s", out_feature)
+    return out_feature
+
+
+# arcpy field types to the types AddField_management expects
+_ADD_FIELD_TYPES = {
+    "String": "TEXT",
+    "Double": "DOUBLE",
+    "Single": "FLOAT",
+    "Integer": "LONG",
+    "SmallInteger": "SHORT",
+    "Date": "DATE",
+    "GUID": "GUID",
+    "Blob": "BLOB",
+}
+
+
+def _create_feature_class(out_feature, shape_type, spatial_reference,
+                          out_fields, has_z=False, has_m=False):
+    for name, item in out_fields:
+        if item.type not in _ADD_FIELD_TYPES:
+            raise ValueError("{} field {} cannot be added to {}".format(
+                item.type, name, out_feature))
+
+    _logger.info("Creating feature class %s", out_feature)
+    out_path, out_name = os.path.split(out_feature)
+    arcpy.CreateFeatureclass_management(
+        out_path, out_name, shape_type,
+        has_m="ENABLED" if has_m else "DISABLED",
+        has_z="ENABLED" if has_z else "DISABLED",
+        spatial_reference=spatial_reference)
+    field_descriptions = [
+        [name, _ADD_FIELD_TYPES[item.type], "",
+         item.length if item.type == "String" else ""]
+        for name, item in out_fields
+    ]
+    if hasattr(arcpy, "AddFields_management"):
+        arcpy.AddFields_management(out_feature, field_descriptions)
+        return
+    for name, field_type, alias, length in field_descriptions:
+        arcpy.AddField_management(out_feature, name, field_type, field_length=length or None)
 
 
 def _get_workspace(item):
-    _logger.debug("setting arcgis workspace")
-    arcpy.env.workspace = item
+    # paths are always built from the workspace, arcpy.env.workspace is left
+    # alone so query tables can be built concurrently
+    _logger.debug("using workspace %s", item)
     return item
 
 
@@ -178,11 +546,13 @@ def _create_output_table(table, geodatabase):
     if "FF" in table.upper():
         out_file += "_QT"
 
-    _logger.debug("output file - {}".format(out_file))
+    _logger.debug("output file - %s", out_file)
     return os.path.join(geodatabase, out_file)
 
 
-def import_model_results(model_mxd, scenario, features, output_geodatabase):
+@instrumented
+def import_model_results(model_mxd, scenario, features, output_geodatabase,
+                         incremental=False, manifest_path=None):
     """
     Used for importing model results into GIS
     features can be a single item, or a list of items, but they must match
@@ -195,6 +565,11 @@ def import_model_results(model_mxd, scenario, features, output_geodatabase):
     :type features:
     :param output_geodatabase:
     :type output_geodatabase:
+    :param incremental: skip files unchanged since the table recorded in the
+        manifest was imported, and replace the table of changed files
+    :type incremental: bool
+    :param manifest_path: manifest file, defaults to beside the geodatabase
+    :type manifest_path: str
     :return:
     :rtype:
     """
@@ -205,7 +580,29 @@ def import_model_results(model_mxd, scenario, features, output_geodatabase):
         model_scenario_folder = model_mxd.replace(".mxd",os.path.join(".OUT","Scenario"))
         source_folder = os.path.join(model_scenario_folder, scenario)
         source_file = features
-        result = _read_file(output_geodatabase, source_folder, source_file, scenario, model_mxd)
+        if not incremental:
+            return _read_file(output_geodatabase, source_folder, source_file, scenario, model_mxd)
+
+        manifest_path = manifest_path or _manifest.manifest_path(output_geodatabase)
+        manifest = _manifest.load_manifest(manifest_path)
+        source = os.path.join(source_folder, source_file)
+        table_name = _table_type(source_file, scenario, model_mxd)
+        if table_name:
+            table_name = _incremental_table_name(
+                output_geodatabase, table_name, manifest,
+                _manifest.source_key(source), set())
+        key, signature, existing = _manifest.unchanged_table(
+            manifest, [source], arcpy.Exists,
+            table_name and os.path.join(output_geodatabase, table_name))
+        if existing:
+            return existing
+
+        result = _read_file(output_geodatabase, source_folder, source_file,
+                            scenario, model_mxd, overwrite=True,
+                            table_name=table_name)
+        if result:
+            _manifest.record_import(manifest, key, signature, result)
+            _manifest.save_manifest(manifest_path, manifest)
         return result
 
     except Exception, e:
@@ -215,6 +612,209 @@ def import_model_results(model_mxd, scenario, features, output_geodatabase):
         _logger.error(sys.exc_info()[-1].tb_lineno)
 
 
+@instrumented
+def import_all_model_results(model_mxd, output_geodatabase, scenarios=None,
+                             features=None, processes=None, retries=1,
+                             scratch_folder=None, incremental=False,
+                             manifest_path=None):
+    """
+    Import every model result DBF of every scenario in parallel
+    Result files are found under the model's .OUT\\Scenario folder and each
+    is imported by a worker process into its own scratch geodatabase. The
+    tables are then copied into output_geodatabase.
+    :param model_mxd: path to the model map document
+    :type model_mxd: str
+    :param output_geodatabase: geodatabase to hold the result tables
+    :type output_geodatabase: str
+    :param scenarios: scenario names to import, None for all
+    :type scenarios: list
+    :param features: result file names to import, ie: JunctOut.dbf, None
+        for all result files
+    :type features: list
+    :param processes: number of worker processes, None for one per CPU
+    :type processes: int
+    :param retries: number of times a failed file is retried
+    :type retries: int
+    :param scratch_folder: folder for the worker geodatabases, defaults to
+        a temporary folder beside output_geodatabase
+    :type scratch_folder: str
+    :param incremental: skip files unchanged since the table recorded in the
+        manifest was imported, and replace the table of changed files
+    :type incremental: bool
+    :param manifest_path: manifest file, defaults to beside the geodatabase
+    :type manifest_path: str
+    :return: one dict per file with scenario, source, table, seconds,
+        attempts, error and skipped
+    :rtype: list
+    """
+    _logger.info("Starting batch import of model results")
+    model_scenario_folder = model_mxd.replace(".mxd", os.path.join(".OUT", "Scenario"))
+    if scenarios is None:
+        scenarios = list_model_scenarios(model_mxd) or []
+    if isinstance(features, str):
+        features = [features]
+
+    delete_scratch = scratch_folder is None
+    if scratch_folder is None:
+        scratch_folder = tempfile.mkdtemp(
+            prefix="model_results_",
+            dir=os.path.dirname(os.path.abspath(output_geodatabase)))
+
+    if incremental:
+        manifest_path = manifest_path or _manifest.manifest_path(output_geodatabase)
+        manifest = _manifest.load_manifest(manifest_path)
+
+    tasks = []
+    skipped = []
+    signatures = {}
+    table_names = {}
+    for scenario in scenarios:
+        source_folder = os.path.join(model_scenario_folder, scenario)
+        for source_file in _list_result_files(source_folder, features):
+            source = os.path.join(source_folder, source_file)
+            if incremental:
+                table_names[source] = _incremental_table_name(
+                    output_geodatabase,
+                    _table_type(source_file, scenario, model_mxd), manifest,
+                    _manifest.source_key(source),
+                    set(name.upper() for name in table_names.values()))
+                key, signature, existing = _manifest.unchanged_table(
+                    manifest, [source], arcpy.Exists,
+                    os.path.join(output_geodatabase, table_names[source]))
+                signatures[source] = (key, signature)
+                if existing:
+                    skipped.append({
+                        "scenario": scenario, "source": source,
+                        "table": existing, "seconds": 0, "attempts": 0,
+                        "error": None, "skipped": True
+                    })
+                    continue
+            tasks.append((model_mxd, scenario, source_folder, source_file,
+                          scratch_folder, retries))
+    _logger.info("%s result files to import in %s scenarios, %s unchanged",
+                 len(tasks), len(scenarios), len(skipped))
+
+    try:
+        reports = map_processes(_import_result_task, tasks, processes)
+
+        _logger.info("Merging result tables into %s", output_geodatabase)
+        existing_names = _workspace_names(output_geodatabase)
+        for report in reports:
+            if report["table"] is None:
+                _logger.error("%s failed after %s attempts: %s",
+                              report["source"], report["attempts"],
+                              report["error"])
+                continue
+            table_name = os.path.basename(report["table"])
+            if incremental:
+                # changed sources replace their table rather than adding _1
+                table_name = _replaceable_table_name(
+                    output_geodatabase, table_names[report["source"]])
+            else:
+                table_name = _unique_table_name(output_geodatabase,
+                                                table_name, existing_names)
+                existing_names.add(table_name.upper())
+            report["table"] = arcpy.Copy_management(
+                report["table"],
+                os.path.join(output_geodatabase, table_name))[0]
+            if incremental:
+                key, signature = signatures[report["source"]]
+                _manifest.record_import(manifest, key, signature,
+                                        report["table"])
+
+        if incremental:
+            _manifest.save_manifest(manifest_path, manifest)
+    finally:
+        if delete_scratch:
+            _delete_scratch_folder(scratch_folder)
+    reports += skipped
+
+    failed = len([report for report in reports if report["table"] is None])
+    _logger.info("Imported %s of %s result files, %s failed",
+                 len(reports) - failed, len(reports), failed)
+    return reports
+
+
+def _list_result_files(source_folder, features=None):
+    if not os.path.isdir(source_folder):
+        _logger.warning("No scenario folder %s", source_folder)
+        return []
+    wanted = None
+    if features is not None:
+        wanted = [feature.upper() for feature in features]
+
+    result_files = []
+    for item in sorted(os.listdir(source_folder)):
+        if not item.upper().endswith(".DBF"):
+            continue
+        if wanted is not None and item.upper() not in wanted:
+            continue
+        if _table_type(item, "", "") is not False:
+            result_files.append(item)
+    return result_files
+
+
+def _import_result_task(task):
+    model_mxd, scenario, source_folder, source_file, scratch_folder, \
+        retries = task
+
+    start = time.time()
+    scratch_gdb = _worker_scratch_gdb(scratch_folder)
+    report = {
+        "scenario": scenario,
+        "source": os.path.join(source_folder, source_file),
+        "table": None,
+        "seconds": 0,
+        "attempts": 0,
+        "error": None,
+        "skipped": False
+    }
+    while report["table"] is None and report["attempts"] <= retries:
+        report["attempts"] += 1
+        existing_names = _workspace_names(scratch_gdb)
+        try:
+            result = _read_file(scratch_gdb, source_folder, source_file,
+                                scenario, model_mxd)
+            if result:
+                report["table"] = result
+                report["error"] = None
+            else:
+                report["error"] = "import failed, see log"
+        except Exception, e:
+            report["error"] = str(e)
+        if report["table"] is None:
+            # a partial table would push the retry's table to a _1 name
+            _delete_new_tables(scratch_gdb, existing_names)
+
+    report["seconds"] = time.time() - start
+    _logger.info("%s imported in %.2fs", report["source"],
+                 report["seconds"])
+    return report
+
+
+def _delete_new_tables(workspace, existing_names):
+    for child in arcpy.Describe(workspace).children:
+        if child.name.upper() not in existing_names:
+            _logger.info("Deleting partial table %s", child.name)
+            arcpy.Delete_management(os.path.join(workspace, child.name))
+
+
+def _worker_scratch_gdb(scratch_folder):
+    # one geodatabase per process so workers never share a workspace
+    gdb_name = "worker_{}.gdb".format(os.getpid())
+    scratch_gdb = os.path.join(scratch_folder, gdb_name)
+    if not arcpy.Exists(scratch_gdb):
+        arcpy.CreateFileGDB_management(scratch_folder, gdb_name)
+    return scratch_gdb
+
+
+def _delete_scratch_folder(scratch_folder):
+    for item in os.listdir(scratch_folder):
+        if item.endswith(".gdb"):
+            arcpy.Delete_management(os.path.join(scratch_folder, item))
+    shutil.rmtree(scratch_folder, ignore_errors=True)
+
+
 def _table_fields(base_record):
     fld_name = base_record.name
     fld_type = base_record.type
@@ -229,23 +829,110 @@ def _table_fields(base_record):
         return [fld_name,fld_type,fld_precision,fld_decimals,fld_length]
 
 
-def _create_model_output_table(output_gdb, table_name, fields):
+def _unique_table_name(output_gdb, table_name, existing_names=None):
+    if existing_names is None:
+        existing_names = _workspace_names(output_gdb)
     counter = 1
     core_table = table_name
-    while arcpy.Exists(os.path.join(output_gdb, core_table)):
+    while core_table.upper() in existing_names:
         core_table = "{}_{}".format(table_name, counter)
         counter += 1
-    _logger.info("Creating Table: {}".format(os.path.join(output_gdb, core_table)))
+    return core_table
+
+
+def _workspace_names(workspace):
+    # a single listing instead of an Exists call for every candidate name
+    return set(
+        child.name.upper() for child in arcpy.Describe(workspace).children)
+
+
+def _incremental_table_name(output_gdb, table_name, manifest, key,
+                            claimed_names):
+    """
+    Name of the table a source replaces when importing incrementally
+    The source keeps the table the manifest records for it. Otherwise it
+    gets table_name, with a _1, _2... suffix when the name is recorded for
+    another source or in claimed_names, the upper case names given to the
+    other sources of this run, so sources of the same table type never
+    replace each other's table.
+    """
+    taken = set(os.path.basename(table).upper() for table in
+                _manifest.other_tables(manifest, key)) | claimed_names
+    previous = manifest.get(key)
+    if previous is not None:
+        previous_name = os.path.basename(previous["table"])
+        if previous_name.upper() not in taken and (
+                previous_name.upper() == table_name.upper() or
+                previous_name.upper().startswith(table_name.upper() + "_")):
+            return previous_name
+    return _unique_table_name(output_gdb, table_name, taken)
+
+
+def _replaceable_table_name(output_gdb, table_name):
+    # the name comes from the source, a scratch table can have a suffix
+    out_table = os.path.join(output_gdb, table_name)
+    if arcpy.Exists(out_table):
+        _logger.info("Replacing Table: %s", out_table)
+        arcpy.Delete_management(out_table)
+    return table_name
+
+
+# numpy types for the field types NumPyArrayToTable can create
+_FIELD_DTYPES = {
+    "DATE": "M8[us]",
+    "Date": "M8[us]",
+    "Double": "f8",
+    "Single": "f4",
+    "Integer": "i4",
+    "SmallInteger": "i2",
+}
+
+
+def _create_model_output_table(output_gdb, table_name, fields, overwrite=False):
+    existing_names = _workspace_names(output_gdb)
+    if overwrite and table_name.upper() in existing_names:
+        _logger.info("Replacing Table: %s",
+                     os.path.join(output_gdb, table_name))
+        arcpy.Delete_management(os.path.join(output_gdb, table_name))
+        existing_names.discard(table_name.upper())
+    core_table = _unique_table_name(output_gdb, table_name, existing_names)
+    new_table = os.path.join(output_gdb, core_table)
+    _logger.info("Creating Table: %s", new_table)
+
+    fld_settings = [
+        settings for settings in (_table_fields(field) for field in fields)
+        if settings is not None
+    ]
+    schema = _schema_dtype(fld_settings)
+    if schema is not None:
+        _logger.debug("Creating %s fields from numpy schema",
+                      len(fld_settings))
+        arcpy.da.NumPyArrayToTable(numpy.empty(0, dtype=schema), new_table)
+        return new_table
+
     new_table = arcpy.CreateTable_management(output_gdb, core_table)[0]
-    for field in fields:
-        fld_settings = _table_fields(field)
-        if fld_settings is not None:
-            _logger.debug("Adding Field: {}".format(fld_settings[0]))
-            arcpy.AddField_management(new_table,fld_settings[0],fld_settings[1],fld_settings[2],fld_settings[3],fld_settings[4])
-    print("")
+    for settings in fld_settings:
+        _logger.debug("Adding Field: %s", settings[0])
+        arcpy.AddField_management(new_table,settings[0],settings[1],settings[2],settings[3],settings[4])
     return new_table
 
 
+def _schema_dtype(fld_settings):
+    """
+    numpy dtype creating all fields in one NumPyArrayToTable call
+    None when a field type has no numpy equivalent.
+    """
+    schema = []
+    for name, fld_type, precision, scale, length in fld_settings:
+        if fld_type == "String":
+            schema.append((str(name), "U{}".format(length or 255)))
+        elif fld_type in _FIELD_DTYPES:
+            schema.append((str(name), _FIELD_DTYPES[fld_type]))
+        else:
+            return None
+    return numpy.dtype(schema)
+
+
 def _table_type(input_file, scenario, model):
     _logger.debug("determining table type")
     out_name = ""
@@ -262,7 +949,7 @@ def _table_type(input_file, scenario, model):
     elif "Valve" in input_file:
         out_name = "Valve"
     else:
-        _logger.warning("could not determine type of {}".format(input_file))
+        _logger.warning("could not determine type of %s", input_file)
         return False
 
     # if include_model_name:
@@ -270,81 +957,87 @@ def _table_type(input_file, scenario, model):
     #     final_name = "{}_{}_{}_{}".format(model[len(model)-1].replace(".mxd",""),scenario,out_name,"OUT")
     # else:
     final_name = "{}_{}_{}".format(scenario,out_name,"OUT")
-    _logger.debug("output name - {}".format(final_name))
+    _logger.debug("output name - %s", final_name)
     return final_name
 
 
-def _read_file(output_gdb, source_folder, source_file, scenario, model_file):
+def _read_file(output_gdb, source_folder, source_file, scenario, model_file,
+               overwrite=False, table_name=None):
     try:
-        column_names = {}
-        cursor_fields = []
-        out_name = _table_type(source_file, scenario, model_file)
-        _logger.info("Starting processing of {}".format(os.path.join(source_folder, source_file)))
+        # the table type of the file unless the caller named the table
+        out_name = table_name or _table_type(source_file, scenario, model_file)
+        dbf_path = os.path.join(source_folder, source_file)
+        _logger.info("Starting processing of %s", dbf_path)
         if not out_name:
             _logger.error("Problem with input file name\n"
-                           "Please ensure it is unchanged from original name"
-                           "Ex: JunctOut.dbf")
+                          "Please ensure it is unchanged from original name"
+                          "Ex: JunctOut.dbf")
             return False
 
-        # For the datetime formatting
-        _logger.debug("setting base time")
-        base_time = datetime.datetime(int(datetime.datetime.now().year),01,01,00,00)
-
-        # Open Table
-        _logger.debug("loading dbf table to memory")
-        dbf_table = arcpy.CopyRows_management(os.path.join(source_folder, source_file), "in_memory\\ResTable")[0]
-
-        _logger.debug("building table fields excluding OID")
-        fld_names = arcpy.ListFields(dbf_table)
-        for x in range(0,len(fld_names)):
-            if fld_names[x].type <> "OID":
-                cursor_fields.append(fld_names[x].name)
-                column_names[x] = fld_names[x].name
-
-        output_table = _create_model_output_table(output_gdb, out_name, fld_names)
-
-        row_count = int(arcpy.GetCount_management(dbf_table)[0])
-        _logger.info("Total Rows to process: {}".format(row_count))
-
-        current_row = 0
-
-        _logger.info("Starting row iteration")
-
-        with arcpy.da.InsertCursor(output_table,cursor_fields) as ic:
-            with arcpy.da.SearchCursor(dbf_table,cursor_fields) as sc:
-                for line in sc:
-                    current_row += 1
-                    if ((current_row % 20) == 0) or ((current_row + 1) > row_count):
-                        _logger.info("{} of {}".format(current_row, row_count))
-                    out_values = []
-                    for i in range(0,len(cursor_fields),1):
-                        var = line[i]
-                        if type(var) is unicode:
-                            if cursor_fields[i] == "TIME":
-                                var = var.replace("hrs","")
-                                var = var.replace(" ","")
-                                var = var.split(":")
-                                #takes a base time of Jan 1 and adds the hours or minutes depending on the value in the time field
-                                #new code, works better then looking at the time and trying to estimate based on the hour
-                                #doesn't need to be sequential, simply based on the total amount of time within the field thats being examined
-                                var = base_time + datetime.timedelta(hours=int(var[0]),minutes=int(var[1]))
-                                var = var.strftime("%x %X")
-                        out_values.append(var)
-                    ic.insertRow(out_values)
-        _logger.debug("Deleting temporary dbf table")
-        arcpy.Delete_management(dbf_table)
+        _logger.debug("reading dbf table to numpy")
+        fld_names, data = read_dbf(dbf_path)
+        cursor_fields = [fld.name for fld in fld_names]
+
+        with stage("create_table"):
+            output_table = _create_model_output_table(output_gdb, out_name,
+                                                      fld_names, overwrite)
+
+        if "TIME" in cursor_fields and data.dtype["TIME"].kind in "US":
+            with stage("convert_time", rows=len(data)):
+                data = _convert_model_time(data)
+
+        row_count = len(data)
+        _logger.info("Total Rows to process: %s", row_count)
+
+        progress = ProgressLogger("rows imported", total=row_count,
+                                  every_seconds=_PROGRESS_SECONDS)
+        with stage("insert", rows=row_count), \
+                arcpy.da.InsertCursor(output_table, cursor_fields) as ic:
+            for start in range(0, row_count, _INSERT_BATCH_SIZE):
+                batch = data[start:start + _INSERT_BATCH_SIZE].tolist()
+                for row in batch:
+                    ic.insertRow(row)
+                progress.update(len(batch))
+        progress.done()
         return output_table
     except Exception, e:
-        try:
-            arcpy.Delete_management(dbf_table)
-        finally:
-            _logger.error(e.message)
-            return False
+        _logger.error(e.message)
+        return False
+
+
+def _convert_model_time(data):
+    """
+    Replace the model TIME strings ("12:30 hrs") with datetimes
+    Times are hours and minutes from Jan 1 of the current year, converted
+    for the whole column at once.
+    """
+    _logger.debug("converting TIME field to datetimes")
+    time_text = numpy.char.replace(data["TIME"], "hrs", "")
+    time_text = numpy.char.replace(time_text, " ", "")
+    time_parts = numpy.char.partition(time_text, ":")
+    minutes = time_parts[:, 0].astype("i8") * 60 + \
+        time_parts[:, 2].astype("i8")
+
+    base_time = numpy.datetime64(
+        "{}-01-01".format(datetime.datetime.now().year), "m")
+
+    out_dtype = [
+        (name, "M8[us]" if name == "TIME" else data.dtype[name])
+        for name in data.dtype.names
+    ]
+    # masked like data, so blank values stay null
+    out_data = numpy.ma.empty(len(data), dtype=out_dtype)
+    for name in data.dtype.names:
+        if name == "TIME":
+            out_data[name] = base_time + minutes
+        else:
+            out_data[name] = data[name]
+    return out_data
 
 
 def list_model_scenarios(model_file):
     output_path = "{}.OUT".format(model_file.split(".")[0])
-    _logger.debug("output path {}".format(output_path))
+    _logger.debug("output path %s", output_path)
     scenario_path = os.path.join(output_path, "SCENARIO")
     _logger.debug(scenario_path)
     if not os.path.isdir(scenario_path):
@@ -0,0 +1,179 @@
+import collections
+import os
+import struct
+
+import numpy
+
+from arcgis_helpers.__logger import _logger
+from arcgis_helpers._metrics import add_rows, instrumented
+from arcgis_helpers.model_tools._dbf import read_dbf
+
+# Shapefile geometry decoded into flat arrays. Feature i has parts
+# feature_offsets[i] to feature_offsets[i + 1], and part j has the
+# coordinates part_offsets[j] to part_offsets[j + 1]. A point feature has
+# one part of one coordinate, a null shape has no parts.
+Shapefile = collections.namedtuple(
+    "Shapefile", ["shape_type", "fields", "attributes", "coordinates",
+                  "part_offsets", "feature_offsets", "spatial_reference"])
+
+_HEADER_LENGTH = 100
+_RECORD_HEADER_LENGTH = 8
+
+# shape type codes to arcpy geometry types
+SHAPE_TYPES = {1: "Point", 3: "Polyline", 5: "Polygon"}
+# shape type codes with Z or M values, which are not read
+ZM_SHAPE_TYPES = {
+    11: "PointZ", 13: "PolylineZ", 15: "PolygonZ",
+    21: "PointM", 23: "PolylineM", 25: "PolygonM",
+}
+
+
+def read_shape_type(shp_path):
+    """
+    Shape type code of a shapefile, read from its header
+    :param shp_path: path to the .shp file
+    :type shp_path: str
+    :return: shape type code, ie: 1 for points
+    :rtype: int
+    """
+    with open(shp_path, "rb") as shp_file:
+        header = shp_file.read(_HEADER_LENGTH)
+    return struct.unpack("<i", header[32:36])[0]
+
+
+@instrumented
+def read_shapefile(shp_path, encoding="latin-1"):
+    """
+    Read a 2D point, polyline or polygon shapefile without arcpy
+    The .shp and .shx files are memory mapped and the geometry of every
+    record is decoded at once into flat coordinate and offset arrays, no
+    object is created per feature. Attributes are read from the .dbf with
+    read_dbf, masked where they are blank, and the .prj text is returned as
+    the spatial reference.
+    :param shp_path: path to the .shp file
+    :type shp_path: str
+    :param encoding: encoding of the character fields
+    :type encoding: str
+    :return: Shapefile with shape_type ("Point", "Polyline" or "Polygon"),
+        fields, attributes, coordinates (n, 2), part_offsets,
+        feature_offsets and spatial_reference
+    :rtype: Shapefile
+    """
+    base_path = os.path.splitext(shp_path)[0]
+    type_code = read_shape_type(shp_path)
+    if type_code in ZM_SHAPE_TYPES:
+        raise ValueError("{}: {} shapes are not supported, their Z and M "
+                         "values are not read".format(
+                             shp_path, ZM_SHAPE_TYPES[type_code]))
+    if type_code not in SHAPE_TYPES:
+        raise ValueError("{}: shape type {} is not supported".format(
+            shp_path, type_code))
+    shape_type = SHAPE_TYPES[type_code]
+    shp = numpy.memmap(shp_path, dtype="u1", mode="r")
+
+    index = numpy.memmap(base_path + ".shx", dtype="u1", mode="r")
+    offsets = numpy.frombuffer(index[_HEADER_LENGTH:], dtype=">i4") \
+        .reshape(-1, 2)[:, 0].astype("i8") * 2
+    # record contents start after the record number and content length
+    starts = offsets + _RECORD_HEADER_LENGTH
+    record_types = _gather(shp, starts, "<i4")
+    _logger.debug("%s: %s %s records", shp_path, len(starts), shape_type)
+
+    if shape_type == "Point":
+        coordinates, part_offsets, feature_offsets = \
+            _decode_points(shp, starts, record_types)
+    else:
+        coordinates, part_offsets, feature_offsets = \
+            _decode_multipart(shp, starts, record_types)
+
+    fields, attributes = read_dbf(base_path + ".dbf", encoding)
+    spatial_reference = None
+    if os.path.isfile(base_path + ".prj"):
+        with open(base_path + ".prj", "r") as prj_file:
+            spatial_reference = prj_file.read().strip()
+
+    add_rows(len(starts))
+    return Shapefile(shape_type, fields, attributes, coordinates,
+                     part_offsets, feature_offsets, spatial_reference)
+
+
+def _gather(data, positions, dtype):
+    """
+    Read one value of dtype at each byte position, positions need not be
+    aligned
+    """
+    dtype = numpy.dtype(dtype)
+    if len(positions) == 0:
+        return numpy.zeros(0, dtype=dtype)
+    index = positions[:, None] + numpy.arange(dtype.itemsize)
+    return numpy.ascontiguousarray(data[index]).view(dtype).ravel()
+
+
+def _runs(data, starts, lengths):
+    """
+    Concatenate the byte runs data[start:start + length] with one mask
+    over the file rather than a slice per run
+    """
+    keep = lengths > 0
+    starts = starts[keep]
+    lengths = lengths[keep]
+    if len(starts) == 0:
+        return numpy.zeros(0, dtype="u1")
+    edges = numpy.zeros(len(data) + 1, dtype="i1")
+    numpy.add.at(edges, starts, 1)
+    numpy.add.at(edges, starts + lengths, -1)
+    mask = numpy.cumsum(edges[:-1], dtype="i1").astype(bool)
+    return numpy.asarray(data[mask])
+
+
+def _decode_points(shp, starts, record_types):
+    present = record_types != 0
+    # x and y are read as one 16 byte value each then split
+    coordinates = _gather(shp, starts[present] + 4, "V16") \
+        .view("<f8").reshape(-1, 2)
+    part_offsets = numpy.arange(len(coordinates) + 1, dtype="i8")
+    feature_offsets = numpy.concatenate(
+        ([0], numpy.cumsum(present))).astype("i8")
+    return coordinates, part_offsets, feature_offsets
+
+
+def _decode_multipart(shp, starts, record_types):
+    # type (4), bounding box (32), part count (4), point count (4), the
+    # part start indexes (4 each) then the points (16 each)
+    # null shapes are only their type, the counts are read for the others
+    present = record_types != 0
+    part_counts = numpy.zeros(len(starts), dtype="i8")
+    part_counts[present] = _gather(shp, starts[present] + 36, "<i4")
+    point_counts = numpy.zeros(len(starts), dtype="i8")
+    point_counts[present] = _gather(shp, starts[present] + 40, "<i4")
+    parts_start = starts + 44
+    points_start = parts_start + 4 * part_counts
+
+    part_starts = _runs(shp, parts_start, 4 * part_counts).view("<i4") \
+        .astype("i8")
+    coordinates = _runs(shp, points_start, 16 * point_counts).view("<f8") \
+        .reshape(-1, 2)
+
+    # part starts are indexes within the feature, shift them by the number
+    # of points in the features before it
+    feature_offsets = numpy.concatenate(([0], numpy.cumsum(part_counts)))
+    feature_points = numpy.concatenate(([0], numpy.cumsum(point_counts)))
+    part_starts += numpy.repeat(feature_points[:-1], part_counts)
+    part_offsets = numpy.append(part_starts, feature_points[-1])
+    return coordinates, part_offsets, feature_offsets
+
+
+def feature_parts(shapefile, feature):
+    """
+    Coordinates of each part of one feature
+    :param shapefile: result of read_shapefile
+    :type shapefile: Shapefile
+    :param feature: index of the feature
+    :type feature: int
+    :return: one (n, 2) array per part
+    :rtype: list
+    """
+    first, last = shapefile.feature_offsets[feature:feature + 2]
+    return [shapefile.coordinates[start:stop] for start, stop in zip(
+        shapefile.part_offsets[first:last],
+        shapefile.part_offsets[first + 1:last + 1])]
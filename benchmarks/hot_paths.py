@@ -0,0 +1,324 @@
+"""
+Throughput and peak memory of the package's hot paths
+
+Synthetic junction tables and model result DBFs are generated once per
+size and shape, then each case is timed in a fresh interpreter against
+the local arcpy stand-in, so no ArcGIS install is needed and the peak
+memory of one case does not leak into the next. The best of --repeat
+runs is reported.
+
+    python benchmarks/hot_paths.py --sizes 10k 1m --save results.json
+    python benchmarks/hot_paths.py --baseline results.json
+
+Against a baseline, cases slower than --tolerance are reported and the
+exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import synthetic
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_feature_to_tsv(arcgis_helpers, data):
+    arcgis_helpers.feature_to_tsv(data["table"])
+
+
+def _run_write_feature_tsv(arcgis_helpers, data):
+    arcgis_helpers.write_feature_tsv(data["table"], os.devnull)
+
+
+def _run_write_feature_tsv_columnar(arcgis_helpers, data):
+    arcgis_helpers.write_feature_tsv(data["table"], os.devnull,
+                                     backend="columnar")
+
+
+def _setup_dataframe_to_arctable(arcgis_helpers, data):
+    data["frame"] = arcgis_helpers.arc_np.arctable_to_dataframe(
+        data["table"]).drop("OBJECTID", axis=1)
+
+
+def _run_dataframe_to_arctable(arcgis_helpers, data):
+    arcpy = arcgis_helpers.get_backend()
+    output = os.path.join("in_memory", "frame_out")
+    if arcpy.Exists(output):
+        arcpy.Delete_management(output)
+    arcgis_helpers.arc_np.dataframe_to_arctable(data["frame"], output)
+
+
+def _run_arctable_to_dataframe(arcgis_helpers, data):
+    arcgis_helpers.arc_np.arctable_to_dataframe(data["table"])
+
+
+def _setup_select_by_regex(arcgis_helpers, data):
+    arcgis_helpers.get_backend().MakeTableView_management(data["table"],
+                                                          "view")
+
+
+def _run_select_by_regex(arcgis_helpers, data):
+    arcgis_helpers.select_by_regex("view", ["ID"], r"J\d*7$")
+
+
+def _run_select_by_regex_pandas(arcgis_helpers, data):
+    arcgis_helpers.select_by_regex("view", ["ID"], r"J\d*7$",
+                                   backend="pandas")
+
+
+def _run_get_unique_values(arcgis_helpers, data):
+    arcgis_helpers.get_unique_values(data["table"], "ZONE", counts=True)
+
+
+def _run_read_dbf(arcgis_helpers, data):
+    arcgis_helpers.model_tools.read_dbf(data["dbf"])
+
+
+def _setup_import_model_results(arcgis_helpers, data):
+    data["imports"] = 0
+
+
+def _run_import_model_results(arcgis_helpers, data):
+    arcpy = arcgis_helpers.get_backend()
+    data["imports"] += 1
+    output = arcpy.CreateFileGDB_management(
+        data["folder"], "import_{}".format(data["imports"]))[0]
+    try:
+        arcgis_helpers.model_tools.import_model_results(
+            data["model"], "BASE", os.path.basename(data["dbf"]), output)
+    finally:
+        arcpy.Delete_management(output)
+
+
+# name: (setup, timed function)
+CASES = [
+    ("feature_to_tsv", (None, _run_feature_to_tsv)),
+    ("write_feature_tsv", (None, _run_write_feature_tsv)),
+    ("write_feature_tsv_columnar", (None, _run_write_feature_tsv_columnar)),
+    ("dataframe_to_arctable", (_setup_dataframe_to_arctable,
+                               _run_dataframe_to_arctable)),
+    ("arctable_to_dataframe", (None, _run_arctable_to_dataframe)),
+    ("select_by_regex", (_setup_select_by_regex, _run_select_by_regex)),
+    ("select_by_regex_pandas", (_setup_select_by_regex,
+                                _run_select_by_regex_pandas)),
+    ("get_unique_values", (None, _run_get_unique_values)),
+    ("read_dbf", (None, _run_read_dbf)),
+    ("import_model_results", (_setup_import_model_results,
+                              _run_import_model_results)),
+]
+
+
+def _data_paths(data_dir, size, shape):
+    """
+    Paths of the generated data for one size and shape
+    """
+    folder = os.path.join(data_dir, "{}_{}".format(size, shape))
+    model = os.path.join(folder, "model.mxd")
+    return {
+        "folder": folder,
+        "table": os.path.join(folder, "bench.gdb", "Junctions"),
+        "model": model,
+        "dbf": os.path.join(folder, "model.OUT", "Scenario", "BASE",
+                            "JunctOut.dbf"),
+        "rows": synthetic.SIZES[size],
+    }
+
+
+def generate(arcpy, data_dir, size, shape):
+    """
+    Generate the table and model result DBF for one size and shape,
+    unless an earlier run already did
+    """
+    data = _data_paths(data_dir, size, shape)
+    if os.path.isfile(os.path.join(data["folder"], "complete")):
+        return data
+    if os.path.isdir(data["folder"]):
+        shutil.rmtree(data["folder"])
+    os.makedirs(os.path.dirname(data["dbf"]))
+    sys.stderr.write("generating {} {} rows\n".format(size, shape))
+    arcpy.CreateFileGDB_management(data["folder"], "bench.gdb")
+    synthetic.create_table(arcpy, data["table"], data["rows"], shape)
+    synthetic.write_result_dbf(data["dbf"], data["rows"], shape)
+    open(os.path.join(data["folder"], "complete"), "w").close()
+    return data
+
+
+def run_case(case, data_dir, size, shape, repeat):
+    """
+    Time one case in this interpreter, called in the child process
+    :return: dict with seconds, rows_per_sec and peak memory in MB
+    :rtype: dict
+    """
+    import arcgis_helpers
+    from arcgis_helpers._metrics import _peak_memory_mb
+
+    arcgis_helpers.use_backend("local")
+    data = _data_paths(data_dir, size, shape)
+    setup, run = dict(CASES)[case]
+    if setup is not None:
+        setup(arcgis_helpers, data)
+    setup_peak = _peak_memory_mb()
+
+    timings = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        run(arcgis_helpers, data)
+        timings.append(timeit.default_timer() - start)
+
+    seconds = min(timings)
+    return {
+        "case": case,
+        "size": size,
+        "shape": shape,
+        "rows": data["rows"],
+        "seconds": seconds,
+        "rows_per_sec": data["rows"] / seconds if seconds > 0 else None,
+        "setup_peak_mb": setup_peak,
+        "peak_mb": _peak_memory_mb(),
+    }
+
+
+def _time_in_child(case, data_dir, size, shape, repeat):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [_PACKAGE_ROOT] + [path for path in [env.get("PYTHONPATH")] if path])
+    env["ARCGIS_HELPERS_BACKEND"] = "local"
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", case,
+         "--data-dir", data_dir, "--sizes", size, "--shapes", shape,
+         "--repeat", str(repeat)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    out, err = process.communicate()
+    if process.returncode != 0:
+        sys.stderr.write(err.decode("utf-8", "replace"))
+        return {"case": case, "size": size, "shape": shape,
+                "error": "exit status {}".format(process.returncode)}
+    return json.loads(out.decode("utf-8").strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """
+    Cases slower than the baseline by more than tolerance
+    :param results: results of this run
+    :type results: list
+    :param baseline: results of an earlier run, as saved with --save
+    :type baseline: dict
+    :param tolerance: allowed slowdown, 0.1 for 10%
+    :type tolerance: float
+    :return: (case key, baseline seconds, seconds, ratio) per result found
+        in the baseline, and the regressions among them
+    :rtype: tuple
+    """
+    previous = dict(
+        ((item["case"], item["size"], item["shape"]), item)
+        for item in baseline["results"] if "error" not in item)
+    comparisons = []
+    for item in results:
+        key = (item["case"], item["size"], item["shape"])
+        if "error" in item or key not in previous:
+            continue
+        ratio = item["seconds"] / previous[key]["seconds"]
+        comparisons.append((key, previous[key]["seconds"], item["seconds"],
+                            ratio))
+    regressions = [item for item in comparisons if item[3] > 1 + tolerance]
+    return comparisons, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", default=["10k"],
+                        choices=sorted(synthetic.SIZES))
+    parser.add_argument("--shapes", nargs="+", default=["narrow", "wide"],
+                        choices=sorted(synthetic.SHAPES))
+    parser.add_argument("--cases", nargs="+", default=[name for name, _
+                                                       in CASES],
+                        choices=[name for name, _ in CASES])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir",
+                        help="keep generated data here and reuse it")
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against saved results")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slowdown against the baseline")
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_case(args.child, args.data_dir, args.sizes[0],
+                                  args.shapes[0], args.repeat)))
+        return 0
+
+    sys.path.insert(0, _PACKAGE_ROOT)
+    import arcgis_helpers
+    arcpy = arcgis_helpers.use_backend("local")
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="arcgis_bench_")
+    results = []
+    try:
+        for size in args.sizes:
+            for shape in args.shapes:
+                generate(arcpy, data_dir, size, shape)
+                for case in args.cases:
+                    results.append(_time_in_child(case, data_dir, size,
+                                                  shape, args.repeat))
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, True)
+
+    import numpy
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as save_file:
+            json.dump(output, save_file, indent=1, sort_keys=True)
+
+    regressions = []
+    comparisons = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            comparisons, regressions = compare(
+                results, json.load(baseline_file), args.tolerance)
+
+    if args.json:
+        output["regressions"] = [
+            dict(zip(["case", "size", "shape"], key), baseline=before,
+                 seconds=after, ratio=ratio)
+            for key, before, after, ratio in regressions]
+        print(json.dumps(output, indent=1, sort_keys=True))
+    else:
+        print("{:<28}{:>5}{:>8}{:>11}{:>13}{:>10}".format(
+            "case", "size", "shape", "seconds", "rows/s", "peak MB"))
+        for item in results:
+            if "error" in item:
+                print("{:<28}{:>5}{:>8}  {}".format(
+                    item["case"], item["size"], item["shape"],
+                    item["error"]))
+                continue
+            print("{:<28}{:>5}{:>8}{:>11.3f}{:>13.0f}{:>10.0f}".format(
+                item["case"], item["size"], item["shape"], item["seconds"],
+                item["rows_per_sec"], item["peak_mb"] or 0))
+        for key, before, after, ratio in comparisons:
+            print("{:<42}{:>9.3f} -> {:.3f}s  {:+.0%}{}".format(
+                " ".join(key), before, after, ratio - 1,
+                "  REGRESSION" if ratio > 1 + args.tolerance else ""))
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
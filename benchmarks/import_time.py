@@ -0,0 +1,88 @@
+"""
+Cold import time of arcgis_helpers
+
+Each case is timed in a fresh interpreter, so nothing is cached between
+runs, and the best of --repeat runs is reported. "package" is the cost
+every script pays for ``import arcgis_helpers``; "full" loads every
+submodule and their numpy and pandas dependencies, which is what
+importing the package cost before it loaded lazily. arcpy itself is only
+imported once a function uses it.
+
+    python benchmarks/import_time.py --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CASES = [
+    ("package", "import arcgis_helpers"),
+    ("model_tools.read_dbf",
+     "from arcgis_helpers.model_tools import read_dbf"),
+    ("feature_to_tsv", "from arcgis_helpers import feature_to_tsv"),
+    ("arc_np", "from arcgis_helpers.arc_np import arctable_to_dataframe"),
+    ("full", "import arcgis_helpers; "
+             "arcgis_helpers.feature_to_tsv; "
+             "arcgis_helpers.arc_np.arctable_to_dataframe; "
+             "arcgis_helpers.model_tools.import_model_results"),
+]
+
+_TIMER = ("import time; _start = time.time(); {}; "
+          "print(repr(time.time() - _start))")
+
+
+def time_import(statement, repeat=5):
+    """
+    Best wall time of statement over repeat fresh interpreters
+    :param statement: python statement to time
+    :type statement: str
+    :param repeat: number of interpreters to start
+    :type repeat: int
+    :return: seconds, or None when the statement fails
+    :rtype: float
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [os.path.dirname(os.path.dirname(os.path.abspath(__file__)))] +
+        [path for path in [env.get("PYTHONPATH")] if path])
+    timings = []
+    for _ in range(repeat):
+        process = subprocess.Popen(
+            [sys.executable, "-c", _TIMER.format(statement)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        out, err = process.communicate()
+        if process.returncode != 0:
+            sys.stderr.write(err.decode("utf-8", "replace"))
+            return None
+        timings.append(float(out.decode("ascii").strip().splitlines()[-1]))
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    results = dict(
+        (name, time_import(statement, args.repeat))
+        for name, statement in CASES)
+
+    if args.json:
+        print(json.dumps(results, indent=1, sort_keys=True))
+        return
+
+    for name, statement in CASES:
+        seconds = results[name]
+        print("{:<24}{}".format(
+            name, "failed" if seconds is None else
+            "{:8.1f} ms".format(seconds * 1000)))
+    if results["package"] and results["full"]:
+        print("lazy import saves {:.1f} ms".format(
+            (results["full"] - results["package"]) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Synthetic tables and model result DBFs for the benchmarks
+
+Data is generated from a fixed seed so every run times the same rows.
+Narrow data has a handful of fields, wide data adds numeric result
+columns like a full model output.
+"""
+import os
+import struct
+
+import numpy
+
+SIZES = {
+    "10k": 10000,
+    "1m": 1000000,
+    "10m": 10000000,
+}
+
+SHAPES = {
+    "narrow": 2,
+    "wide": 30,
+}
+
+# rows generated and written at a time, bounds memory for the 10m size
+_CHUNK_ROWS = 500000
+_SEED = 20240601
+
+
+def _chunks(rows):
+    for start in range(0, rows, _CHUNK_ROWS):
+        yield start, min(rows, start + _CHUNK_ROWS)
+
+
+def _result_names(shape):
+    names = ["PRESSURE", "HEAD", "DEMAND", "QUALITY"]
+    names += ["RESULT_{}".format(i) for i in range(len(names),
+                                                   SHAPES[shape])]
+    return names[:SHAPES[shape]]
+
+
+def table_chunks(rows, shape):
+    """
+    Structured arrays of a junction table, ID, ZONE, DATE and numeric
+    result fields, _CHUNK_ROWS rows at a time
+    """
+    random = numpy.random.RandomState(_SEED)
+    names = _result_names(shape)
+    dtype = [("ID", "U16"), ("ZONE", "<i4"), ("DATE", "<M8[us]")] + \
+        [(name, "<f8") for name in names]
+    for start, stop in _chunks(rows):
+        data = numpy.zeros(stop - start, dtype=dtype)
+        index = numpy.arange(start, stop)
+        data["ID"] = numpy.char.add(u"J", index.astype("U15"))
+        data["ZONE"] = random.randint(0, 50, len(data))
+        data["DATE"] = numpy.datetime64("2020-01-01") + \
+            (index % 8760).astype("m8[h]")
+        for name in names:
+            data[name] = random.uniform(-100, 100, len(data)).round(3)
+        yield data
+
+
+def create_table(arcpy, path, rows, shape):
+    """
+    Create a junction table through the arcpy surface
+    """
+    workspace, name = os.path.split(path)
+    chunks = table_chunks(rows, shape)
+    arcpy.da.NumPyArrayToTable(next(chunks), path)
+    fields = [field.name for field in arcpy.ListFields(path)
+              if field.type != "OID"]
+    with arcpy.da.InsertCursor(path, fields) as ic:
+        for chunk in chunks:
+            for row in chunk.tolist():
+                ic.insertRow(row)
+    return path
+
+
+def write_result_dbf(path, rows, shape):
+    """
+    Write a model result DBF, ID and TIME text fields and N(12, 3) results
+    Records are formatted a chunk at a time with numpy rather than row by
+    row so the 10m size can be generated in reasonable time.
+    """
+    random = numpy.random.RandomState(_SEED)
+    fields = [("ID", "C", 16, 0), ("TIME", "C", 10, 0)] + \
+        [(name, "N", 12, 3) for name in _result_names(shape)]
+    record_length = 1 + sum(field[2] for field in fields)
+    header_length = 32 + 32 * len(fields) + 1
+
+    record_dtype = numpy.dtype(
+        [("_deleted", "S1")] +
+        [(name, "S{}".format(length)) for name, _, length, _ in fields])
+
+    with open(path, "wb") as dbf_file:
+        dbf_file.write(struct.pack("<BBBBIHH20x", 3, 120, 1, 1, rows,
+                                   header_length, record_length))
+        for name, field_type, length, decimals in fields:
+            dbf_file.write(struct.pack(
+                "<11sc4xBB14x", name.encode("ascii"),
+                field_type.encode("ascii"), length, decimals))
+        dbf_file.write(b"\r")
+
+        for start, stop in _chunks(rows):
+            index = numpy.arange(start, stop)
+            records = numpy.zeros(stop - start, dtype=record_dtype)
+            records["_deleted"] = b" "
+            records["ID"] = numpy.char.ljust(
+                numpy.char.add(b"J", index.astype("S15")), 16)
+            records["TIME"] = numpy.char.rjust(numpy.char.add(
+                (index % 24).astype("S2"), b":00 hrs"), 10)
+            for name, field_type, length, decimals in fields[2:]:
+                values = random.uniform(-100, 100, len(records))
+                records[name] = numpy.char.rjust(
+                    numpy.char.mod("%.3f", values).astype("S12"), 12)
+            dbf_file.write(records.tobytes())
+        dbf_file.write(b"\x1a")
+    return path
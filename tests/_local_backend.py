@@ -0,0 +1,38 @@
+import shutil
+import tempfile
+import unittest
+
+import arcgis_helpers
+
+
+class LocalBackendTest(unittest.TestCase):
+    """
+    Runs against the local SQLite stand-in for arcpy, in a file
+    geodatabase created for each test
+    """
+
+    def setUp(self):
+        self.arcpy = arcgis_helpers.use_backend("local")
+        self.arcpy.env.overwriteOutput = True
+        self.folder = tempfile.mkdtemp()
+        self.gdb = self.arcpy.CreateFileGDB_management(self.folder,
+                                                       "test.gdb")[0]
+
+    def tearDown(self):
+        self.arcpy.Delete_management(self.gdb)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def create_table(self, name, fields, rows):
+        """
+        :param fields: (name, AddField type) of each field
+        :param rows: values of each row, in the order of fields
+        :return: path of the table
+        """
+        table = self.arcpy.CreateTable_management(self.gdb, name)[0]
+        for field_name, field_type in fields:
+            self.arcpy.AddField_management(table, field_name, field_type)
+        with self.arcpy.da.InsertCursor(
+                table, [field_name for field_name, _ in fields]) as ic:
+            for row in rows:
+                ic.insertRow(row)
+        return table
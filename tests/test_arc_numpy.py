@@ -0,0 +1,114 @@
+import datetime
+import os
+
+import numpy
+import pandas
+
+from arcgis_helpers import arc_np
+from tests._local_backend import LocalBackendTest
+
+
+def sample_frame(rows=25):
+    return pandas.DataFrame({
+        "NAME": [u"J{}".format(i) for i in range(rows)],
+        "COUNT": numpy.arange(rows, dtype="i4"),
+        "VALUE": numpy.arange(rows) / 4.0,
+        "WHEN": [datetime.datetime(2020, 1, 1) +
+                 datetime.timedelta(hours=i, microseconds=i)
+                 for i in range(rows)],
+    }, columns=["NAME", "COUNT", "VALUE", "WHEN"])
+
+
+class ArcNumpyTest(LocalBackendTest):
+
+    def assertFrameEqual(self, actual, expected):
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        for column in expected.columns:
+            self.assertEqual(actual[column].tolist(),
+                             expected[column].tolist(), column)
+
+    def read(self, table, **kwargs):
+        frame = arc_np.arctable_to_dataframe(table, **kwargs)
+        return frame.drop("OBJECTID", axis=1)
+
+    def test_round_trip(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        self.assertFrameEqual(self.read(table), sample_frame())
+
+    def test_chunked_write(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table, chunk_size=7)
+        self.assertFrameEqual(self.read(table), sample_frame())
+
+    def test_chunked_read(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        self.assertFrameEqual(self.read(table, chunk_size=6), sample_frame())
+        self.assertFrameEqual(
+            self.read(table, where_clause="COUNT >= 10", chunk_size=4),
+            sample_frame().iloc[10:].reset_index(drop=True))
+
+    def test_iter_chunks(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        chunks = list(arc_np.iter_arctable_to_dataframe(
+            table, ["NAME", "COUNT"], chunk_size=10))
+        self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+        self.assertFrameEqual(
+            pandas.concat(chunks, ignore_index=True),
+            sample_frame()[["NAME", "COUNT"]])
+
+    def test_fields(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        self.assertFrameEqual(
+            arc_np.arctable_to_dataframe(table, ["VALUE", "NAME"]),
+            sample_frame()[["VALUE", "NAME"]])
+
+    def test_nulls(self):
+        table = self.create_table("T", [("NAME", "TEXT"), ("COUNT", "LONG")],
+                                  [(u"a", 1), (None, None)])
+        frame = self.read(table, null_value={"NAME": u"-", "COUNT": -1})
+        self.assertEqual(frame.values.tolist(), [[u"a", 1], [u"-", -1]])
+        frame = self.read(table, skip_nulls=True)
+        self.assertEqual(frame.values.tolist(), [[u"a", 1]])
+
+    def test_chunked_read_skip_nulls(self):
+        rows = [(float(i), i) if i % 3 else (None, None) for i in range(10)]
+        table = self.create_table("T", [("VALUE", "DOUBLE"),
+                                        ("COUNT", "LONG")], rows)
+        frame = self.read(table, skip_nulls=True, chunk_size=4)
+        self.assertEqual(frame.values.tolist(),
+                         [[value, count] for value, count in rows
+                          if value is not None])
+
+    def test_feature_without_shape(self):
+        feature = self.arcpy.CreateFeatureclass_management(
+            self.gdb, "P", "POINT")[0]
+        self.arcpy.AddField_management(feature, "COUNT", "LONG")
+        with self.arcpy.da.InsertCursor(feature,
+                                        ["SHAPE@XY", "COUNT"]) as ic:
+            ic.insertRow(((1.0, 2.0), 5))
+        frame = arc_np.arcfeature_to_dataframe(feature)
+        self.assertEqual(list(frame.columns), ["OBJECTID", "COUNT"])
+        self.assertEqual(frame["COUNT"].tolist(), [5])
+
+    def test_read_cache(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        cache = arc_np.ReadCache(os.path.join(self.folder, "cache"))
+        first = self.read(table, cache=cache)
+        second = self.read(table, cache=cache)
+        self.assertFrameEqual(first, sample_frame())
+        self.assertFrameEqual(second, sample_frame())
+        self.assertEqual(len(os.listdir(cache.folder)), 1)
+
+    def test_read_cache_entry_is_not_changed_by_the_frame(self):
+        table = os.path.join(self.gdb, "T")
+        arc_np.dataframe_to_arctable(sample_frame(), table)
+        cache = arc_np.ReadCache(os.path.join(self.folder, "cache"))
+        self.read(table, cache=cache)
+        frame = self.read(table, cache=cache)
+        frame.loc[0, "COUNT"] = 100
+        self.assertFrameEqual(self.read(table, cache=cache), sample_frame())
@@ -0,0 +1,172 @@
+import csv
+import datetime
+import io
+import os
+
+import arcgis_helpers
+from tests._local_backend import LocalBackendTest
+
+FIELDS = [("NAME", "TEXT"), ("COUNT", "LONG"), ("VALUE", "DOUBLE"),
+          ("WHEN", "DATE")]
+ROWS = [
+    (u"J1", 1, 0.5, datetime.datetime(2020, 1, 31, 12, 30)),
+    (None, None, None, None),
+    (u"P22", -2147483648, 1e-300, datetime.datetime(1999, 12, 31)),
+    (u"J10", 10, 2.25, datetime.datetime(2020, 5, 1, 3, 4, 5, 123456)),
+]
+
+# feature_to_tsv of ROWS as the row by row implementation wrote it
+BASELINE_TSV = (
+    "OBJECTID\tNAME\tCOUNT\tVALUE\tWHEN\n"
+    "1\tJ1\t1\t0.5\t2020-01-31 12:30:00\n"
+    "2\tNone\tNone\tNone\tNone\n"
+    "3\tP22\t-2147483648\t1e-300\t1999-12-31 00:00:00\n"
+    "4\tJ10\t10\t2.25\t2020-05-01 03:04:05.123456"
+)
+
+
+class FeatureToTsvTest(LocalBackendTest):
+
+    def setUp(self):
+        super(FeatureToTsvTest, self).setUp()
+        self.table = self.create_table("T", FIELDS, ROWS)
+
+    def test_matches_baseline(self):
+        self.assertEqual(arcgis_helpers.feature_to_tsv(self.table),
+                         BASELINE_TSV)
+
+    def test_fields_and_where_clause(self):
+        self.assertEqual(
+            arcgis_helpers.feature_to_tsv(self.table, ["NAME", "COUNT"],
+                                          where_clause="COUNT > 1"),
+            "NAME\tCOUNT\nJ10\t10")
+
+    def test_chunks_join_to_the_same_text(self):
+        chunks = list(arcgis_helpers.iter_feature_tsv(self.table,
+                                                      buffer_size=1))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual("".join(chunks), BASELINE_TSV)
+
+    def test_write_feature_tsv(self):
+        output = os.path.join(self.folder, "out.tsv")
+        arcgis_helpers.write_feature_tsv(self.table, output, buffer_size=2)
+        with io.open(output, "rb") as tsv_file:
+            self.assertEqual(tsv_file.read(), BASELINE_TSV.replace(
+                "\n", os.linesep).encode("ascii"))
+
+    def test_columnar_round_trip(self):
+        output = os.path.join(self.folder, "out.tsv")
+        arcgis_helpers.write_feature_tsv(self.table, output, buffer_size=3,
+                                         backend="columnar")
+        with io.open(output, "rb") as tsv_file:
+            text = tsv_file.read().decode("utf-8")
+        rows = list(csv.reader(text.encode("utf-8").splitlines()
+                               if str is bytes else text.splitlines(),
+                               delimiter="\t"))
+
+        self.assertEqual(rows[0], ["OBJECTID", "NAME", "COUNT", "VALUE",
+                                   "WHEN"])
+        self.assertEqual(rows[2], ["2", "", "", "", ""])
+        for expected, row in zip(ROWS[:1] + ROWS[2:], rows[1:2] + rows[3:]):
+            self.assertEqual(row[1], expected[0])
+            self.assertEqual(int(row[2]), expected[1])
+            self.assertEqual(float(row[3]), expected[2])
+            self.assertEqual(row[4].replace("T", " "),
+                             str(expected[3]))
+
+    def test_columnar_values_equal_to_null_stand_ins(self):
+        table = self.create_table(
+            "S", [("TEXT", "TEXT"), ("SMALL", "SHORT"), ("WHEN", "DATE")],
+            [(u"\x01", -32768, datetime.datetime(1678, 1, 1)),
+             (None, None, None)])
+        self.assertEqual(
+            arcgis_helpers.feature_to_tsv(table, ["TEXT", "SMALL", "WHEN"],
+                                          backend="columnar"),
+            u"TEXT\tSMALL\tWHEN\n\x01\t-32768\t1678-01-01T00:00:00\n\t\t")
+
+
+class SaveTextToFileTest(LocalBackendTest):
+
+    def saved(self, text):
+        arcgis_helpers.save_text_to_file(text, self.folder, "out",
+                                         overwrite_file=True)
+        with io.open(os.path.join(self.folder, "out.txt"), "rb") as out_file:
+            return out_file.read()
+
+    def test_output_bytes(self):
+        self.assertEqual(self.saved(u"a\tb\nc\xe9\n"),
+                         u"a\tb{0}c\xe9{0}".format(os.linesep)
+                         .encode("utf-8"))
+        self.assertEqual(self.saved([b"x\xe9\n", u"y"]),
+                         b"x\xe9" + os.linesep.encode("ascii") + b"y")
+
+    def test_windows_line_ends(self):
+        # written as open(path, "w") writes on Windows
+        linesep = os.linesep
+        os.linesep = "\r\n"
+        try:
+            self.assertEqual(self.saved(u"a\tb\nc\n"), b"a\tb\r\nc\r\n")
+            self.assertEqual(self.saved([b"x\n", u"y\n"]), b"x\r\ny\r\n")
+        finally:
+            os.linesep = linesep
+
+
+class SelectByRegexTest(LocalBackendTest):
+
+    def setUp(self):
+        super(SelectByRegexTest, self).setUp()
+        self.table = self.create_table("T", FIELDS, ROWS)
+        self.view = self.arcpy.MakeTableView_management(self.table,
+                                                        "view")[0]
+
+    def selected(self):
+        return sorted(row[0] for row in
+                      self.arcpy.da.SearchCursor(self.view, ["OID@"]))
+
+    def test_backends_match(self):
+        for fields, expression in [
+                ("NAME", r"J\d+$"), (["NAME", "COUNT"], r"-2147483648"),
+                ("VALUE", r"0\.5$"), ("WHEN", r".*\.123456"),
+                (["COUNT", "VALUE"], r"1")]:
+            cursor = arcgis_helpers.select_by_regex(self.view, fields,
+                                                    expression)
+            pandas = arcgis_helpers.select_by_regex(self.view, fields,
+                                                    expression,
+                                                    backend="pandas")
+            self.assertEqual(sorted(cursor), sorted(pandas),
+                             (fields, expression))
+            self.assertEqual(self.selected(), sorted(cursor))
+
+    def test_selection(self):
+        arcgis_helpers.select_by_regex(self.view, "NAME", r"J")
+        self.assertEqual(self.selected(), [1, 4])
+        arcgis_helpers.select_by_regex(self.view, "NAME", r"J1$",
+                                       selection_type="REMOVE_FROM_SELECTION",
+                                       pre_clear_selection=False)
+        self.assertEqual(self.selected(), [4])
+
+    def test_select_by_regexes(self):
+        matches = arcgis_helpers.select_by_regexes(
+            self.view, ["NAME", "COUNT"], {"j": r"J", "one": r"1", "p": "P"})
+        self.assertEqual(dict((name, sorted(oids))
+                              for name, oids in matches.items()),
+                         {"j": [1, 4], "one": [1, 4], "p": [3]})
+
+
+class GetUniqueValuesTest(LocalBackendTest):
+
+    def test_values_and_counts(self):
+        tables = [
+            self.create_table("A", [("V", "LONG")], [(1,), (2,), (2,)]),
+            self.create_table("B", [("V", "LONG")], [(2,), (3,), (None,)]),
+        ]
+        for workers in [1, 2]:
+            self.assertEqual(
+                sorted(arcgis_helpers.get_unique_values(tables, "V",
+                                                        workers=workers),
+                       key=str),
+                sorted([1, 2, 3, None], key=str))
+            self.assertEqual(
+                arcgis_helpers.get_unique_values(tables, "V", counts=True,
+                                                 workers=workers),
+                {1: 1, 2: 3, 3: 1, None: 1})
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import datetime
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from arcgis_helpers.model_tools._dbf import read_dbf
+
+
+def write_dbf(path, fields, records):
+    """
+    Write a dBASE III file
+    :param fields: (name, type, length, decimals) of each field
+    :param records: (deleted, [field text, ...]) of each record, the text
+        of each field is written as it is, padded to the field length
+    """
+    record_length = 1 + sum(field[2] for field in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    with open(path, "wb") as dbf_file:
+        dbf_file.write(struct.pack("<BBBBIHH20x", 3, 120, 1, 31,
+                                   len(records), header_length,
+                                   record_length))
+        for name, dbf_type, length, decimals in fields:
+            dbf_file.write(struct.pack("<11sc4xBB14x", name.encode("ascii"),
+                                       dbf_type.encode("ascii"), length,
+                                       decimals))
+        dbf_file.write(b"\r")
+        for deleted, values in records:
+            dbf_file.write(b"*" if deleted else b" ")
+            for field, value in zip(fields, values):
+                dbf_file.write(value.encode("latin-1").ljust(field[2]))
+        dbf_file.write(b"\x1a")
+
+
+class ReadDbfTest(unittest.TestCase):
+
+    fields = [("NAME", "C", 10, 0), ("COUNT", "N", 5, 0),
+              ("VALUE", "N", 10, 3), ("RATIO", "F", 8, 2),
+              ("FLAG", "L", 1, 0), ("WHEN", "D", 8, 0),
+              ("SMALL", "N", 3, 0)]
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "JunctOut.dbf")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_values(self):
+        write_dbf(self.path, self.fields, [
+            (False, [u"abc", u"   12", u"     1.250", u"   -0.50", u"T",
+                     u"20200131", u" -7"]),
+            (True, [u"deleted", u"    1", u"     1.000", u"    1.00", u"F",
+                    u"20000101", u"  1"]),
+            (False, [u"caf\xe9", u"-3", u"  1000.000", u"2.25", u"n",
+                     u"19991231", u"0"]),
+        ])
+        fields, data = read_dbf(self.path)
+
+        self.assertEqual([field.name for field in fields],
+                         ["NAME", "COUNT", "VALUE", "RATIO", "FLAG", "WHEN",
+                          "SMALL"])
+        self.assertEqual([field.type for field in fields],
+                         ["String", "Integer", "Double", "Double",
+                          "SmallInteger", "Date", "SmallInteger"])
+        self.assertEqual(data.tolist(), [
+            (u"abc", 12, 1.25, -0.5, 1, datetime.datetime(2020, 1, 31), -7),
+            (u"caf\xe9", -3, 1000.0, 2.25, 0,
+             datetime.datetime(1999, 12, 31), 0),
+        ])
+
+    def test_blanks_are_null(self):
+        write_dbf(self.path, self.fields, [
+            (False, [u"", u"", u"", u"********", u"?", u"", u"***"]),
+            (False, [u"x", u"    5", u"", u"", u" ", u"20200101", u""]),
+        ])
+        fields, data = read_dbf(self.path)
+
+        self.assertEqual(data.tolist(), [
+            (u"", None, None, None, None, None, None),
+            (u"x", 5, None, None, None, datetime.datetime(2020, 1, 1), None),
+        ])
+        # values under the mask
+        self.assertEqual(data["COUNT"].data.tolist(), [0, 5])
+        self.assertTrue(all(value != value
+                            for value in data["VALUE"].data.tolist()))
+
+    def test_empty(self):
+        write_dbf(self.path, self.fields, [])
+        fields, data = read_dbf(self.path)
+
+        self.assertEqual(len(fields), len(self.fields))
+        self.assertEqual(data.tolist(), [])
+
+    def test_all_deleted(self):
+        write_dbf(self.path, self.fields[:1], [(True, [u"a"]),
+                                               (True, [u"b"])])
+        fields, data = read_dbf(self.path)
+
+        self.assertEqual(data.tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import os
+import sys
+import unittest
+
+from arcgis_helpers import model_tools
+from arcgis_helpers.model_tools import _manifest
+from tests import test_dbf
+from tests._local_backend import LocalBackendTest
+from tests.test_shapefile import write_shapefile
+
+JUNCTION_FIELDS = [("ID", "TEXT"), ("ELEVATION", "DOUBLE"), ("ZONE", "LONG"),
+                   ("FILTER_TYP", "TEXT")]
+JUNCTIONS = [
+    ((1.0, 2.0), u"J1", 10.5, 1, u"A"),
+    ((3.0, 4.0), u"J2", None, None, None),
+    ((5.0, 6.0), u"J3", 12.0, 2, u"B"),
+]
+RESULT_FIELDS = [("ID", "TEXT"), ("TIME_STEP", "TEXT"), ("PRESSURE", "DOUBLE"),
+                 ("STATUS", "LONG"), ("FLAGS", "SHORT")]
+RESULTS = [
+    (u"J1", u"0:00", 50.25, 1, 3),
+    (u"J2", u"0:00", None, None, None),
+    (u"J3", u"0:00", 40.0, None, 0),
+    (u"J4", u"0:00", 1.0, 1, 1),
+]
+
+
+@unittest.skipIf(sys.version_info[0] > 2, "model_tools is python 2 code")
+class CreateQueryTableTest(LocalBackendTest):
+
+    def setUp(self):
+        super(CreateQueryTableTest, self).setUp()
+        feature = self.arcpy.CreateFeatureclass_management(
+            self.gdb, "Junction", "POINT")[0]
+        for name, field_type in JUNCTION_FIELDS:
+            self.arcpy.AddField_management(feature, name, field_type)
+        with self.arcpy.da.InsertCursor(
+                feature, ["SHAPE@XY"] + [name for name, _ in
+                                         JUNCTION_FIELDS]) as ic:
+            for row in JUNCTIONS:
+                ic.insertRow(row)
+        self.create_table("Junction_OUT", RESULT_FIELDS, RESULTS)
+
+    def create(self, backend):
+        outputs = model_tools.create_query_table(
+            "Junction", ["Junction_OUT"], self.gdb, backend=backend)
+        self.assertEqual(len(outputs), 1)
+        fields = dict((field.name, (field.type, field.length))
+                      for field in self.arcpy.ListFields(outputs[0])
+                      if field.type != "OID")
+        names = sorted(name for name in fields if name != "Shape")
+        with self.arcpy.da.SearchCursor(outputs[0],
+                                        names + ["SHAPE@"]) as sc:
+            rows = sorted(sc, key=lambda row: row[names.index("Junction_ID")])
+        return fields, names, rows
+
+    def test_native_matches_query_table(self):
+        query_table = self.create("query_table")
+        native = self.create("native")
+        self.assertEqual(native[0], query_table[0])
+        self.assertEqual(native[2], query_table[2])
+
+    def test_native_keeps_nulls(self):
+        fields, names, rows = self.create("native")
+        self.assertEqual(names, [
+            "Junction_ELEVATION", "Junction_FILTER_TYP", "Junction_ID",
+            "Junction_OUT_FLAGS", "Junction_OUT_ID", "Junction_OUT_PRESSURE",
+            "Junction_OUT_STATUS", "Junction_ZONE"])
+        self.assertEqual([row[:-1] for row in rows], [
+            (10.5, u"A", u"J1", 3, u"J1", 50.25, 1, 1),
+            (None, None, u"J2", None, u"J2", None, None, None),
+            (12.0, u"B", u"J3", 0, u"J3", 40.0, None, 2),
+        ])
+
+
+@unittest.skipIf(sys.version_info[0] > 2, "model_tools is python 2 code")
+class ImportModelShapefileTest(LocalBackendTest):
+
+    def test_native(self):
+        shapes = [[[(0.0, 0.0), (1.0, 1.0)], [(2.0, 2.0), (3.0, 2.0)]], None,
+                  [[(5.0, 5.0), (6.0, 6.0)]]]
+        shapefile = os.path.join(self.folder, "Pipe")
+        write_shapefile(shapefile, 3, shapes, [u"P1", u"P2", u"P3"])
+        feature = model_tools.import_model_shapefile(
+            shapefile + ".shp", self.gdb, backend="native")
+
+        self.assertEqual(self.arcpy.Describe(feature).shapeType, "Polyline")
+        with self.arcpy.da.SearchCursor(feature, ["ID", "SHAPE@"]) as sc:
+            rows = list(sc)
+        self.assertEqual([row[0] for row in rows], [u"P1", u"P2", u"P3"])
+        self.assertEqual([row[1] and row[1]["paths"] for row in rows],
+                         [[[list(point) for point in part] for part in parts]
+                          if parts else None for parts in shapes])
+
+
+@unittest.skipIf(sys.version_info[0] > 2, "model_tools is python 2 code")
+class ImportAllModelResultsTest(LocalBackendTest):
+
+    def setUp(self):
+        super(ImportAllModelResultsTest, self).setUp()
+        self.model_mxd = os.path.join(self.folder, "model.mxd")
+        self.source_folder = os.path.join(self.folder, "model.OUT",
+                                          "Scenario", "BASE")
+        os.makedirs(self.source_folder)
+        self.write_result("JunctOut.dbf", u"1.5")
+        self.write_result("JunctAvg.dbf", u"2.5")
+
+    def write_result(self, name, pressure):
+        path = os.path.join(self.source_folder, name)
+        test_dbf.write_dbf(path, [("ID", "C", 5, 0), ("PRESSURE", "N", 8, 2)],
+                           [(False, [u"J1", pressure])])
+        if os.path.isfile(path):
+            # the signature's modification time must change
+            mtime = os.path.getmtime(path) + 10
+            os.utime(path, (mtime, mtime))
+
+    def run_import(self):
+        reports = model_tools.import_all_model_results(
+            self.model_mxd, self.gdb, scenarios=["BASE"], processes=1,
+            incremental=True)
+        return dict((os.path.basename(report["source"]),
+                     (os.path.basename(report["table"]), report["skipped"]))
+                    for report in reports)
+
+    def pressures(self):
+        tables = sorted(child.name for child in
+                        self.arcpy.Describe(self.gdb).children)
+        pressures = []
+        for table in tables:
+            with self.arcpy.da.SearchCursor(
+                    os.path.join(self.gdb, table), ["PRESSURE"]) as sc:
+                pressures.append((table, [row[0] for row in sc]))
+        return pressures
+
+    def test_same_table_type_gets_its_own_table(self):
+        self.assertEqual(self.run_import(), {
+            "JunctAvg.dbf": ("BASE_Junction_OUT", False),
+            "JunctOut.dbf": ("BASE_Junction_OUT_1", False)})
+        self.assertEqual(self.pressures(), [
+            ("BASE_Junction_OUT", [2.5]), ("BASE_Junction_OUT_1", [1.5])])
+
+    def test_unchanged_sources_are_skipped(self):
+        self.run_import()
+        self.assertEqual(self.run_import(), {
+            "JunctAvg.dbf": ("BASE_Junction_OUT", True),
+            "JunctOut.dbf": ("BASE_Junction_OUT_1", True)})
+
+    def test_changed_source_replaces_its_table(self):
+        self.run_import()
+        self.write_result("JunctOut.dbf", u"3.25")
+        self.assertEqual(self.run_import(), {
+            "JunctAvg.dbf": ("BASE_Junction_OUT", True),
+            "JunctOut.dbf": ("BASE_Junction_OUT_1", False)})
+        self.assertEqual(self.pressures(), [
+            ("BASE_Junction_OUT", [2.5]), ("BASE_Junction_OUT_1", [3.25])])
+
+
+class ManifestTest(unittest.TestCase):
+
+    def test_missing_source_is_changed(self):
+        missing = os.path.join(os.path.dirname(__file__), "missing.dbf")
+        manifest = {_manifest.source_key(missing): {
+            "size": 0, "mtime": None, "sha1": None, "table": "T"}}
+
+        self.assertEqual(_manifest.source_signature([missing])["sha1"], None)
+        self.assertEqual(
+            _manifest.unchanged_table(manifest, [missing],
+                                      lambda table: True)[2], None)
+
+    def test_table_recorded_for_another_source_is_not_kept(self):
+        sources = [__file__, os.path.join(os.path.dirname(__file__),
+                                          "__init__.py")]
+        manifest = {}
+        for source in sources:
+            key, signature, existing = _manifest.unchanged_table(
+                manifest, [source], lambda table: True)
+            _manifest.record_import(manifest, key, signature, "T")
+
+        for source in sources:
+            self.assertEqual(
+                _manifest.unchanged_table(manifest, [source],
+                                          lambda table: True)[2], None)
+        manifest.pop(_manifest.source_key(sources[1]))
+        self.assertEqual(
+            _manifest.unchanged_table(manifest, sources[:1],
+                                      lambda table: True)[2], "T")
+        self.assertEqual(
+            _manifest.unchanged_table(manifest, sources[:1],
+                                      lambda table: True, "U")[2], None)
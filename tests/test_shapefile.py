@@ -0,0 +1,132 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from arcgis_helpers.model_tools._shapefile import feature_parts, \
+    read_shape_type, read_shapefile
+from tests import test_dbf
+
+
+def shape_content(type_code, parts):
+    """
+    Record content of a shape, parts is None for a null shape, [(x, y)] for
+    a point or a list of parts of (x, y) for a polyline or polygon
+    """
+    if parts is None:
+        return struct.pack("<i", 0)
+    if type_code == 1:
+        return struct.pack("<idd", type_code, parts[0][0], parts[0][1])
+    points = [point for part in parts for point in part]
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+    starts = [sum(len(part) for part in parts[:i]) for i in range(len(parts))]
+    return struct.pack("<i4dii", type_code, min(xs), min(ys), max(xs),
+                       max(ys), len(parts), len(points)) + \
+        struct.pack("<{}i".format(len(parts)), *starts) + \
+        b"".join(struct.pack("<dd", x, y) for x, y in points)
+
+
+def write_shapefile(base_path, type_code, shapes, ids):
+    """
+    Write a .shp, .shx and .dbf with an ID field, see shape_content for
+    shapes
+    """
+    contents = [shape_content(type_code, parts) for parts in shapes]
+    header = lambda length: struct.pack(">i20xi", 9994, length // 2) + \
+        struct.pack("<ii8d", 1000, type_code, *[0.0] * 8)
+    shp_length = 100 + sum(8 + len(content) for content in contents)
+    offset = 100
+    with open(base_path + ".shp", "wb") as shp, \
+            open(base_path + ".shx", "wb") as shx:
+        shp.write(header(shp_length))
+        shx.write(header(100 + 8 * len(contents)))
+        for number, content in enumerate(contents, 1):
+            shp.write(struct.pack(">ii", number, len(content) // 2))
+            shp.write(content)
+            shx.write(struct.pack(">ii", offset // 2, len(content) // 2))
+            offset += 8 + len(content)
+    test_dbf.write_dbf(base_path + ".dbf", [("ID", "C", 10, 0)],
+                       [(False, [value]) for value in ids])
+
+
+class ReadShapefileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.base_path = os.path.join(self.folder, "shapes")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read(self, type_code, shapes):
+        write_shapefile(self.base_path, type_code, shapes,
+                        [u"F{}".format(i) for i in range(len(shapes))])
+        return read_shapefile(self.base_path + ".shp")
+
+    def parts(self, shapefile):
+        return [[part.tolist() for part in feature_parts(shapefile, i)]
+                for i in range(len(shapefile.feature_offsets) - 1)]
+
+    def test_points(self):
+        shapefile = self.read(1, [[(1.0, 2.0)], None, [(-3.5, 4.25)]])
+
+        self.assertEqual(shapefile.shape_type, "Point")
+        self.assertEqual(shapefile.coordinates.tolist(),
+                         [[1.0, 2.0], [-3.5, 4.25]])
+        self.assertEqual(shapefile.feature_offsets.tolist(), [0, 1, 1, 2])
+        self.assertEqual(self.parts(shapefile),
+                         [[[[1.0, 2.0]]], [], [[[-3.5, 4.25]]]])
+        self.assertEqual(shapefile.attributes["ID"].tolist(),
+                         [u"F0", u"F1", u"F2"])
+        self.assertIsNone(shapefile.spatial_reference)
+
+    def test_polylines(self):
+        shapes = [
+            [[(0.0, 0.0), (1.0, 1.0)], [(2.0, 2.0), (3.0, 2.0), (4.0, 0.0)]],
+            None,
+            [[(5.0, 5.0), (6.0, 6.0)]],
+            None,
+        ]
+        shapefile = self.read(3, shapes)
+
+        self.assertEqual(shapefile.shape_type, "Polyline")
+        self.assertEqual(shapefile.feature_offsets.tolist(), [0, 2, 2, 3, 3])
+        self.assertEqual(shapefile.part_offsets.tolist(), [0, 2, 5, 7])
+        self.assertEqual(self.parts(shapefile), [
+            [[list(point) for point in part] for part in parts]
+            if parts else [] for parts in shapes])
+
+    def test_polygons(self):
+        square = [(0.0, 0.0), (0.0, 1.0), (1.0, 1.0), (1.0, 0.0), (0.0, 0.0)]
+        hole = [(0.25, 0.25), (0.75, 0.25), (0.75, 0.75), (0.25, 0.25)]
+        shapes = [None, [square, hole], [[(x + 2, y) for x, y in square]]]
+        with open(self.base_path + ".prj", "w") as prj_file:
+            prj_file.write("GEOGCS[\"GCS_WGS_1984\"]\n")
+        shapefile = self.read(5, shapes)
+
+        self.assertEqual(shapefile.shape_type, "Polygon")
+        self.assertEqual(self.parts(shapefile), [
+            [[list(point) for point in part] for part in parts]
+            if parts else [] for parts in shapes])
+        self.assertEqual(shapefile.spatial_reference,
+                         "GEOGCS[\"GCS_WGS_1984\"]")
+
+    def test_only_null_shapes(self):
+        shapefile = self.read(3, [None, None])
+
+        self.assertEqual(shapefile.coordinates.shape, (0, 2))
+        self.assertEqual(self.parts(shapefile), [[], []])
+
+    def test_z_and_m_shapes_are_not_read(self):
+        for type_code in [11, 13, 15, 21, 23, 25]:
+            write_shapefile(self.base_path, type_code, [], [])
+            self.assertEqual(read_shape_type(self.base_path + ".shp"),
+                             type_code)
+            self.assertRaises(ValueError, read_shapefile,
+                              self.base_path + ".shp")
+
+
+if __name__ == "__main__":
+    unittest.main()